@@ -0,0 +1,74 @@
+"""
+Бенчмарк холодного старта: время импорта пакета в новом интерпретаторе.
+
+Каждый сценарий запускается в отдельном процессе несколько раз,
+печатаются медиана и минимум. Базовая строка "python -c pass" — стоимость
+запуска самого интерпретатора, сценарий "жадный импорт" — граф импорта
+до ленивых экспортов: __init__ загружал все подмодули, а embeddings —
+Gemini SDK. С ним сравнивается "import semantic_core". Для разбивки по модулям используйте
+    python -X importtime -c "import semantic_core"
+
+Запуск (из корня репозитория):
+    python -m benchmarks.bench_import --repeat 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# Все модули, которые до ленивых экспортов загружал import semantic_core
+EAGER_IMPORT = (
+    "import google.generativeai, semantic_core.database, "
+    "semantic_core.vector_index, semantic_core.embeddings, "
+    "semantic_core.local_embeddings, semantic_core.async_embeddings, "
+    "semantic_core.embedding_cache, semantic_core.coalescing, "
+    "semantic_core.search_mixin, semantic_core.text_processing, "
+    "semantic_core.services, semantic_core.search"
+)
+
+SCENARIOS = {
+    "интерпретатор": "pass",
+    "жадный импорт": EAGER_IMPORT,
+    "import semantic_core": "import semantic_core",
+    "FTS-поиск": "from semantic_core import fulltext_search_parents",
+    "локальный эмбеддер": "from semantic_core import HashingEmbedder",
+    "Gemini": "from semantic_core import EmbeddingGenerator; EmbeddingGenerator",
+    "Gemini SDK": "from semantic_core.embeddings import import_genai; import_genai()",
+}
+
+
+def measure(statement: str, repeat: int) -> list[float]:
+    """Запускает statement в новых процессах и возвращает время в миллисекундах."""
+    # Без ключа и .env: импорт не должен требовать учетных данных
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    timings = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", statement], check=True, env=env
+        )
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, statement in SCENARIOS.items():
+        timings = measure(statement, args.repeat)
+        print(
+            f"{name:>20}: медиана {statistics.median(timings):7.1f} мс, "
+            f"минимум {min(timings):7.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Бенчмарк индексации и поиска на локальном эмбеддере (без сети).
+
+Генерирует синтетический корпус из фрагментов doc/architecture/*.md,
+индексирует его через save_note_with_chunks с HashingEmbedder и замеряет
+векторный, полнотекстовый и гибридный поиск.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.bench_ingest_search --notes 2000 --queries 200
+    python -m benchmarks.bench_ingest_search --storage int8 --binary
+    python -m benchmarks.bench_ingest_search --prefix 128 256
+    python -m benchmarks.bench_ingest_search --bulk 500
+    python -m benchmarks.bench_ingest_search --bulk 200 --pipeline 4 --latency 50
+    python -m benchmarks.bench_ingest_search --bulk 500 --many 4 --latency 50
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from semantic_core import (
+    init_database,
+    create_vector_table,
+    create_fts_table,
+    HashingEmbedder,
+    SimpleTextSplitter,
+    save_note_with_chunks,
+    ingest_notes,
+    IngestPipeline,
+    vector_search_chunks,
+    fulltext_search_parents,
+    hybrid_search_rrf,
+    search_many,
+)
+from domain.models import Note, NoteChunk, Category, Tag, NoteTag
+
+
+QUERIES = [
+    "векторный поиск",
+    "гибридный поиск RRF",
+    "эмбеддинги Gemini",
+    "нарезка на чанки",
+    "sqlite vec",
+    "полнотекстовый поиск FTS5",
+]
+
+
+class LatencyEmbedder(HashingEmbedder):
+    """HashingEmbedder с задержкой на каждый пакетный запрос (имитация сети)."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def build_corpus(notes: int, seed: int) -> list[dict]:
+    """Собирает синтетические заметки из абзацев документации проекта."""
+    paragraphs = [
+        paragraph.strip()
+        for path in sorted(Path("doc/architecture").glob("*.md"))
+        for paragraph in path.read_text(encoding="utf-8").split("\n\n")
+        if paragraph.strip()
+    ]
+    rng = random.Random(seed)
+
+    return [
+        {
+            "title": f"Синтетическая заметка {i}",
+            "content": "\n\n".join(rng.choices(paragraphs, k=rng.randint(5, 20))),
+        }
+        for i in range(notes)
+    ]
+
+
+def timed(func, *args, **kwargs) -> float:
+    """Возвращает время выполнения вызова в миллисекундах."""
+    started = time.perf_counter()
+    func(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", choices=["float32", "int8"], default="float32")
+    parser.add_argument(
+        "--binary", action="store_true", help="бинарный компаньон bit[N]"
+    )
+    parser.add_argument(
+        "--prefix", type=int, nargs="*", default=[], help="префиксы MRL, например 128 256"
+    )
+    parser.add_argument(
+        "--bulk",
+        type=int,
+        default=0,
+        help="загрузка через ingest_notes с указанным batch_size",
+    )
+    parser.add_argument(
+        "--pipeline",
+        type=int,
+        default=0,
+        help="загрузка через IngestPipeline с указанным числом потоков эмбеддинга",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="задержка запроса эмбеддингов в мс (имитация сетевого API)",
+    )
+    parser.add_argument(
+        "--many",
+        type=int,
+        default=0,
+        help="также прогнать запросы через search_many с указанным числом потоков",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = init_database(Path(tmp) / "bench.db")
+        database.connect()
+        database.create_tables([Category, Tag, Note, NoteChunk, NoteTag])
+        create_vector_table(
+            NoteChunk,
+            vector_column="embedding",
+            storage=args.storage,
+            binary=args.binary,
+            prefix_dimensions=tuple(args.prefix),
+        )
+        create_fts_table(Note, text_columns=["title", "content"])
+
+        embedder = (
+            LatencyEmbedder(args.latency / 1000) if args.latency else HashingEmbedder()
+        )
+        splitter = SimpleTextSplitter(chunk_size=1000, overlap=200)
+        corpus = build_corpus(args.notes, args.seed)
+
+        started = time.perf_counter()
+        if args.pipeline:
+            stats = IngestPipeline(
+                Note,
+                NoteChunk,
+                splitter,
+                embedder,
+                batch_size=args.bulk or 100,
+                embed_workers=args.pipeline,
+            ).run(iter(corpus))
+            for stage in stats.stages.values():
+                print(
+                    f"  стадия {stage.name:>5}: {stage.workers} воркер(ов), "
+                    f"{stage.chunks_per_second:.0f} чанков/с"
+                )
+            print(f"  узкое место: {stats.bottleneck}")
+        elif args.bulk:
+            ingest_notes(
+                Note, NoteChunk, iter(corpus), splitter, embedder, batch_size=args.bulk
+            )
+        else:
+            for note_data in corpus:
+                save_note_with_chunks(Note, NoteChunk, note_data, splitter, embedder)
+        ingest_seconds = time.perf_counter() - started
+
+        chunks = NoteChunk.select().count()
+        print(f"Индексация: {args.notes} заметок, {chunks} чанков за {ingest_seconds:.2f} с")
+        print(f"  {chunks / ingest_seconds:.0f} чанков/с")
+
+        searches = {
+            "vector": lambda q: vector_search_chunks(
+                Note, NoteChunk, q, limit=10, generator=embedder
+            ),
+            "fts": lambda q: fulltext_search_parents(Note, q, limit=10),
+            "hybrid": lambda q: hybrid_search_rrf(
+                Note, NoteChunk, q, limit=10, generator=embedder
+            ),
+        }
+
+        for name, search in searches.items():
+            latencies = [
+                timed(search, QUERIES[i % len(QUERIES)]) for i in range(args.queries)
+            ]
+            print(
+                f"Поиск {name:>6}: p50 {statistics.median(latencies):.2f} мс, "
+                f"p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} мс"
+            )
+
+        if args.many:
+            queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+            for mode in searches:
+                started = time.perf_counter()
+                for _ in search_many(
+                    Note,
+                    NoteChunk,
+                    queries,
+                    mode=mode,
+                    generator=embedder,
+                    workers=args.many,
+                ):
+                    pass
+                elapsed = (time.perf_counter() - started) * 1000
+                print(
+                    f"search_many {mode:>6}: {elapsed / args.queries:.2f} мс на запрос "
+                    f"({args.many} потока)"
+                )
+
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Микробенчмарк накладных расходов поиска на один запрос (без эмбеддингов).
+
+Эмбеддер заменен заглушкой с готовым вектором, поэтому время — это
+сборка SQL и параметров, выполнение запроса и загрузка заметок.
+Сравниваются два режима:
+
+- plan: план поиска берется из кэша (обычная работа);
+- rebuild: кэш планов очищается перед каждым запросом, SQL собирается
+  заново, как до появления планов.
+
+- hits: план из кэша и проекция fields=["title"] — SearchHit из
+  строк ранжирующего запроса, без загрузки заметок с content;
+- snippet: то же плюс фрагмент FTS5 snippet() (fts и hybrid).
+
+Отдельно замеряется чистая подготовка запроса (план + параметры) —
+та часть, которую убирает кэш.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.bench_search_plan --notes 2000 --queries 1000
+    python -m benchmarks.bench_search_plan --no-filter
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from semantic_core import (
+    init_database,
+    create_vector_table,
+    create_fts_table,
+    HashingEmbedder,
+    SimpleTextSplitter,
+    ingest_notes,
+    vector_search_chunks,
+    fulltext_search_parents,
+    hybrid_search_rrf,
+)
+from semantic_core.search_plan import clear_search_plans, get_search_plan
+from semantic_core.vector_index import (
+    candidate_kind,
+    candidate_params,
+    get_vector_index_config,
+)
+from domain.models import Note, NoteChunk, Category, Tag, NoteTag
+from benchmarks.bench_ingest_search import QUERIES, build_corpus
+
+
+class StubEmbedder:
+    """Эмбеддер запросов, возвращающий заранее посчитанные векторы."""
+
+    def __init__(self):
+        embedder = HashingEmbedder()
+        self.vectors = {query: embedder.embed_query(query) for query in QUERIES}
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def percentiles(timings: list[float]) -> str:
+    """p50 и p95 в микросекундах."""
+    return (
+        f"p50 {statistics.median(timings):7.1f} мкс, "
+        f"p95 {statistics.quantiles(timings, n=20)[-1]:7.1f} мкс"
+    )
+
+
+def measure(search, queries: int, rebuild: bool, **kwargs) -> list[float]:
+    """Время одного поиска в микросекундах."""
+    timings = []
+    for i in range(queries):
+        if rebuild:
+            clear_search_plans()
+        started = time.perf_counter()
+        search(QUERIES[i % len(QUERIES)], **kwargs)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--no-filter", action="store_true", help="поиск без фильтра по категории"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = init_database(Path(tmp) / "bench.db")
+        database.connect()
+        database.create_tables([Category, Tag, Note, NoteChunk, NoteTag])
+        create_vector_table(NoteChunk, vector_column="embedding")
+        create_fts_table(Note, text_columns=["title", "content"])
+
+        category = Category.create(name="Документация")
+        corpus = build_corpus(args.notes, args.seed)
+        for note_data in corpus:
+            note_data["category"] = category
+        ingest_notes(
+            Note,
+            NoteChunk,
+            iter(corpus),
+            SimpleTextSplitter(chunk_size=1000, overlap=200),
+            HashingEmbedder(),
+            batch_size=500,
+        )
+
+        embedder = StubEmbedder()
+        filters = {} if args.no_filter else {"category_id": category.id}
+
+        searches = {
+            "vector": lambda q, **kw: vector_search_chunks(
+                Note, NoteChunk, q, limit=10, generator=embedder, **filters, **kw
+            ),
+            "fts": lambda q, **kw: fulltext_search_parents(
+                Note, q, limit=10, **filters, **kw
+            ),
+            "hybrid": lambda q, **kw: hybrid_search_rrf(
+                Note, NoteChunk, q, limit=10, generator=embedder, **filters, **kw
+            ),
+        }
+
+        for name, search in searches.items():
+            variants = [
+                ("rebuild", True, {}),
+                ("plan", False, {}),
+                ("hits", False, {"fields": ["title"]}),
+            ]
+            if name != "vector":
+                variants.append(
+                    ("snippet", False, {"fields": ["title"], "snippet": True})
+                )
+            for label, rebuild, kwargs in variants:
+                timings = measure(search, args.queries, rebuild, **kwargs)
+                print(f"{name:>6} {label:>7}: {percentiles(timings)}")
+
+        # Только подготовка запроса: вид кандидатов, план, параметры
+        config = get_vector_index_config("note_chunks_vec")
+        vector = embedder.embed_query(QUERIES[0])
+        for rebuild in (True, False):
+            timings = []
+            for _ in range(args.queries):
+                if rebuild:
+                    clear_search_plans()
+                started = time.perf_counter()
+                kind = candidate_kind(config, 100)
+                plan = get_search_plan("hybrid", Note, NoteChunk, filters, config, kind)
+                plan.bind(
+                    filters,
+                    candidate_params(config, kind, vector, 100),
+                    query=QUERIES[0],
+                    k=60,
+                    limit=10,
+                )
+                timings.append((time.perf_counter() - started) * 1e6)
+            label = "rebuild" if rebuild else "plan"
+            print(f"подготовка hybrid {label:>7}: {percentiles(timings)}")
+
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
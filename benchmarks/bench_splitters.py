@@ -0,0 +1,74 @@
+"""
+Бенчмарк сплиттеров на большом Markdown-корпусе (без БД и эмбеддингов).
+
+Корпус — все doc/**/*.md, повторенные --repeat раз. Для каждого сплиттера
+печатаются время нарезки, число чанков, средний размер и качество
+границ: сколько чанков разрывают блок кода (нечетное число ```) и
+сколько начинаются посреди строки.
+
+Запуск (из корня репозитория):
+    python -m benchmarks.bench_splitters --repeat 20
+    python -m benchmarks.bench_splitters --chunk-size 1500 --overlap 300
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from semantic_core import MarkdownTextSplitter, SimpleTextSplitter, TokenTextSplitter
+
+
+def load_corpus(root: str, repeat: int) -> list[str]:
+    """Читает Markdown-файлы каталога (рекурсивно) repeat раз."""
+    documents = [
+        path.read_text(encoding="utf-8") for path in sorted(Path(root).rglob("*.md"))
+    ]
+    return documents * repeat
+
+
+def broken_fences(text: str) -> bool:
+    """Разрывает ли чанк блок кода: нечетное число заборов ```."""
+    return text.count("```") % 2 == 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", default="doc")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.root, args.repeat)
+    size = sum(len(document) for document in corpus)
+    print(f"Корпус: {len(corpus)} документов, {size / 1e6:.1f} млн символов")
+
+    splitters = {
+        "simple": SimpleTextSplitter(args.chunk_size, args.overlap),
+        "token": TokenTextSplitter(args.chunk_size // 4, args.overlap // 4),
+        "markdown": MarkdownTextSplitter(args.chunk_size, args.overlap),
+    }
+
+    for name, splitter in splitters.items():
+        started = time.perf_counter()
+        split = [(document, splitter.split_text(document)) for document in corpus]
+        seconds = time.perf_counter() - started
+
+        texts = [chunk.text for _, chunks in split for chunk in chunks]
+        mid_line = sum(
+            1
+            for document, chunks in split
+            for chunk in chunks
+            if chunk.start and document[chunk.start - 1] != "\n"
+        )
+        print(
+            f"{name:>9}: {seconds * 1000:8.1f} мс, {len(texts):6d} чанков, "
+            f"средний {statistics.mean(map(len, texts)):5.0f} симв., "
+            f"разорванных блоков кода {sum(map(broken_fences, texts))}, "
+            f"начало посреди строки {mid_line}"
+        )
+
+
+if __name__ == "__main__":
+    main()
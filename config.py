@@ -3,9 +3,15 @@
 
 Автоматически загружает переменные окружения из .env файла
 и выполняет валидацию настроек.
+
+Settings() создается при первом обращении к атрибуту settings,
+а не при импорте: импорт пакета не читает .env и окружение.
 """
 
+from functools import lru_cache
 from pathlib import Path
+from typing import Literal, Optional
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,18 +21,37 @@ class Settings(BaseSettings):
     Основные настройки приложения.
 
     Attributes:
-        gemini_api_key: API ключ для Google Gemini (обязательный)
+        gemini_api_key: API ключ для Google Gemini (нужен для провайдера "gemini")
         sqlite_db_path: Путь к файлу SQLite базы данных
+        embedding_provider: Провайдер эмбеддингов ("gemini" или "local")
         embedding_model: Модель для генерации эмбеддингов
         embedding_dimension: Размерность векторов (768 для MRL)
+        embedding_cache_enabled: Включает персистентный кэш эмбеддингов
+            (таблица embedding_cache) для генераторов без явного cache
+        embedding_cache_size: Максимальное количество записей в кэше эмбеддингов
+        query_cache_enabled: Включает in-process кэш эмбеддингов запросов
+        query_cache_size: Максимальное количество запросов в кэше
+        query_cache_ttl: Время жизни записи кэша запросов (секунды)
+        embedding_max_concurrency: Максимум одновременных асинхронных запросов
+        embedding_timeout: Таймаут одного запроса к API эмбеддингов (секунды)
+        embedding_requests_per_minute: Квота запросов к API в минуту
+        embedding_tokens_per_minute: Квота токенов к API в минуту
+        embedding_max_retries: Максимум повторов при временных ошибках API
     """
 
-    gemini_api_key: str = Field(..., description="API ключ для Google Gemini AI Studio")
+    gemini_api_key: Optional[str] = Field(
+        default=None, description="API ключ для Google Gemini AI Studio"
+    )
 
     sqlite_db_path: Path = Field(
         default=Path("./vector_store.db"), description="Путь к файлу базы данных SQLite"
     )
 
+    embedding_provider: Literal["gemini", "local"] = Field(
+        default="gemini",
+        description="Провайдер эмбеддингов: gemini (API) или local (без сети)",
+    )
+
     embedding_model: str = Field(
         default="models/text-embedding-004", description="Модель Gemini для эмбеддингов"
     )
@@ -35,6 +60,46 @@ class Settings(BaseSettings):
         default=768, description="Размерность векторов (768 для MRL режима)"
     )
 
+    embedding_cache_enabled: bool = Field(
+        default=True, description="Кэшировать эмбеддинги документов в SQLite"
+    )
+
+    embedding_cache_size: int = Field(
+        default=1_000_000, gt=0, description="Максимум записей в кэше эмбеддингов (LRU)"
+    )
+
+    query_cache_enabled: bool = Field(
+        default=True, description="Кэшировать эмбеддинги поисковых запросов в памяти"
+    )
+
+    query_cache_size: int = Field(
+        default=1024, gt=0, description="Максимум запросов в кэше (LRU)"
+    )
+
+    query_cache_ttl: float = Field(
+        default=3600.0, gt=0, description="Время жизни записи кэша запросов, секунды"
+    )
+
+    embedding_max_concurrency: int = Field(
+        default=8, gt=0, description="Максимум одновременных асинхронных запросов"
+    )
+
+    embedding_timeout: float = Field(
+        default=30.0, gt=0, description="Таймаут одного запроса эмбеддингов, секунды"
+    )
+
+    embedding_requests_per_minute: Optional[int] = Field(
+        default=None, gt=0, description="Квота запросов в минуту (None — без лимита)"
+    )
+
+    embedding_tokens_per_minute: Optional[int] = Field(
+        default=None, gt=0, description="Квота токенов в минуту (None — без лимита)"
+    )
+
+    embedding_max_retries: int = Field(
+        default=5, ge=0, description="Максимум повторов при 429/5xx/таймаутах"
+    )
+
     @field_validator("sqlite_db_path", mode="before")
     @classmethod
     def resolve_db_path(cls, v) -> Path:
@@ -50,5 +115,31 @@ class Settings(BaseSettings):
     )
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Возвращает экземпляр настроек, создавая его при первом вызове.
+
+    Returns:
+        Settings: Общий для процесса экземпляр настроек
+    """
+    return Settings()
+
+
+class _LazySettings:
+    """Прокси к get_settings(): читает .env и окружение при первом обращении."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(get_settings(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(get_settings())
+
+
 # Глобальный экземпляр настроек (ленивая инициализация)
-settings = Settings()
+settings: Settings = _LazySettings()  # type: ignore[assignment]
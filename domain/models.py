@@ -24,6 +24,7 @@ from peewee import (
 )
 
 from semantic_core import db
+from semantic_core.status import ChunkStatus
 
 
 class BaseModel(Model):
@@ -179,6 +180,17 @@ class NoteChunk(BaseModel):
         note: Ссылка на родительскую заметку
         chunk_index: Порядковый номер чанка (0, 1, 2...)
         content: Текст этого фрагмента
+        start_offset: Начало фрагмента в Note.content (символы; NULL у старых
+            чанков)
+        end_offset: Конец фрагмента в Note.content (не включительно)
+        content_hash: SHA-256 векторизуемого текста (контекст + фрагмент);
+            по нему при обновлении заметки переиспользуются векторы
+        breadcrumb: "Заметка > Раздел > Подраздел" — добавляется к чанку
+            при векторизации вместо контекста заметки (NULL — контекст заметки)
+        status: Статус векторизации (PENDING/PROCESSING/DONE/FAILED)
+        claimed_at: Когда чанк захвачен воркером (для возврата зависших)
+        attempts: Количество попыток векторизации
+        last_error: Последняя ошибка векторизации
         created_at: Дата создания чанка
     """
 
@@ -191,6 +203,16 @@ class NoteChunk(BaseModel):
     )
     chunk_index = IntegerField()  # Позиция в документе
     content = TextField()  # Текст фрагмента
+    # Смещения в Note.content: поиск отдает их для подсветки без Note.content
+    start_offset = IntegerField(null=True)
+    end_offset = IntegerField(null=True)
+    content_hash = CharField(max_length=64, null=True)  # NULL у старых чанков
+    breadcrumb = TextField(null=True)  # Контекст при context="breadcrumb"
+    # Отложенная векторизация (save_note_with_chunks(mode="deferred"))
+    status = CharField(max_length=16, default=ChunkStatus.DONE, index=True)
+    claimed_at = DateTimeField(null=True)
+    attempts = IntegerField(default=0)
+    last_error = TextField(null=True)
     created_at = DateTimeField(default=datetime.now)
 
     class Meta:
@@ -15,13 +15,20 @@ from pathlib import Path
 from semantic_core import (
     init_database,
     EmbeddingGenerator,
-    SimpleTextSplitter,
-    save_note_with_chunks,
+    EmbeddingCache,
+    TokenTextSplitter,
+    DirectoryIngester,
     vector_search_chunks,
     fulltext_search_parents,
     hybrid_search_rrf,
 )
-from semantic_core.database import create_vector_table, create_fts_table
+from semantic_core.database import (
+    add_missing_columns,
+    create_vector_table,
+    create_fts_table,
+    create_embedding_cache_table,
+    create_manifest_table,
+)
 from domain.models import Note, NoteChunk, Category, Tag, NoteTag
 
 
@@ -35,12 +42,18 @@ def initialize_database():
 
     # Создаем обычные таблицы
     db.create_tables([Category, Tag, Note, NoteChunk, NoteTag], safe=True)
+    # Базы от прошлых версий: догоняем новые колонки (content_hash у чанков)
+    add_missing_columns(NoteChunk)
 
     # Создаем виртуальные таблицы для поиска
     # Векторы теперь хранятся в NoteChunk, а не в Note!
     create_vector_table(NoteChunk, vector_column="embedding")
     # FTS остается на родительской таблице Note
     create_fts_table(Note, text_columns=["title", "content"])
+    # Кэш эмбеддингов: повторный seed не платит за неизменившиеся чанки
+    create_embedding_cache_table()
+    # Манифест загруженных файлов: повторный seed пропускает неизменившиеся
+    create_manifest_table()
 
     print("✅ База данных готова!")
     print("   → Note (parent) - для полнотекстового поиска")
@@ -49,59 +62,49 @@ def initialize_database():
 
 
 def seed_data():
-    """Заполняет БД реальными документами из doc/architecture/."""
-    print("🌱 Загрузка документов из doc/architecture/...")
+    """
+    Синхронизирует БД с документами из doc/architecture/.
+
+    Манифест загруженных файлов хранится в БД: неизменившиеся файлы
+    пропускаются без чтения, измененные переиндексируются по чанкам,
+    удаленные — удаляются, прерванная загрузка продолжается с места остановки.
+    """
+    print("🌱 Синхронизация документов из doc/architecture/...")
 
-    # Создаем категорию
-    cat_docs = Category.create(name="Документация")
+    category, _ = Category.get_or_create(name="Документация")
 
     # Инициализируем инструменты
-    generator = EmbeddingGenerator()
-    splitter = SimpleTextSplitter(
-        chunk_size=1000,  # ~250 токенов
-        overlap=200,  # Перекрытие для контекста
+    generator = EmbeddingGenerator(cache=EmbeddingCache(create_table=False))
+    splitter = TokenTextSplitter(
+        max_tokens=450,  # Бюджет токенов чанка вместо ~1000 символов
+        overlap_tokens=90,  # Перекрытие для контекста
         threshold=100,  # Окно поиска переноса строки
     )
+    ingester = DirectoryIngester(
+        Note,
+        NoteChunk,
+        splitter,
+        generator,
+        make_note=lambda path, text: {
+            "title": path.stem.replace("_", " ").title(),
+            "content": text,
+            "category": category,
+        },
+    )
 
-    # Загружаем все markdown файлы
-    docs_dir = Path("doc/architecture")
-    md_files = sorted(docs_dir.glob("*.md"))
-
-    total_chunks = 0
-
-    for md_file in md_files:
-        # Читаем содержимое
-        content = md_file.read_text(encoding="utf-8")
-        title = md_file.stem.replace("_", " ").title()
-
-        # Формируем данные заметки
-        note_data = {
-            "title": title,
-            "content": content,
-            "category": cat_docs,
-        }
-
-        # Сохраняем с автоматической нарезкой
-        note = save_note_with_chunks(
-            note_model=Note,
-            chunk_model=NoteChunk,
-            note_data=note_data,
-            splitter=splitter,
-            generator=generator,
-        )
-
-        chunks_count = note.chunks.count()
-        total_chunks += chunks_count
-
-        print(
-            f"  ✓ {note.title[:40]:40} | {len(content):>6} символов | {chunks_count:>2} чанков"
-        )
+    stats = ingester.sync(Path("doc/architecture"))
 
-    print(f"\n✅ Загружено {len(md_files)} документов, создано {total_chunks} чанков")
     print(
-        f"   Средний размер документа: {sum(len(f.read_text()) for f in md_files) / len(md_files):.0f} символов"
+        f"\n✅ Файлов: {stats.scanned} | новых: {stats.added}, "
+        f"обновлено: {stats.updated}, без изменений: {stats.unchanged}, "
+        f"удалено: {stats.deleted}"
+    )
+    print(f"   Записано чанков: {stats.chunks} за {stats.elapsed:.1f} с")
+    cache_stats = generator.cache.stats
+    print(
+        f"   Кэш эмбеддингов: {cache_stats.hits} попаданий, {cache_stats.misses} промахов "
+        f"({cache_stats.hit_rate:.0%})\n"
     )
-    print(f"   Среднее количество чанков: {total_chunks / len(md_files):.1f}\n")
 
 
 def test_vector_search():
@@ -192,22 +195,17 @@ def main():
     # Инициализация
     db = initialize_database()
 
-    # Загрузка реальных документов
-    if Note.select().count() == 0 or NoteChunk.select().count() == 0:
-        # Очищаем старые данные если есть
-        if Note.select().count() > 0:
-            print("⚠️  Обнаружены старые данные без чанков, очищаем...\n")
-            NoteTag.delete().execute()
-            NoteChunk.delete().execute()
-            Note.delete().execute()
-            Tag.delete().execute()
-            Category.delete().execute()
-
-        seed_data()
-    else:
-        notes_count = Note.select().count()
-        chunks_count = NoteChunk.select().count()
-        print(f"ℹ️  База содержит {notes_count} документов и {chunks_count} чанков\n")
+    # Загрузка реальных документов: старые данные без чанков очищаем
+    if Note.select().count() > 0 and NoteChunk.select().count() == 0:
+        print("⚠️  Обнаружены старые данные без чанков, очищаем...\n")
+        NoteTag.delete().execute()
+        Note.delete().execute()
+        Tag.delete().execute()
+        Category.delete().execute()
+        db.execute_sql("DELETE FROM source_manifest")
+
+    # Повторный запуск дочитывает только новые и измененные файлы
+    seed_data()
 
     # Запускаем тесты
     test_vector_search()
@@ -3,54 +3,164 @@ Semantic Core - переносимое ядро для семантическо
 
 Этот пакет обеспечивает:
 - Инициализацию SQLite с расширением sqlite-vec
-- Генерацию эмбеддингов через Google Gemini API
+- Хранение векторов в float32 или int8 с точным пересчетом кандидатов
+- Генерацию эмбеддингов через Google Gemini API (синхронно и asyncio)
+- Локальный детерминированный эмбеддер для работы без сети
+- Персистентный кэш эмбеддингов в SQLite и in-process кэш запросов
+- Склейку одинаковых одновременных запросов эмбеддингов (single-flight)
 - Нарезку текста на чанки с перекрытием
 - Сервисный слой для работы с Parent-Child документами
+- Потоковую массовую загрузку заметок пачками и параллельный конвейер загрузки
+- Отложенную векторизацию чанков фоновым воркером
+- Возобновляемую загрузку каталогов файлов с манифестом
+- Проверку согласованности векторного индекса и возврат места в файле базы
+- Кэш планов поиска: SQL строится один раз на набор фильтров
+- Пакетный поиск тысяч запросов с пакетной векторизацией
+- Компактные результаты поиска (SearchHit) без загрузки заметок
 - Миксин для добавления hybrid search в любую Peewee модель
+
+Экспорты загружаются лениво (PEP 562): `import semantic_core` не импортирует
+подмодули, NumPy и SDK провайдеров, а `from semantic_core import X`
+импортирует только модуль, в котором определен X.
 """
 
-from semantic_core.database import (
-    db,
-    init_database,
-    create_vector_table,
-    create_fts_table,
-)
-from semantic_core.embeddings import EmbeddingGenerator
-from semantic_core.search_mixin import HybridSearchMixin
-from semantic_core.text_processing import (
-    TextSplitter,
-    Chunk,
-    SimpleTextSplitter,
-)
-from semantic_core.services import (
-    save_note_with_chunks,
-    delete_note_with_chunks,
-)
-from semantic_core.search import (
-    vector_search_chunks,
-    fulltext_search_parents,
-    hybrid_search_rrf,
-)
-
-__all__ = [
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from semantic_core.database import (
+        db,
+        init_database,
+        create_vector_table,
+        create_fts_table,
+        create_embedding_cache_table,
+    )
+    from semantic_core.vector_index import VectorIndexConfig, calibrate_vector_index
+    from semantic_core.embeddings import (
+        Embedder,
+        EmbeddingGenerator,
+        EmbeddingScheduler,
+        create_embedder,
+    )
+    from semantic_core.local_embeddings import HashingEmbedder
+    from semantic_core.async_embeddings import AsyncEmbeddingGenerator
+    from semantic_core.embedding_cache import (
+        EmbeddingCache,
+        QueryEmbeddingCache,
+        CacheStats,
+    )
+    from semantic_core.coalescing import SingleFlight, AsyncSingleFlight
+    from semantic_core.search_mixin import HybridSearchMixin
+    from semantic_core.text_processing import (
+        TextSplitter,
+        Chunk,
+        SimpleTextSplitter,
+        TokenEstimator,
+        TokenTextSplitter,
+        MarkdownTextSplitter,
+    )
+    from semantic_core.services import (
+        save_note_with_chunks,
+        delete_note_with_chunks,
+        delete_notes_with_chunks,
+        ingest_notes,
+        IngestStats,
+        ChunkSyncStats,
+    )
+    from semantic_core.status import ChunkStatus
+    from semantic_core.worker import EmbeddingWorker, WorkerStats
+    from semantic_core.pipeline import IngestPipeline, PipelineStats, StageStats
+    from semantic_core.directory import DirectoryIngester, DirectoryStats
+    from semantic_core.maintenance import (
+        check_vector_consistency,
+        repair_vector_consistency,
+        reclaim_space,
+        ConsistencyReport,
+        SpaceReport,
+    )
+    from semantic_core.search import (
+        vector_search_chunks,
+        fulltext_search_parents,
+        hybrid_search_rrf,
+        SearchHit,
+    )
+    from semantic_core.search_plan import SearchPlan, get_search_plan
+    from semantic_core.batch_search import search_many
+
+# Имя экспорта → модуль, в котором он определен
+_EXPORTS = {
     # Database
-    "db",
-    "init_database",
-    "create_vector_table",
-    "create_fts_table",
+    "db": "semantic_core.database",
+    "init_database": "semantic_core.database",
+    "create_vector_table": "semantic_core.database",
+    "create_fts_table": "semantic_core.database",
+    "create_embedding_cache_table": "semantic_core.database",
+    "VectorIndexConfig": "semantic_core.vector_index",
+    "calibrate_vector_index": "semantic_core.vector_index",
     # Embeddings
-    "EmbeddingGenerator",
+    "Embedder": "semantic_core.embeddings",
+    "create_embedder": "semantic_core.embeddings",
+    "EmbeddingGenerator": "semantic_core.embeddings",
+    "HashingEmbedder": "semantic_core.local_embeddings",
+    "AsyncEmbeddingGenerator": "semantic_core.async_embeddings",
+    "EmbeddingScheduler": "semantic_core.embeddings",
+    "EmbeddingCache": "semantic_core.embedding_cache",
+    "QueryEmbeddingCache": "semantic_core.embedding_cache",
+    "CacheStats": "semantic_core.embedding_cache",
+    "SingleFlight": "semantic_core.coalescing",
+    "AsyncSingleFlight": "semantic_core.coalescing",
     # Search (legacy mixin)
-    "HybridSearchMixin",
+    "HybridSearchMixin": "semantic_core.search_mixin",
     # Search (Parent-Child functions)
-    "vector_search_chunks",
-    "fulltext_search_parents",
-    "hybrid_search_rrf",
+    "vector_search_chunks": "semantic_core.search",
+    "fulltext_search_parents": "semantic_core.search",
+    "hybrid_search_rrf": "semantic_core.search",
+    "SearchHit": "semantic_core.search",
+    "SearchPlan": "semantic_core.search_plan",
+    "get_search_plan": "semantic_core.search_plan",
+    "search_many": "semantic_core.batch_search",
     # Text processing
-    "TextSplitter",
-    "Chunk",
-    "SimpleTextSplitter",
+    "TextSplitter": "semantic_core.text_processing",
+    "Chunk": "semantic_core.text_processing",
+    "SimpleTextSplitter": "semantic_core.text_processing",
+    "TokenEstimator": "semantic_core.text_processing",
+    "TokenTextSplitter": "semantic_core.text_processing",
+    "MarkdownTextSplitter": "semantic_core.text_processing",
     # Services
-    "save_note_with_chunks",
-    "delete_note_with_chunks",
-]
+    "save_note_with_chunks": "semantic_core.services",
+    "delete_note_with_chunks": "semantic_core.services",
+    "delete_notes_with_chunks": "semantic_core.services",
+    "ingest_notes": "semantic_core.services",
+    "IngestStats": "semantic_core.services",
+    "ChunkSyncStats": "semantic_core.services",
+    "ChunkStatus": "semantic_core.status",
+    "EmbeddingWorker": "semantic_core.worker",
+    "WorkerStats": "semantic_core.worker",
+    "IngestPipeline": "semantic_core.pipeline",
+    "PipelineStats": "semantic_core.pipeline",
+    "StageStats": "semantic_core.pipeline",
+    "DirectoryIngester": "semantic_core.directory",
+    "DirectoryStats": "semantic_core.directory",
+    "check_vector_consistency": "semantic_core.maintenance",
+    "repair_vector_consistency": "semantic_core.maintenance",
+    "reclaim_space": "semantic_core.maintenance",
+    "ConsistencyReport": "semantic_core.maintenance",
+    "SpaceReport": "semantic_core.maintenance",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    """Импортирует экспорт при первом обращении и кэширует его в модуле."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,278 @@
+"""
+Асинхронный генератор эмбеддингов через Google Gemini API.
+
+Позволяет asyncio-сервисам выполнять поиск без выноса каждого запроса
+в отдельный поток, а массовой индексации — держать в полете сотни
+пакетных запросов одновременно.
+
+Классы:
+    AsyncEmbeddingGenerator
+        Асинхронная версия EmbeddingGenerator с ограничением параллелизма.
+
+        Методы:
+            aembed_document(text: str) -> np.ndarray
+                Генерирует эмбеддинг документа.
+            aembed_query(text: str) -> np.ndarray
+                Генерирует эмбеддинг запроса (с кэшем запросов).
+            aembed_documents(texts: Sequence[str]) -> np.ndarray
+                Генерирует эмбеддинги документов параллельными пакетами.
+            aembed_queries(texts: Sequence[str]) -> np.ndarray
+                Генерирует эмбеддинги запросов параллельными пакетами.
+"""
+
+import asyncio
+from typing import Sequence
+
+import numpy as np
+
+from config import settings
+from semantic_core.coalescing import AsyncSingleFlight, get_default_async_single_flight
+from semantic_core.embeddings import (
+    EmbeddingGenerator,
+    TaskType,
+    estimate_tokens,
+    import_genai,
+)
+
+
+class AsyncEmbeddingGenerator(EmbeddingGenerator):
+    """
+    Асинхронный генератор эмбеддингов с ограничением одновременных запросов.
+
+    Наследует от EmbeddingGenerator нарезку на пакеты, нормализацию,
+    кэши и конвертацию в BLOB, поэтому векторы полностью совместимы
+    с синхронной версией. Синхронные методы тоже остаются доступны.
+
+    Каждый HTTP-запрос выполняется под семафором и с собственным таймаутом:
+    при таймауте или отмене вызывающей корутины запрос отменяется,
+    а слот семафора освобождается.
+
+    Одинаковые одновременные aembed_query/aembed_document склеиваются
+    через AsyncSingleFlight: корутины ждут один запрос к API.
+
+    Attributes:
+        max_concurrency: Максимум одновременных запросов к API
+        timeout: Таймаут одного запроса в секундах (None — без таймаута)
+        async_single_flight: Склейка одновременных запросов (None — отключена)
+    """
+
+    def __init__(
+        self,
+        *args,
+        max_concurrency: int | None = None,
+        timeout: float | None = None,
+        async_single_flight: AsyncSingleFlight | bool | None = None,
+        **kwargs,
+    ):
+        """
+        Инициализация асинхронного генератора.
+
+        Args:
+            *args: Аргументы EmbeddingGenerator
+            max_concurrency: Максимум одновременных запросов
+                (по умолчанию settings.embedding_max_concurrency)
+            timeout: Таймаут одного запроса в секундах
+                (по умолчанию settings.embedding_timeout)
+            async_single_flight: Склейка одинаковых одновременных запросов.
+                None — общая для процесса, False — отключена,
+                экземпляр — собственная
+            **kwargs: Именованные аргументы EmbeddingGenerator
+
+        Raises:
+            ValueError: Если max_concurrency <= 0
+        """
+        super().__init__(*args, **kwargs)
+
+        self.max_concurrency = max_concurrency or settings.embedding_max_concurrency
+        if self.max_concurrency <= 0:
+            raise ValueError(
+                f"max_concurrency должен быть > 0, получено: {self.max_concurrency}"
+            )
+
+        self.timeout = timeout if timeout is not None else settings.embedding_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if async_single_flight is None or async_single_flight is True:
+            self.async_single_flight = get_default_async_single_flight()
+        elif async_single_flight is False:
+            self.async_single_flight = None
+        else:
+            self.async_single_flight = async_single_flight
+
+    async def aembed_document(self, text: str) -> np.ndarray:
+        """
+        Асинхронно генерирует эмбеддинг документа.
+
+        Args:
+            text: Текст документа
+
+        Returns:
+            np.ndarray: Нормализованный вектор размерности self.dimension
+
+        Examples:
+            >>> gen = AsyncEmbeddingGenerator()
+            >>> vec = await gen.aembed_document("Python - язык программирования")
+        """
+        return await self._agenerate_embedding(text, task_type="RETRIEVAL_DOCUMENT")
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        """
+        Асинхронно генерирует эмбеддинг поискового запроса.
+
+        При включенном query_cache повторный запрос не обращается к API.
+
+        Args:
+            text: Текст запроса
+
+        Returns:
+            np.ndarray: Нормализованный вектор размерности self.dimension
+
+        Examples:
+            >>> gen = AsyncEmbeddingGenerator()
+            >>> vec = await gen.aembed_query("как написать цикл в питоне?")
+        """
+        if self.query_cache is None:
+            return await self._agenerate_embedding(text, task_type="RETRIEVAL_QUERY")
+
+        key = self.query_cache.make_key(self.model_name, self.dimension, text)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = await self._agenerate_embedding(text, task_type="RETRIEVAL_QUERY")
+        return self.query_cache.put(key, embedding)
+
+    async def aembed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Асинхронно генерирует эмбеддинги документов.
+
+        Пакеты отправляются параллельно (не больше max_concurrency
+        одновременно), результат собирается в исходном порядке.
+
+        Args:
+            texts: Тексты документов
+
+        Returns:
+            np.ndarray: Матрица (len(texts), self.dimension)
+
+        Examples:
+            >>> gen = AsyncEmbeddingGenerator(max_concurrency=16)
+            >>> matrix = await gen.aembed_documents(chunk_texts)
+        """
+        return await self._agenerate_embeddings(texts, task_type="RETRIEVAL_DOCUMENT")
+
+    async def aembed_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Асинхронно генерирует эмбеддинги поисковых запросов.
+
+        Args:
+            texts: Тексты запросов
+
+        Returns:
+            np.ndarray: Матрица (len(texts), self.dimension)
+        """
+        return await self._agenerate_embeddings(texts, task_type="RETRIEVAL_QUERY")
+
+    async def _agenerate_embedding(self, text: str, task_type: TaskType) -> np.ndarray:
+        """
+        Асинхронно генерирует эмбеддинг одного текста со склейкой запросов.
+
+        Raises:
+            ValueError: Если текст пустой
+            RuntimeError: Если API вернул ошибку или истек таймаут
+        """
+        if self.async_single_flight is None:
+            matrix = await self._agenerate_embeddings([text], task_type)
+            return matrix[0]
+
+        # Валидируем до склейки, чтобы пустой текст не занимал ключ
+        self._validate_texts([text])
+
+        matrix = await self.async_single_flight.do(
+            self._flight_key(text, task_type),
+            lambda: self._agenerate_embeddings([text], task_type),
+        )
+        return matrix[0].copy()
+
+    async def _agenerate_embeddings(
+        self, texts: Sequence[str], task_type: TaskType
+    ) -> np.ndarray:
+        """
+        Асинхронная версия _generate_embeddings.
+
+        Raises:
+            ValueError: Если хотя бы один текст пустой
+            RuntimeError: Если API вернул ошибку или истек таймаут
+        """
+        texts = self._validate_texts(texts)
+
+        # Кэш в SQLite — блокирующий ввод-вывод, уводим его из event loop
+        if self.cache is not None:
+            matrix, keys, missing = await asyncio.to_thread(
+                self._lookup_cache, texts, task_type
+            )
+        else:
+            matrix, keys, missing = self._lookup_cache(texts, task_type)
+
+        if not missing:
+            return matrix
+
+        missing_texts = [texts[i] for i in missing]
+        computed = np.empty((len(missing), self.dimension), dtype=np.float32)
+
+        async def fill(start: int, end: int) -> None:
+            computed[start:end] = await self._arequest_batch(
+                missing_texts[start:end], task_type
+            )
+
+        # TaskGroup отменяет остальные пакеты, если один из них упал
+        try:
+            async with asyncio.TaskGroup() as group:
+                for start, end in self._iter_batches(missing_texts):
+                    group.create_task(fill(start, end))
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self._store_computed, matrix, keys, missing, computed
+            )
+        else:
+            self._store_computed(matrix, keys, missing, computed)
+
+        return matrix
+
+    async def _arequest_batch(self, texts: list[str], task_type: TaskType) -> np.ndarray:
+        """
+        Выполняет один асинхронный запрос batchEmbedContents.
+
+        Каждая попытка (включая повторы планировщика) занимает слот семафора
+        и получает собственный таймаут, который отсчитывается только после
+        получения слота, поэтому ожидание в очереди не съедает время запроса.
+
+        Raises:
+            RuntimeError: Если API вернул ошибку или истек таймаут
+                (после всех повторов)
+        """
+        async def attempt() -> dict:
+            async with self._semaphore:
+                async with asyncio.timeout(self.timeout):
+                    return await import_genai().embed_content_async(
+                        model=self.model_name,
+                        content=texts,
+                        task_type=task_type,
+                        output_dimensionality=self.dimension,
+                    )
+
+        try:
+            result = await self.scheduler.acall(
+                attempt, tokens=estimate_tokens(texts)
+            )
+        except TimeoutError as e:
+            raise RuntimeError(
+                f"Превышен таймаут запроса эмбеддингов ({self.timeout} с)"
+            ) from e
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при пакетной генерации эмбеддингов: {e}")
+
+        return np.asarray(result["embedding"], dtype=np.float32)
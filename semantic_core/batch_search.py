@@ -0,0 +1,253 @@
+"""
+Пакетный поиск: тысячи запросов за один вызов.
+
+Офлайн-оценка качества и подбор похожих материалов отправляют много
+запросов подряд. search_many() обрабатывает их пачками:
+
+1. Запросы пачки векторизуются одним вызовом embed_queries()
+2. План поиска (search_plan) и конфигурация векторной таблицы
+   берутся один раз на весь вызов
+3. SQL выполняется на одном переиспользуемом курсоре или, при
+   workers > 1, в нескольких потоках со своими соединениями (WAL
+   допускает параллельных читателей; sqlite3 отпускает GIL на время
+   выполнения запроса)
+4. Заметки всей пачки загружаются одним запросом (с fields=...
+   заметки не загружаются: результаты — SearchHit из строк запроса)
+
+Результаты отдаются генератором в порядке входных запросов по мере
+готовности пачек, поэтому вход и выход не держатся в памяти целиком.
+
+Функции:
+    search_many(parent_model, chunk_model, queries, mode, ...) -> Iterator
+        Пакетный векторный, полнотекстовый или гибридный поиск.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+from peewee import Model
+
+from semantic_core.database import db
+from semantic_core.embeddings import Embedder, create_embedder
+from semantic_core.search import SearchResults, finish_results
+from semantic_core.search_plan import SEARCH_MODES, SearchPlan, get_search_plan
+from semantic_core.vector_index import (
+    candidate_kind,
+    candidate_params,
+    get_vector_index_config,
+)
+
+
+# Маркер остановки потоков-читателей
+_DONE = object()
+
+
+def search_many(
+    parent_model: Model,
+    chunk_model: Model,
+    queries: Iterable[str],
+    mode: str = "vector",
+    limit: int = 10,
+    k: int = 60,
+    generator: Optional[Embedder] = None,
+    batch_size: int = 64,
+    workers: int = 1,
+    binary: Optional[bool] = None,
+    oversample: Optional[int] = None,
+    prefix_dimension: Optional[int] = None,
+    shortlist: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+    snippet: bool = False,
+    **filters,
+) -> Iterator[SearchResults]:
+    """
+    Выполняет поиск для каждого запроса из queries.
+
+    Проверки параметров и построение плана выполняются сразу при вызове;
+    запросы читаются и выполняются по мере чтения результатов.
+
+    Результат для каждого запроса тот же, что у vector_search_chunks,
+    fulltext_search_parents или hybrid_search_rrf с теми же параметрами.
+
+    Args:
+        parent_model: Класс модели Note
+        chunk_model: Класс модели NoteChunk
+        queries: Запросы (итератор читается лениво, пачками)
+        mode: "vector", "fts" или "hybrid"
+        limit: Максимум заметок на запрос
+        k: Параметр RRF (для hybrid)
+        generator: Эмбеддер (по умолчанию create_embedder(); для fts не нужен)
+        batch_size: Запросов в пачке (один вызов embed_queries на пачку)
+        workers: Потоков для выполнения SQL; при workers > 1 каждый поток
+            открывает свое соединение и не видит незакоммиченных изменений
+            вызывающего потока (база должна быть файловой)
+        binary: Как в vector_search_chunks
+        oversample: Как в vector_search_chunks
+        prefix_dimension: Как в vector_search_chunks
+        shortlist: Как в vector_search_chunks
+        fields: Проекция, как в vector_search_chunks: вместо загрузки
+            заметок результаты — списки SearchHit
+        snippet: Фрагменты FTS5 в SearchHit, как в fulltext_search_parents
+            (только для fts и hybrid)
+        **filters: Фильтры для родительской модели (например, category_id=5)
+
+    Returns:
+        Iterator[SearchResults]: Результаты запросов в порядке
+        входа: (заметка, distance), (заметка, bm25_rank)
+        или (заметка, rrf_score); при заданных fields или snippet —
+        List[SearchHit]
+
+    Raises:
+        ValueError: Если режим неизвестен, batch_size < 1, workers < 1
+            или snippet запрошен для mode="vector"
+
+    Example:
+        >>> questions = (row["question"] for row in eval_set)
+        >>> for question, results in zip(
+        ...     questions, search_many(Note, NoteChunk, questions, mode="hybrid")
+        ... ):
+        ...     print(question, [note.id for note, _ in results])
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(
+            f"Неизвестный режим поиска: {mode!r}. Допустимые: {SEARCH_MODES}"
+        )
+    if batch_size < 1:
+        raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+    if workers < 1:
+        raise ValueError(f"workers должен быть > 0, получено: {workers}")
+    if snippet and mode == "vector":
+        raise ValueError("snippet доступен только для mode='fts' и 'hybrid'")
+
+    vector_config = kind = None
+    if mode != "fts":
+        if generator is None:
+            generator = create_embedder()
+        vector_config = get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
+        kind = candidate_kind(vector_config, limit * 10, binary, prefix_dimension)
+    plan = get_search_plan(
+        mode,
+        parent_model,
+        chunk_model,
+        filters,
+        vector_config,
+        kind,
+        fields or (),
+        snippet,
+    )
+
+    def bind(query: str, vector) -> list:
+        candidates = (
+            ()
+            if vector is None
+            else candidate_params(
+                vector_config, kind, vector, limit * 10, oversample, shortlist
+            )
+        )
+        return plan.bind(filters, candidates, query=query, k=k, limit=limit)
+
+    # Проверки выше выполняются сразу при вызове, а не при первом next()
+    return _search_batches(
+        parent_model,
+        plan,
+        iter(queries),
+        bind,
+        generator,
+        batch_size,
+        workers,
+        fields is not None or snippet,
+    )
+
+
+def _search_batches(
+    parent_model: Model,
+    plan: SearchPlan,
+    queries: Iterator[str],
+    bind: Callable[[str, Any], list],
+    generator: Optional[Embedder],
+    batch_size: int,
+    workers: int,
+    hits: bool,
+) -> Iterator[SearchResults]:
+    """Генератор результатов search_many: пачка за пачкой."""
+    runner = _ThreadedRunner(plan, workers) if workers > 1 else _CursorRunner(plan)
+    try:
+        while batch := list(islice(queries, batch_size)):
+            vectors = (
+                [None] * len(batch)
+                if plan.mode == "fts"
+                else generator.embed_queries(batch)
+            )
+            params = [bind(query, vector) for query, vector in zip(batch, vectors)]
+            yield from finish_results(parent_model, plan, runner.run(params), hits)
+    finally:
+        runner.close()
+
+
+class _CursorRunner:
+    """Выполняет запросы плана по очереди на одном курсоре."""
+
+    def __init__(self, plan: SearchPlan):
+        self.plan = plan
+        self.cursor = db.obj.cursor()
+
+    def run(self, params: List[list]) -> List[List[tuple]]:
+        """Строки результата для каждого набора параметров."""
+        return [self.cursor.execute(self.plan.sql, p).fetchall() for p in params]
+
+    def close(self) -> None:
+        self.cursor.close()
+
+
+class _ThreadedRunner:
+    """Выполняет запросы плана в потоках со своими соединениями и курсорами."""
+
+    def __init__(self, plan: SearchPlan, workers: int):
+        self.plan = plan
+        self.tasks = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._loop, daemon=True) for _ in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self, params: List[list]) -> List[List[tuple]]:
+        """Раздает запросы потокам и собирает строки в порядке params."""
+        futures = []
+        for p in params:
+            future = Future()
+            self.tasks.put((future, p))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        for _ in self.threads:
+            self.tasks.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+
+    def _loop(self) -> None:
+        # Соединения Peewee потоколокальные: у каждого потока свое
+        try:
+            db.connect(reuse_if_open=True)
+            cursor, connect_error = db.obj.cursor(), None
+        except BaseException as error:
+            cursor, connect_error = None, error
+
+        try:
+            while (task := self.tasks.get()) is not _DONE:
+                future, params = task
+                if cursor is None:
+                    future.set_exception(connect_error)
+                    continue
+                try:
+                    future.set_result(cursor.execute(self.plan.sql, params).fetchall())
+                except BaseException as error:
+                    future.set_exception(error)
+        finally:
+            if cursor is not None:
+                cursor.close()
+            db.close()
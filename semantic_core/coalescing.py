@@ -0,0 +1,212 @@
+"""
+Склейка одинаковых одновременных запросов (single-flight).
+
+Когда много потоков или корутин одновременно просят одно и то же
+(например, эмбеддинг популярного поискового запроса до того, как он попал
+в кэш), в API уходит только первый запрос — «ведущий». Остальные вызовы
+с тем же ключом ждут его завершения и получают тот же результат
+или то же исключение.
+
+Классы:
+    FlightStats
+        Счетчики ведущих и присоединившихся вызовов.
+    SingleFlight
+        Склейка вызовов для потоков (threading).
+    AsyncSingleFlight
+        Склейка вызовов для корутин (asyncio).
+
+Функции:
+    get_default_single_flight() -> SingleFlight
+        Возвращает общий для процесса SingleFlight.
+    get_default_async_single_flight() -> AsyncSingleFlight
+        Возвращает общий для процесса AsyncSingleFlight.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    """
+    Статистика склейки запросов.
+
+    Attributes:
+        leaders: Количество реально выполненных вызовов
+        shared: Количество вызовов, получивших результат чужого вызова
+    """
+
+    leaders: int = 0
+    shared: int = 0
+
+    @property
+    def share_rate(self) -> float:
+        """Доля склеенных вызовов среди всех (0.0, если вызовов не было)."""
+        total = self.leaders + self.shared
+        return self.shared / total if total else 0.0
+
+
+class SingleFlight:
+    """
+    Склейка одинаковых одновременных вызовов для потоков.
+
+    Склеиваются только вызовы, пересекающиеся по времени: после завершения
+    ведущего вызова ключ освобождается, и следующий вызов выполнится заново
+    (повторное использование результатов — задача кэшей).
+
+    Attributes:
+        stats: Статистика склейки
+
+    Examples:
+        >>> flight = SingleFlight()
+        >>> flight.do(("текст", "RETRIEVAL_QUERY"), lambda: compute("текст"))
+    """
+
+    def __init__(self):
+        """Инициализация без активных вызовов."""
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self.stats = FlightStats()
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Выполняет func или присоединяется к уже идущему вызову с тем же ключом.
+
+        Args:
+            key: Ключ вызова (одинаковые ключи склеиваются)
+            func: Функция без аргументов, вычисляющая результат
+
+        Returns:
+            T: Результат func (общий для всех склеенных вызовов)
+
+        Raises:
+            Exception: Исключение ведущего вызова пробрасывается всем ожидающим
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats.leaders += 1
+            else:
+                self.stats.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        """Количество вызовов в полете."""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Склейка одинаковых одновременных вызовов для корутин.
+
+    Ведущий вызов выполняется отдельной задачей, а все участники ждут ее
+    через asyncio.shield: отмена одного ожидающего не отменяет запрос
+    для остальных. Вызовы из разных event loop не склеиваются между собой.
+
+    Attributes:
+        stats: Статистика склейки
+
+    Examples:
+        >>> flight = AsyncSingleFlight()
+        >>> await flight.do("текст", lambda: acompute("текст"))
+    """
+
+    def __init__(self):
+        """Инициализация без активных вызовов."""
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self.stats = FlightStats()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет корутину func или присоединяется к идущему вызову.
+
+        Args:
+            key: Ключ вызова (одинаковые ключи склеиваются)
+            func: Фабрика корутины, вычисляющей результат
+
+        Returns:
+            T: Результат func (общий для всех склеенных вызовов)
+
+        Raises:
+            Exception: Исключение ведущего вызова пробрасывается всем ожидающим
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+
+        with self._lock:
+            task = self._calls.get(flight_key)
+            if task is None:
+                task = asyncio.ensure_future(func())
+                self._calls[flight_key] = task
+                task.add_done_callback(lambda done: self._finish(flight_key, done))
+                self.stats.leaders += 1
+            else:
+                self.stats.shared += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: tuple, task: asyncio.Task) -> None:
+        """Освобождает ключ после завершения ведущей задачи."""
+        with self._lock:
+            self._calls.pop(flight_key, None)
+
+        # Если все ожидающие были отменены, исключение задачи никто не заберет —
+        # забираем сами, чтобы asyncio не ругался в лог
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        """Количество вызовов в полете."""
+        with self._lock:
+            return len(self._calls)
+
+
+_default_single_flight = SingleFlight()
+_default_async_single_flight = AsyncSingleFlight()
+
+
+def get_default_single_flight() -> SingleFlight:
+    """
+    Возвращает общий для процесса SingleFlight.
+
+    Общий экземпляр нужен, чтобы склеивались запросы разных генераторов:
+    вызовы поиска без явного генератора каждый раз создают новый.
+
+    Returns:
+        SingleFlight: Общий экземпляр
+    """
+    return _default_single_flight
+
+
+def get_default_async_single_flight() -> AsyncSingleFlight:
+    """
+    Возвращает общий для процесса AsyncSingleFlight.
+
+    Returns:
+        AsyncSingleFlight: Общий экземпляр
+    """
+    return _default_async_single_flight
@@ -9,6 +9,7 @@ Parent-Child архитектура:
 - NoteChunk (child): vec0 для векторного поиска
 """
 
+import importlib
 import sqlite3
 from pathlib import Path
 from typing import Optional
@@ -26,42 +27,29 @@ class VectorDatabase(SqliteExtDatabase):
     Автоматически загружает расширение sqlite-vec при подключении.
     """
 
-    def __init__(self, database: str | Path, *args, **kwargs):
-        """
-        Инициализация БД с векторным расширением.
-
-        Args:
-            database: Путь к файлу базы данных
-            *args: Дополнительные аргументы для SqliteExtDatabase
-            **kwargs: Дополнительные параметры для SqliteExtDatabase
-        """
-        super().__init__(database, *args, **kwargs)
-        self._vector_extension_loaded = False
-
     def _add_conn_hooks(self, conn: sqlite3.Connection) -> None:
         """
         Хук, вызываемый при создании нового соединения.
 
-        Загружает расширение sqlite-vec в соединение.
+        Загружает расширение sqlite-vec в соединение. Расширение живет
+        в соединении, поэтому загружается в каждое: соединения Peewee
+        отдельные для каждого потока.
 
         Args:
             conn: Объект соединения SQLite
         """
         super()._add_conn_hooks(conn)
 
-        if not self._vector_extension_loaded:
-            # Загружаем расширение sqlite-vec
-            conn.enable_load_extension(True)
-            try:
-                # sqlite-vec загружается автоматически при импорте пакета
-                import sqlite_vec
+        conn.enable_load_extension(True)
+        try:
+            # sqlite-vec загружается автоматически при импорте пакета
+            import sqlite_vec
 
-                sqlite_vec.load(conn)
-                self._vector_extension_loaded = True
-            except Exception as e:
-                raise RuntimeError(f"Не удалось загрузить sqlite-vec: {e}")
-            finally:
-                conn.enable_load_extension(False)
+            sqlite_vec.load(conn)
+        except Exception as e:
+            raise RuntimeError(f"Не удалось загрузить sqlite-vec: {e}")
+        finally:
+            conn.enable_load_extension(False)
 
 
 # Глобальный прокси для отложенной инициализации БД
@@ -89,6 +77,9 @@ def init_database(db_path: Optional[Path] = None) -> VectorDatabase:
     database = VectorDatabase(
         str(db_path),
         pragmas={
+            # До создания таблиц: свободные страницы можно вернуть ОС
+            # через PRAGMA incremental_vacuum без полного VACUUM
+            "auto_vacuum": "incremental",
             "journal_mode": "wal",  # Write-Ahead Logging для производительности
             "cache_size": -1024 * 64,  # 64MB cache
             "foreign_keys": 1,  # Включаем FK constraints
@@ -103,29 +94,73 @@ def init_database(db_path: Optional[Path] = None) -> VectorDatabase:
     return database
 
 
-def create_vector_table(model_class, vector_column: str = "embedding") -> None:
+def create_vector_table(
+    model_class,
+    vector_column: str = "embedding",
+    storage: str = "float32",
+    rescore_multiplier: int = 4,
+    binary: bool = False,
+    binary_oversample: int = 8,
+    prefix_dimensions: tuple[int, ...] = (),
+    prefix_oversample: int = 4,
+) -> None:
     """
     Создает виртуальную таблицу vec0 для векторного индекса.
 
+    Формат хранения запоминается в таблице vector_index_config,
+    и функции поиска подхватывают его автоматически. Триггер
+    {table}_vec_cleanup удаляет векторы при удалении строк модели.
+
     Args:
         model_class: Класс модели Peewee
         vector_column: Имя колонки с векторами (по умолчанию "embedding")
+        storage: Формат хранения: "float32" (по умолчанию) или "int8" —
+            в 4 раза компактнее, KNN по int8 с точным пересчетом кандидатов
+            по float32 из таблицы {table}_vec_f32
+        rescore_multiplier: Во сколько раз больше кандидатов отбирать
+            по int8 перед точным пересчетом
+        binary: Создать бинарный компаньон {table}_vec_bit (bit[N] из знаков
+            координат) для грубого KNN по Хэммингу с точным пересчетом
+        binary_oversample: Множитель кандидатов бинарного поиска по умолчанию
+        prefix_dimensions: Размерности префиксных копий MRL (например, (128, 256)):
+            для каждой создается {table}_vec_p{d} с первыми d координатами
+        prefix_oversample: Множитель shortlist префиксного поиска по умолчанию
+
+    Raises:
+        ValueError: Если таблица уже создана с другим форматом
 
     Examples:
-        >>> from domain.models import Note
-        >>> create_vector_table(Note)
+        >>> from domain.models import NoteChunk
+        >>> create_vector_table(NoteChunk)
+        >>> create_vector_table(NoteChunk, storage="int8")
+        >>> create_vector_table(NoteChunk, binary=True, binary_oversample=10)
+        >>> create_vector_table(NoteChunk, prefix_dimensions=(128, 256))
     """
+    # Импорт внутри функции: vector_index сам зависит от этого модуля
+    from semantic_core.vector_index import (
+        VectorIndexConfig,
+        create_cleanup_trigger,
+        create_vector_index,
+    )
+
     table_name = model_class._meta.table_name
-    vector_table_name = f"{table_name}_vec"
 
-    # Создаем виртуальную таблицу для векторного поиска
-    db.obj.execute_sql(f"""
-        CREATE VIRTUAL TABLE IF NOT EXISTS {vector_table_name} 
-        USING vec0(
-            id INTEGER PRIMARY KEY,
-            {vector_column} FLOAT[{settings.embedding_dimension}]
+    config = create_vector_index(
+        VectorIndexConfig(
+            table_name=f"{table_name}_vec",
+            vector_column=vector_column,
+            dimension=settings.embedding_dimension,
+            storage=storage,
+            rescore_multiplier=rescore_multiplier,
+            binary=binary,
+            binary_oversample=binary_oversample,
+            prefix_dimensions=tuple(prefix_dimensions),
+            prefix_oversample=prefix_oversample,
         )
-    """)
+    )
+
+    # Векторы удаляются вместе со строками модели (в том числе каскадно)
+    create_cleanup_trigger(config, table_name)
 
 
 def create_fts_table(model_class, text_columns: list[str]) -> None:
@@ -155,27 +190,137 @@ def create_fts_table(model_class, text_columns: list[str]) -> None:
         )
     """)
 
-    # Создаем триггеры для автоматического обновления FTS индекса
+    # Создаем триггеры для автоматического обновления FTS индекса.
+    # Для external content FTS5 удаление и обновление делаются командой
+    # 'delete' со СТАРЫМИ значениями колонок: обычный DELETE/UPDATE по
+    # rowid читает уже измененную строку и портит индекс
+    new_values = ", ".join(f"new.{col}" for col in text_columns)
+    old_values = ", ".join(f"old.{col}" for col in text_columns)
+    insert_new = (
+        f"INSERT INTO {fts_table_name}(rowid, {columns_str}) "
+        f"VALUES (new.id, {new_values});"
+    )
+    delete_old = (
+        f"INSERT INTO {fts_table_name}({fts_table_name}, rowid, {columns_str}) "
+        f"VALUES ('delete', old.id, {old_values});"
+    )
+    triggers = {
+        "insert": f"AFTER INSERT ON {table_name} BEGIN {insert_new} END",
+        "delete": f"AFTER DELETE ON {table_name} BEGIN {delete_old} END",
+        "update": f"AFTER UPDATE ON {table_name} BEGIN {delete_old} {insert_new} END",
+    }
+
+    for name, body in triggers.items():
+        # Пересоздаем, чтобы базы со старыми триггерами получили исправленные
+        db.obj.execute_sql(f"DROP TRIGGER IF EXISTS {table_name}_fts_{name}")
+        db.obj.execute_sql(f"CREATE TRIGGER {table_name}_fts_{name} {body}")
+
+
+def create_embedding_cache_table(table_name: str = "embedding_cache") -> None:
+    """
+    Создает таблицу персистентного кэша эмбеддингов.
+
+    WITHOUT ROWID таблица с 16-байтным ключом: данные хранятся прямо
+    в B-дереве первичного ключа, без отдельного rowid-индекса.
+    Индекс по last_access нужен для вытеснения LRU.
+
+    Args:
+        table_name: Имя таблицы кэша (по умолчанию "embedding_cache")
+
+    Examples:
+        >>> create_embedding_cache_table()
+    """
     db.obj.execute_sql(f"""
-        CREATE TRIGGER IF NOT EXISTS {table_name}_fts_insert 
-        AFTER INSERT ON {table_name} BEGIN
-            INSERT INTO {fts_table_name}(rowid, {columns_str})
-            VALUES (new.id, {", ".join(f"new.{col}" for col in text_columns)});
-        END
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            key BLOB PRIMARY KEY,
+            embedding BLOB NOT NULL,
+            last_access INTEGER NOT NULL
+        ) WITHOUT ROWID
     """)
 
     db.obj.execute_sql(f"""
-        CREATE TRIGGER IF NOT EXISTS {table_name}_fts_delete 
-        AFTER DELETE ON {table_name} BEGIN
-            DELETE FROM {fts_table_name} WHERE rowid = old.id;
-        END
+        CREATE INDEX IF NOT EXISTS {table_name}_last_access
+        ON {table_name}(last_access)
     """)
 
+
+def create_manifest_table(table_name: str = "source_manifest") -> None:
+    """
+    Создает таблицу-манифест загруженных файлов.
+
+    Одна строка на файл: размер и mtime для быстрой проверки без чтения,
+    хэш содержимого для проверки после touch и ID заметки, созданной
+    из файла. Используется DirectoryIngester.
+
+    Args:
+        table_name: Имя таблицы манифеста (по умолчанию "source_manifest")
+
+    Examples:
+        >>> create_manifest_table()
+    """
     db.obj.execute_sql(f"""
-        CREATE TRIGGER IF NOT EXISTS {table_name}_fts_update 
-        AFTER UPDATE ON {table_name} BEGIN
-            UPDATE {fts_table_name} 
-            SET {", ".join(f"{col} = new.{col}" for col in text_columns)}
-            WHERE rowid = new.id;
-        END
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            note_id INTEGER NOT NULL
+        ) WITHOUT ROWID
     """)
+
+
+def add_missing_columns(model_class) -> list[str]:
+    """
+    Добавляет в существующую таблицу колонки, появившиеся в модели.
+
+    create_tables(safe=True) не меняет уже созданные таблицы, поэтому
+    базы, созданные старыми версиями моделей, догоняются через
+    ALTER TABLE ADD COLUMN. Новые поля должны быть null=True или иметь default.
+
+    Args:
+        model_class: Класс модели Peewee
+
+    Returns:
+        list[str]: Имена добавленных колонок
+
+    Examples:
+        >>> from domain.models import NoteChunk
+        >>> add_missing_columns(NoteChunk)
+        ['content_hash']
+    """
+    from playhouse.migrate import SqliteMigrator, migrate
+
+    table_name = model_class._meta.table_name
+    existing = {column.name for column in db.obj.get_columns(table_name)}
+    missing = [
+        field
+        for field in model_class._meta.sorted_fields
+        if field.column_name not in existing
+    ]
+
+    if missing:
+        migrator = SqliteMigrator(db.obj)
+        migrate(
+            *(
+                migrator.add_column(table_name, field.column_name, field)
+                for field in missing
+            )
+        )
+
+    return [field.column_name for field in missing]
+
+
+def import_model(path: str):
+    """
+    Импортирует модель по пути вида package.module.ClassName.
+
+    Используется командной строкой воркера и обслуживания индекса.
+
+    Args:
+        path: Полный путь к классу модели (например, domain.models.NoteChunk)
+
+    Returns:
+        Класс модели Peewee
+    """
+    module_name, _, class_name = path.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)
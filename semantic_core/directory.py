@@ -0,0 +1,339 @@
+"""
+Возобновляемая загрузка каталога файлов с манифестом.
+
+Для каждого загруженного файла в таблице-манифесте хранится
+(путь, размер, mtime, хэш содержимого, ID заметки). Повторный запуск:
+
+1. Файл с теми же размером и mtime пропускается без чтения
+2. Файл с другим mtime, но тем же хэшем (touch, checkout) — только
+   обновляет строку манифеста
+3. Измененный файл обновляет заметку через save_note_with_chunks
+   (update_existing=True): векторизуются только изменившиеся чанки
+4. Новые файлы загружаются пачками, как в ingest_notes
+5. Заметки файлов, исчезнувших из каталога, удаляются
+
+Строки манифеста пишутся в той же транзакции, что и заметки, поэтому
+каждая закоммиченная пачка — контрольная точка: прерванная загрузка
+при следующем запуске продолжается с первого незагруженного файла.
+
+Классы:
+    DirectoryStats
+        Счетчики синхронизации каталога.
+    DirectoryIngester
+        Синхронизирует заметки с файлами каталога.
+"""
+
+import fnmatch
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from peewee import Model, chunked
+
+from semantic_core.database import db, create_manifest_table
+from semantic_core.embeddings import Embedder
+from semantic_core.services import (
+    check_context_mode,
+    delete_notes_with_chunks,
+    prepare_note_chunks,
+    save_note_with_chunks,
+    write_note_batch,
+)
+from semantic_core.text_processing import TextSplitter
+from semantic_core.vector_index import get_vector_index_config
+
+
+# Сколько путей подставляем в один IN (...) — ниже лимита переменных SQLite
+_LOOKUP_BATCH = 500
+
+
+@dataclass
+class DirectoryStats:
+    """
+    Счетчики синхронизации каталога.
+
+    Attributes:
+        scanned: Найдено файлов по шаблону
+        added: Загружено новых файлов
+        updated: Обновлено измененных файлов
+        unchanged: Пропущено неизменившихся файлов
+        deleted: Удалено заметок исчезнувших файлов
+        chunks: Чанков записано (новые файлы и новые чанки обновленных)
+        batches: Закоммичено пачек
+        elapsed: Общее время (секунды)
+    """
+
+    scanned: int = 0
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    chunks: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class _Source:
+    """Прочитанный файл, ожидающий записи."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    text: str = ""
+    note_id: Optional[int] = None
+
+    def manifest_row(self, note_id: int) -> tuple:
+        """Строка манифеста для заметки note_id."""
+        return (self.path, self.size, self.mtime_ns, self.content_hash, note_id)
+
+
+class DirectoryIngester:
+    """
+    Синхронизирует заметки с файлами каталога.
+
+    Attributes:
+        note_model: Класс модели Note
+        chunk_model: Класс модели NoteChunk
+        splitter: Сплиттер для нарезки
+        generator: Эмбеддер для векторизации
+        pattern: Шаблон имен файлов (fnmatch), каталог обходится рекурсивно
+        batch_size: Файлов в одной пачке (и в одной контрольной точке)
+        make_note: Функция (path, text) -> данные заметки для note_model
+        manifest_table: Имя таблицы манифеста
+        encoding: Кодировка файлов
+        context: Контекст чанков, как в save_note_with_chunks
+
+    Example:
+        >>> category, _ = Category.get_or_create(name="Документация")
+        >>> ingester = DirectoryIngester(
+        ...     Note, NoteChunk, splitter, create_embedder(),
+        ...     make_note=lambda path, text: {
+        ...         "title": path.stem, "content": text, "category": category
+        ...     },
+        ... )
+        >>> stats = ingester.sync("doc/architecture")
+        >>> print(f"+{stats.added} ~{stats.updated} -{stats.deleted}")
+    """
+
+    def __init__(
+        self,
+        note_model: Model,
+        chunk_model: Model,
+        splitter: TextSplitter,
+        generator: Embedder,
+        pattern: str = "*.md",
+        batch_size: int = 100,
+        make_note: Optional[Callable[[Path, str], Dict[str, Any]]] = None,
+        manifest_table: str = "source_manifest",
+        encoding: str = "utf-8",
+        context: str = "note",
+    ):
+        if batch_size <= 0:
+            raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+        check_context_mode(context)
+
+        self.note_model = note_model
+        self.chunk_model = chunk_model
+        self.splitter = splitter
+        self.generator = generator
+        self.pattern = pattern
+        self.batch_size = batch_size
+        self.make_note = make_note or _default_note
+        self.manifest_table = manifest_table
+        self.encoding = encoding
+        self.context = context
+
+        create_manifest_table(manifest_table)
+
+    def sync(
+        self,
+        directory: Union[str, Path],
+        on_batch: Optional[Callable[[DirectoryStats], None]] = None,
+    ) -> DirectoryStats:
+        """
+        Приводит заметки в соответствие с файлами каталога.
+
+        Удаление исчезнувших файлов выполняется после полного обхода,
+        поэтому прерванный запуск ничего не удаляет.
+
+        Args:
+            directory: Корневой каталог
+            on_batch: Колбэк прогресса, вызывается после коммита каждой пачки
+
+        Returns:
+            DirectoryStats: Итоговая статистика
+
+        Raises:
+            ValueError: Если каталог не существует
+        """
+        root = Path(directory).resolve()
+        if not root.is_dir():
+            raise ValueError(f"Каталог не найден: {directory}")
+
+        stats = DirectoryStats()
+        started = time.perf_counter()
+        seen: set[str] = set()
+        files = self._iter_files(root)
+
+        while batch := list(islice(files, self.batch_size)):
+            seen.update(path for path, _ in batch)
+            stats.scanned += len(batch)
+            self._sync_batch(batch, stats)
+            stats.batches += 1
+            stats.elapsed = time.perf_counter() - started
+
+            if on_batch is not None:
+                on_batch(stats)
+
+        stats.deleted = self._delete_missing(root, seen)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _iter_files(self, root: Path) -> Iterator[tuple[str, os.stat_result]]:
+        """Обходит каталог в детерминированном порядке: (путь, stat)."""
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(fnmatch.filter(filenames, self.pattern)):
+                path = os.path.join(dirpath, name)
+                yield Path(path).as_posix(), os.stat(path)
+
+    def _sync_batch(
+        self, batch: list[tuple[str, os.stat_result]], stats: DirectoryStats
+    ) -> None:
+        """Сверяет пачку файлов с манифестом и записывает изменения."""
+        manifest = self._lookup([path for path, _ in batch])
+        new, changed, touched = [], [], []
+
+        for path, stat in batch:
+            entry = manifest.get(path)
+            if entry and (entry[0], entry[1]) == (stat.st_size, stat.st_mtime_ns):
+                stats.unchanged += 1
+                continue
+
+            data = Path(path).read_bytes()
+            source = _Source(
+                path, stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest()
+            )
+            if entry and entry[2] == source.content_hash:
+                touched.append(source.manifest_row(entry[3]))
+                stats.unchanged += 1
+                continue
+
+            source.text = data.decode(self.encoding)
+            if entry and self.note_model.get_or_none(self.note_model.id == entry[3]):
+                source.note_id = entry[3]
+                changed.append(source)
+            else:
+                new.append(source)
+
+        # Новые файлы и touch — одна транзакция (контрольная точка пачки)
+        notes = [
+            self.note_model(**self.make_note(Path(source.path), source.text))
+            for source in new
+        ]
+        prepared = [
+            prepare_note_chunks(note, self.splitter, self.context) for note in notes
+        ]
+        vector_texts = [text for _, texts in prepared for text in texts]
+        embeddings = (
+            self.generator.embed_documents(vector_texts) if vector_texts else None
+        )
+        vector_config = get_vector_index_config(
+            f"{self.chunk_model._meta.table_name}_vec"
+        )
+
+        with db.atomic("IMMEDIATE"):
+            if notes:
+                stats.chunks += write_note_batch(
+                    self.note_model,
+                    self.chunk_model,
+                    notes,
+                    prepared,
+                    embeddings,
+                    vector_config,
+                )
+            self._save_manifest(
+                touched
+                + [source.manifest_row(note.id) for source, note in zip(new, notes)]
+            )
+        stats.added += len(new)
+
+        # Измененные файлы — по транзакции на файл: векторизация внутри
+        # save_note_with_chunks, переиспользуются неизменившиеся чанки
+        for source in changed:
+            with db.atomic():
+                note = save_note_with_chunks(
+                    self.note_model,
+                    self.chunk_model,
+                    {
+                        "id": source.note_id,
+                        **self.make_note(Path(source.path), source.text),
+                    },
+                    self.splitter,
+                    self.generator,
+                    update_existing=True,
+                    context=self.context,
+                )
+                self._save_manifest([source.manifest_row(note.id)])
+            stats.chunks += note.chunk_stats.embedded
+            stats.updated += 1
+
+    def _lookup(self, paths: list[str]) -> dict[str, tuple]:
+        """Строки манифеста: путь -> (size, mtime_ns, content_hash, note_id)."""
+        manifest = {}
+        for batch in chunked(paths, _LOOKUP_BATCH):
+            placeholders = ", ".join("?" * len(batch))
+            cursor = db.obj.execute_sql(
+                f"SELECT path, size, mtime_ns, content_hash, note_id "
+                f"FROM {self.manifest_table} WHERE path IN ({placeholders})",
+                batch,
+            )
+            manifest.update((row[0], row[1:]) for row in cursor)
+        return manifest
+
+    def _save_manifest(self, rows: list[tuple]) -> None:
+        """Вставляет или обновляет строки манифеста."""
+        if rows:
+            db.obj.cursor().executemany(
+                f"INSERT OR REPLACE INTO {self.manifest_table}"
+                f"(path, size, mtime_ns, content_hash, note_id) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _delete_missing(self, root: Path, seen: set[str]) -> int:
+        """Удаляет заметки и строки манифеста файлов, которых больше нет."""
+        prefix = root.as_posix().rstrip("/") + "/"
+        missing = [
+            (path, note_id)
+            for path, note_id in db.obj.execute_sql(
+                f"SELECT path, note_id FROM {self.manifest_table} "
+                f"WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+            if path not in seen
+        ]
+
+        deleted = 0
+        for batch in chunked(missing, _LOOKUP_BATCH):
+            paths, note_ids = zip(*batch)
+            with db.atomic("IMMEDIATE"):
+                deleted += delete_notes_with_chunks(
+                    self.note_model, self.chunk_model, note_ids
+                )
+                placeholders = ", ".join("?" * len(paths))
+                db.obj.execute_sql(
+                    f"DELETE FROM {self.manifest_table} WHERE path IN ({placeholders})",
+                    paths,
+                )
+        return deleted
+
+
+def _default_note(path: Path, text: str) -> Dict[str, Any]:
+    """Заголовок из имени файла, содержимое — текст файла."""
+    return {"title": path.stem.replace("_", " ").title(), "content": text}
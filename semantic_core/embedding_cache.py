@@ -0,0 +1,463 @@
+"""
+Кэши эмбеддингов: персистентный (SQLite) и in-process для запросов.
+
+Персистентный кэш контентно-адресуемый: ключ — хэш от
+(model_name, dimension, task_type, text), значение — нормализованный вектор
+float32 в виде BLOB. Таблица живет в той же VectorDatabase, что и заметки,
+поэтому повторная индексация неизменившихся текстов не ходит в Gemini API.
+
+Кэш запросов живет в памяти процесса: популярные поисковые запросы
+векторизуются один раз и переиспользуются до истечения TTL.
+
+Классы:
+    CacheStats
+        Счетчики попаданий, промахов и вытеснений.
+    EmbeddingCache
+        Кэш с вытеснением LRU по времени последнего доступа.
+    QueryEmbeddingCache
+        Потокобезопасный LRU-кэш с TTL для эмбеддингов запросов.
+
+Функции:
+    get_default_embedding_cache() -> EmbeddingCache | None
+        Возвращает персистентный кэш текущей базы (по настройкам Settings).
+    get_default_query_cache() -> QueryEmbeddingCache | None
+        Возвращает общий для процесса кэш запросов (по настройкам Settings).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional, Sequence
+
+import numpy as np
+
+from config import settings
+from semantic_core.database import db, create_embedding_cache_table
+
+
+# Сколько ключей подставляем в один IN (...) — ниже лимита переменных SQLite
+_MAX_VARIABLES = 500
+
+
+@dataclass
+class CacheStats:
+    """
+    Статистика работы кэша.
+
+    Attributes:
+        hits: Количество найденных в кэше векторов
+        misses: Количество промахов
+        evictions: Количество вытесненных записей
+        expirations: Количество записей, удаленных по TTL
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля попаданий среди всех обращений (0.0, если обращений не было)."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """
+    Кэш эмбеддингов в таблице SQLite с вытеснением LRU.
+
+    Таблица WITHOUT ROWID с 16-байтным ключом и индексом по last_access.
+    Чтобы попадания не превращались в запись на каждое чтение, время доступа
+    обновляется не чаще, чем раз в touch_interval секунд (LRU с грубой
+    гранулярностью). Вытеснение амортизировано: старые записи удаляются пачкой,
+    только когда размер превысил max_entries на долю evict_slack.
+
+    Attributes:
+        table_name: Имя таблицы кэша
+        max_entries: Максимальное количество записей
+        touch_interval: Минимальный интервал обновления last_access (секунды)
+        evict_slack: Допустимое превышение max_entries перед вытеснением
+        stats: Счетчики попаданий/промахов/вытеснений
+    """
+
+    def __init__(
+        self,
+        table_name: str = "embedding_cache",
+        max_entries: int = 1_000_000,
+        touch_interval: int = 3600,
+        evict_slack: float = 0.05,
+        create_table: bool = True,
+    ):
+        """
+        Инициализирует кэш.
+
+        Args:
+            table_name: Имя таблицы кэша
+            max_entries: Максимальное количество записей
+            touch_interval: Минимальный интервал обновления last_access (секунды)
+            evict_slack: Доля превышения max_entries, после которой запускается
+                вытеснение (0.05 = вытесняем при 105% заполнения)
+            create_table: Создать таблицу, если она не существует
+
+        Raises:
+            ValueError: Если max_entries <= 0
+        """
+        if max_entries <= 0:
+            raise ValueError(f"max_entries должен быть > 0, получено: {max_entries}")
+
+        self.table_name = table_name
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evict_slack = evict_slack
+        self.stats = CacheStats()
+        self._size: Optional[int] = None
+
+        if create_table:
+            create_embedding_cache_table(table_name)
+
+    @staticmethod
+    def make_key(model_name: str, dimension: int, task_type: str, text: str) -> bytes:
+        """
+        Вычисляет контентный ключ кэша.
+
+        Args:
+            model_name: Модель эмбеддингов
+            dimension: Размерность вектора
+            task_type: Тип задачи (RETRIEVAL_DOCUMENT / RETRIEVAL_QUERY)
+            text: Векторизуемый текст
+
+        Returns:
+            bytes: 16-байтный хэш BLAKE2b
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{model_name}\x00{dimension}\x00{task_type}\x00".encode())
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """
+        Возвращает вектор по ключу или None.
+
+        Args:
+            key: Ключ из make_key()
+
+        Returns:
+            Optional[np.ndarray]: Вектор float32 (только для чтения) или None
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Sequence[bytes]) -> dict[bytes, np.ndarray]:
+        """
+        Возвращает все найденные векторы для набора ключей.
+
+        Args:
+            keys: Ключи из make_key()
+
+        Returns:
+            dict[bytes, np.ndarray]: Найденные векторы (ключ → вектор)
+        """
+        found: dict[bytes, np.ndarray] = {}
+        stale_keys = []
+        now = int(time.time())
+
+        for start in range(0, len(keys), _MAX_VARIABLES):
+            batch = keys[start : start + _MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(batch))
+            cursor = db.obj.execute_sql(
+                f"SELECT key, embedding, last_access FROM {self.table_name} "
+                f"WHERE key IN ({placeholders})",
+                list(batch),
+            )
+            for key, blob, last_access in cursor.fetchall():
+                key = bytes(key)
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+                if now - last_access >= self.touch_interval:
+                    stale_keys.append((now, key))
+
+        if stale_keys:
+            db.obj.cursor().executemany(
+                f"UPDATE {self.table_name} SET last_access = ? WHERE key = ?",
+                stale_keys,
+            )
+
+        self.stats.hits += len(found)
+        self.stats.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        """
+        Сохраняет один вектор.
+
+        Args:
+            key: Ключ из make_key()
+            vector: Нормализованный вектор float32
+        """
+        self.put_many([(key, vector)])
+
+    def put_many(self, items: Iterable[tuple[bytes, np.ndarray]]) -> None:
+        """
+        Сохраняет набор векторов одной транзакцией.
+
+        Существующие ключи не перезаписываются (INSERT OR IGNORE): один и тот же
+        текст всегда дает один и тот же вектор.
+
+        Args:
+            items: Пары (ключ, вектор)
+        """
+        now = int(time.time())
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items
+        ]
+        if not rows:
+            return
+
+        size = self._current_size()
+        with db.atomic():
+            cursor = db.obj.cursor()
+            cursor.executemany(
+                f"INSERT OR IGNORE INTO {self.table_name}(key, embedding, last_access) "
+                f"VALUES (?, ?, ?)",
+                rows,
+            )
+            inserted = cursor.rowcount if cursor.rowcount >= 0 else len(rows)
+
+        self._size = size + inserted
+        if self._size > self.max_entries * (1 + self.evict_slack):
+            self.evict()
+
+    def evict(self, target_size: Optional[int] = None) -> int:
+        """
+        Удаляет самые давно использованные записи.
+
+        Args:
+            target_size: Размер, до которого нужно ужать кэш
+                (по умолчанию max_entries)
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        if target_size is None:
+            target_size = self.max_entries
+
+        excess = self._current_size() - target_size
+        if excess <= 0:
+            return 0
+
+        cursor = db.obj.execute_sql(
+            f"DELETE FROM {self.table_name} WHERE key IN ("
+            f"SELECT key FROM {self.table_name} ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        deleted = cursor.rowcount
+
+        self._size = None
+        self.stats.evictions += deleted
+        return deleted
+
+    def clear(self) -> None:
+        """Удаляет все записи кэша."""
+        db.obj.execute_sql(f"DELETE FROM {self.table_name}")
+        self._size = 0
+
+    def _current_size(self) -> int:
+        """Возвращает размер кэша (COUNT(*) выполняется только при первом вызове)."""
+        if self._size is None:
+            cursor = db.obj.execute_sql(f"SELECT COUNT(*) FROM {self.table_name}")
+            self._size = cursor.fetchone()[0]
+        return self._size
+
+    def __len__(self) -> int:
+        return self._current_size()
+
+
+class QueryEmbeddingCache:
+    """
+    Потокобезопасный LRU-кэш с TTL для эмбеддингов поисковых запросов.
+
+    Ключ строится по нормализованному тексту запроса (пробелы схлопываются,
+    регистр не учитывается), поэтому "Python  циклы" и "python циклы"
+    делят одну запись. put() один раз копирует вектор при записи (массив
+    вызывающего остается изменяемым), а попадание отдает сохраненный
+    read-only массив без копирования.
+
+    Память ограничена max_entries: при размерности 768 одна запись занимает
+    ~3 KB, т.е. 10 000 запросов — около 30 MB.
+
+    Attributes:
+        max_entries: Максимальное количество запросов в кэше
+        ttl: Время жизни записи в секундах (None — без ограничения)
+        stats: Счетчики попаданий/промахов/вытеснений/истечений
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 3600.0):
+        """
+        Инициализирует кэш запросов.
+
+        Args:
+            max_entries: Максимальное количество запросов в кэше
+            ttl: Время жизни записи в секундах (None — без ограничения)
+
+        Raises:
+            ValueError: Если max_entries <= 0 или ttl <= 0
+        """
+        if max_entries <= 0:
+            raise ValueError(f"max_entries должен быть > 0, получено: {max_entries}")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl должен быть > 0, получено: {ttl}")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[float, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """
+        Нормализует текст запроса для построения ключа.
+
+        Args:
+            text: Исходный текст запроса
+
+        Returns:
+            str: Текст без лишних пробелов в нижнем регистре
+        """
+        return " ".join(text.split()).casefold()
+
+    def make_key(self, model_name: str, dimension: int, text: str) -> Hashable:
+        """
+        Строит ключ кэша для запроса.
+
+        Args:
+            model_name: Модель эмбеддингов
+            dimension: Размерность вектора
+            text: Текст запроса
+
+        Returns:
+            Hashable: Ключ (model_name, dimension, нормализованный текст)
+        """
+        return (model_name, dimension, self.normalize_query(text))
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        Возвращает вектор по ключу или None (промах или истекший TTL).
+
+        Args:
+            key: Ключ из make_key()
+
+        Returns:
+            Optional[np.ndarray]: Read-only вектор float32 или None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            expires_at, vector = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return vector
+
+    def put(self, key: Hashable, vector: np.ndarray) -> np.ndarray:
+        """
+        Сохраняет копию вектора и возвращает ее read-only версию.
+
+        Массив вызывающего не замораживается: кэш хранит свою копию.
+
+        Args:
+            key: Ключ из make_key()
+            vector: Нормализованный вектор float32
+
+        Returns:
+            np.ndarray: Сохраненный read-only вектор
+        """
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else float("inf")
+
+        with self._lock:
+            self._entries[key] = (expires_at, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+        return vector
+
+    def clear(self) -> None:
+        """Удаляет все записи кэша."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_embedding_cache: Optional[tuple[object, EmbeddingCache]] = None
+_default_embedding_cache_lock = threading.Lock()
+
+_default_query_cache: Optional[QueryEmbeddingCache] = None
+_default_query_cache_lock = threading.Lock()
+
+
+def get_default_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Возвращает персистентный кэш эмбеддингов для текущей базы.
+
+    Создается лениво по настройкам embedding_cache_* из Settings (таблица
+    создается при первом обращении) и пересоздается, если init_database()
+    подключил другую базу. Так EmbeddingGenerator без явного cache проверяет
+    кэш перед обращением к API.
+
+    Returns:
+        Optional[EmbeddingCache]: Кэш или None, если он отключен в настройках
+        или база еще не инициализирована
+    """
+    global _default_embedding_cache
+
+    if not settings.embedding_cache_enabled or db.obj is None:
+        return None
+
+    with _default_embedding_cache_lock:
+        database, cache = _default_embedding_cache or (None, None)
+        if database is not db.obj:
+            cache = EmbeddingCache(max_entries=settings.embedding_cache_size)
+            _default_embedding_cache = (db.obj, cache)
+        return cache
+
+
+def get_default_query_cache() -> Optional[QueryEmbeddingCache]:
+    """
+    Возвращает общий для процесса кэш запросов.
+
+    Создается лениво по настройкам query_cache_* из Settings. Общий кэш нужен,
+    чтобы работали вызовы поиска без явного генератора: каждый такой вызов
+    создает новый EmbeddingGenerator, но кэш запросов у них один.
+
+    Returns:
+        Optional[QueryEmbeddingCache]: Кэш или None, если он отключен в настройках
+    """
+    global _default_query_cache
+
+    if not settings.query_cache_enabled:
+        return None
+
+    with _default_query_cache_lock:
+        if _default_query_cache is None:
+            _default_query_cache = QueryEmbeddingCache(
+                max_entries=settings.query_cache_size,
+                ttl=settings.query_cache_ttl,
+            )
+        return _default_query_cache
@@ -1,21 +1,480 @@
 """
 Генератор эмбеддингов через Google Gemini API.
 
-Предоставляет асимметричный поиск с использованием task_type
-и поддержку Matryoshka Representation Learning (MRL).
+Предоставляет асимметричный поиск с использованием task_type,
+поддержку Matryoshka Representation Learning (MRL) и пакетную
+векторизацию (много текстов за один HTTP-запрос).
+
+Все запросы к API проходят через EmbeddingScheduler: он держит темп
+в пределах квот requests-per-minute / tokens-per-minute и повторяет
+временные ошибки (429, 5xx, таймауты) с экспоненциальной задержкой.
+
+Поиск и сервисный слой зависят только от протокола Embedder, поэтому
+вместо Gemini можно подставить локальный HashingEmbedder (см. create_embedder).
+
+SDK google.generativeai импортируется лениво (import_genai), при первом
+создании EmbeddingGenerator: импорт пакета не тратит на него время.
 """
 
-from typing import Literal
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Iterator,
+    Literal,
+    Optional,
+    Protocol,
+    Sequence,
+    TypeVar,
+    runtime_checkable,
+)
 
-import google.generativeai as genai
 import numpy as np
 
 from config import settings
+from semantic_core.coalescing import SingleFlight, get_default_single_flight
+from semantic_core.embedding_cache import (
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    get_default_embedding_cache,
+    get_default_query_cache,
+)
 
 
 TaskType = Literal["RETRIEVAL_DOCUMENT", "RETRIEVAL_QUERY"]
 
 
+def import_genai():
+    """
+    Импортирует SDK google.generativeai при первом использовании.
+
+    Импорт SDK занимает сотни миллисекунд, поэтому он откладывается
+    до первого обращения к Gemini API.
+
+    Returns:
+        module: Модуль google.generativeai
+    """
+    import google.generativeai as genai
+
+    return genai
+
+
+def __getattr__(name: str):
+    """Ленивый атрибут модуля genai (для совместимости и подмены в тестах)."""
+    if name == "genai":
+        return import_genai()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+T = TypeVar("T")
+
+
+@runtime_checkable
+class Embedder(Protocol):
+    """
+    Контракт генератора эмбеддингов, который используют поиск и сервисы.
+
+    Все векторы нормализованы (L2-норма = 1) и имеют размерность dimension.
+
+    Attributes:
+        model_name: Имя модели (участвует в ключах кэшей)
+        dimension: Размерность векторов
+    """
+
+    model_name: str
+    dimension: int
+
+    def embed_document(self, text: str) -> np.ndarray:
+        """Генерирует эмбеддинг документа."""
+        ...
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Генерирует эмбеддинг поискового запроса."""
+        ...
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """Генерирует матрицу эмбеддингов документов."""
+        ...
+
+    def embed_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """Генерирует матрицу эмбеддингов запросов."""
+        ...
+
+    def vector_to_blob(self, vector: np.ndarray) -> bytes:
+        """Конвертирует вектор в BLOB для SQLite."""
+        ...
+
+
+def create_embedder(provider: Optional[str] = None) -> Embedder:
+    """
+    Создает эмбеддер по имени провайдера.
+
+    Args:
+        provider: "gemini" или "local" (по умолчанию settings.embedding_provider)
+
+    Returns:
+        Embedder: EmbeddingGenerator для "gemini", HashingEmbedder для "local"
+
+    Raises:
+        ValueError: Если провайдер неизвестен
+
+    Examples:
+        >>> embedder = create_embedder("local")  # без сети и API-ключа
+    """
+    provider = provider or settings.embedding_provider
+
+    if provider == "gemini":
+        return EmbeddingGenerator()
+
+    if provider == "local":
+        from semantic_core.local_embeddings import HashingEmbedder
+
+        return HashingEmbedder()
+
+    raise ValueError(f"Неизвестный провайдер эмбеддингов: {provider}")
+
+
+# HTTP-статусы, при которых запрос имеет смысл повторить
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Определяет, является ли ошибка API временной.
+
+    Временные: превышение квоты (429), ошибки сервера (5xx), таймауты
+    и сетевые сбои. Ошибки запроса (400, 403, 404) считаются фатальными:
+    повтор приведет к тому же результату.
+
+    Args:
+        error: Исключение, выброшенное клиентом API
+
+    Returns:
+        bool: True, если запрос можно повторить
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+
+    # Исключения google.api_core хранят HTTP-статус в атрибуте code
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+
+    return False
+
+
+def estimate_tokens(texts: Sequence[str]) -> int:
+    """
+    Грубо оценивает количество токенов в запросе (~4 символа на токен).
+
+    Args:
+        texts: Тексты запроса
+
+    Returns:
+        int: Оценка количества токенов
+    """
+    return sum(len(text) // 4 + 1 for text in texts)
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket с резервированием.
+
+    Ведро пополняется непрерывно со скоростью rate_per_minute / 60 в секунду
+    и вмещает не больше capacity единиц. reserve() сразу списывает единицы
+    (баланс может уйти в минус) и возвращает время, которое вызывающий
+    должен подождать, — так очередь обслуживается честно, в порядке вызовов.
+
+    Attributes:
+        rate_per_minute: Скорость пополнения (единиц в минуту)
+        capacity: Емкость ведра (максимальный всплеск)
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Инициализирует ведро (изначально полное).
+
+        Args:
+            rate_per_minute: Скорость пополнения (единиц в минуту)
+            capacity: Емкость ведра (по умолчанию — минутная квота)
+            clock: Источник монотонного времени
+
+        Raises:
+            ValueError: Если rate_per_minute <= 0
+        """
+        if rate_per_minute <= 0:
+            raise ValueError(
+                f"rate_per_minute должен быть > 0, получено: {rate_per_minute}"
+            )
+
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Резервирует amount единиц.
+
+        Args:
+            amount: Количество единиц (запросов или токенов)
+
+        Returns:
+            float: Сколько секунд нужно подождать до использования резерва
+        """
+        rate_per_second = self.rate_per_minute / 60.0
+
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._updated_at
+            self._tokens = min(self.capacity, self._tokens + elapsed * rate_per_second)
+            self._updated_at = now
+            self._tokens -= amount
+
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / rate_per_second
+
+
+@dataclass
+class SchedulerStats:
+    """
+    Статистика планировщика запросов.
+
+    Attributes:
+        requests: Количество попыток запросов к API
+        retries: Количество повторов после временных ошибок
+        failures: Количество запросов, завершившихся ошибкой
+        queue_depth: Сколько вызовов сейчас ждут квоту или выполняются
+        max_queue_depth: Максимальная глубина очереди за время работы
+        throttle_wait: Суммарное ожидание квоты (секунды)
+        backoff_wait: Суммарное ожидание между повторами (секунды)
+    """
+
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    throttle_wait: float = 0.0
+    backoff_wait: float = 0.0
+
+    @property
+    def total_wait(self) -> float:
+        """Суммарное время ожидания (квота + повторы), секунды."""
+        return self.throttle_wait + self.backoff_wait
+
+
+class EmbeddingScheduler:
+    """
+    Планировщик запросов к API эмбеддингов с учетом квот и повторами.
+
+    Перед каждой попыткой резервирует 1 запрос в ведре RPM и оценку токенов
+    в ведре TPM и ждет, пока квота позволит отправку. Временные ошибки
+    (см. is_retryable_error) повторяются с экспоненциальной задержкой
+    и полным джиттером: delay = random(0, min(max_delay, base_delay * 2^attempt)).
+
+    Работает и с потоками (call), и с asyncio (acall); ведра общие, поэтому
+    один планировщик ограничивает суммарный темп всех вызывающих.
+
+    Attributes:
+        requests_bucket: Ведро квоты запросов в минуту (None — без ограничения)
+        tokens_bucket: Ведро квоты токенов в минуту (None — без ограничения)
+        max_retries: Максимум повторов одного запроса
+        base_delay: Базовая задержка повтора (секунды)
+        max_delay: Максимальная задержка повтора (секунды)
+        stats: Статистика планировщика
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Инициализирует планировщик.
+
+        Args:
+            requests_per_minute: Квота запросов в минуту (None — без ограничения)
+            tokens_per_minute: Квота токенов в минуту (None — без ограничения)
+            max_retries: Максимум повторов одного запроса
+            base_delay: Базовая задержка повтора (секунды)
+            max_delay: Максимальная задержка повтора (секунды)
+            clock: Источник монотонного времени
+            sleep: Функция ожидания для синхронных вызовов
+
+        Raises:
+            ValueError: Если max_retries < 0
+        """
+        if max_retries < 0:
+            raise ValueError(f"max_retries не может быть отрицательным: {max_retries}")
+
+        self.requests_bucket = (
+            TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        )
+        self.tokens_bucket = (
+            TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        )
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = SchedulerStats()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def call(self, func: Callable[[], T], tokens: int = 0) -> T:
+        """
+        Выполняет синхронный запрос с учетом квот и повторами.
+
+        Args:
+            func: Функция, выполняющая один запрос к API
+            tokens: Оценка токенов запроса (для квоты TPM)
+
+        Returns:
+            Результат func()
+
+        Raises:
+            Exception: Исходная ошибка, если она фатальная
+                или исчерпаны повторы
+        """
+        self._enter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = self._reserve(tokens)
+                if wait > 0:
+                    self._sleep(wait)
+
+                try:
+                    self._count_request()
+                    return func()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    self._sleep(delay)
+        finally:
+            self._leave()
+
+    async def acall(self, func: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Асинхронная версия call().
+
+        Args:
+            func: Фабрика корутины, выполняющей один запрос к API
+                (вызывается заново на каждую попытку)
+            tokens: Оценка токенов запроса (для квоты TPM)
+
+        Returns:
+            Результат корутины
+
+        Raises:
+            Exception: Исходная ошибка, если она фатальная
+                или исчерпаны повторы
+        """
+        self._enter()
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = self._reserve(tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                try:
+                    self._count_request()
+                    return await func()
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    await asyncio.sleep(delay)
+        finally:
+            self._leave()
+
+    def _reserve(self, tokens: int) -> float:
+        """Резервирует квоту на одну попытку и возвращает время ожидания."""
+        wait = 0.0
+        if self.requests_bucket is not None:
+            wait = max(wait, self.requests_bucket.reserve(1))
+        if self.tokens_bucket is not None and tokens:
+            wait = max(wait, self.tokens_bucket.reserve(tokens))
+
+        with self._lock:
+            self.stats.throttle_wait += wait
+        return wait
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """
+        Возвращает задержку перед повтором или пробрасывает ошибку дальше.
+
+        Raises:
+            Exception: error, если она фатальная или повторы исчерпаны
+        """
+        if not is_retryable_error(error) or attempt >= self.max_retries:
+            with self._lock:
+                self.stats.failures += 1
+            raise error
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        with self._lock:
+            self.stats.retries += 1
+            self.stats.backoff_wait += delay
+        return delay
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self.stats.requests += 1
+
+    def _enter(self) -> None:
+        with self._lock:
+            self.stats.queue_depth += 1
+            self.stats.max_queue_depth = max(
+                self.stats.max_queue_depth, self.stats.queue_depth
+            )
+
+    def _leave(self) -> None:
+        with self._lock:
+            self.stats.queue_depth -= 1
+
+
+_default_scheduler: Optional[EmbeddingScheduler] = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler() -> EmbeddingScheduler:
+    """
+    Возвращает общий для процесса планировщик запросов.
+
+    Квоты Gemini API считаются на API-ключ, поэтому все генераторы процесса
+    по умолчанию делят один планировщик, настроенный по Settings
+    (embedding_requests_per_minute, embedding_tokens_per_minute,
+    embedding_max_retries).
+
+    Returns:
+        EmbeddingScheduler: Общий планировщик
+    """
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = EmbeddingScheduler(
+                requests_per_minute=settings.embedding_requests_per_minute,
+                tokens_per_minute=settings.embedding_tokens_per_minute,
+                max_retries=settings.embedding_max_retries,
+            )
+        return _default_scheduler
+
+
 class EmbeddingGenerator:
     """
     Генератор векторных представлений текста через Google Gemini API.
@@ -24,17 +483,47 @@ class EmbeddingGenerator:
     - Асимметричный поиск (разные task_type для документов и запросов)
     - MRL (Matryoshka Representation Learning) для уменьшения размерности
     - Автоматическую нормализацию векторов
+    - Пакетную векторизацию (batchEmbedContents) с автоматической нарезкой
+      на запросы по лимитам API
+    - Персистентный кэш эмбеддингов (EmbeddingCache): в API уходят только
+      тексты, которых еще нет в кэше
+    - In-process LRU-кэш с TTL для запросов (QueryEmbeddingCache): повторные
+      запросы не ходят в API и возвращают read-only вектор без копирования
+    - Планировщик запросов (EmbeddingScheduler): квоты RPM/TPM и повторы
+      временных ошибок
+    - Склейку одинаковых одновременных запросов (SingleFlight): всплеск
+      одинаковых embed_query/embed_document из разных потоков порождает
+      один запрос к API
 
     Attributes:
         model_name: Имя модели эмбеддингов Gemini
         dimension: Целевая размерность векторов (768 для MRL)
+        max_batch_items: Максимум текстов в одном запросе
+        max_batch_chars: Максимальный суммарный размер текстов в одном запросе
+        cache: Персистентный кэш эмбеддингов (None — кэш отключен
+            или база не инициализирована)
+        query_cache: Кэш эмбеддингов запросов (None — кэш отключен)
+        scheduler: Планировщик запросов к API
+        single_flight: Склейка одновременных запросов (None — отключена)
     """
 
+    # Лимит batchEmbedContents: не больше 100 текстов в одном запросе
+    MAX_BATCH_ITEMS = 100
+
+    # Ограничение на суммарный размер запроса (символы, ~20k токенов)
+    MAX_BATCH_CHARS = 60_000
+
     def __init__(
         self,
         api_key: str | None = None,
         model_name: str | None = None,
         dimension: int | None = None,
+        max_batch_items: int | None = None,
+        max_batch_chars: int | None = None,
+        cache: EmbeddingCache | bool | None = None,
+        query_cache: QueryEmbeddingCache | bool | None = None,
+        scheduler: EmbeddingScheduler | None = None,
+        single_flight: SingleFlight | bool | None = None,
     ):
         """
         Инициализация генератора эмбеддингов.
@@ -43,13 +532,56 @@ class EmbeddingGenerator:
             api_key: API ключ Google Gemini (по умолчанию из settings)
             model_name: Модель для генерации (по умолчанию из settings)
             dimension: Размерность векторов (по умолчанию из settings)
+            max_batch_items: Максимум текстов в одном запросе
+                (по умолчанию MAX_BATCH_ITEMS)
+            max_batch_chars: Максимум символов в одном запросе
+                (по умолчанию MAX_BATCH_CHARS)
+            cache: Персистентный кэш эмбеддингов. None — кэш текущей базы
+                по настройкам Settings (см. get_default_embedding_cache()),
+                False — кэш отключен, экземпляр — собственный кэш
+            query_cache: Кэш запросов. None — общий кэш процесса по настройкам
+                Settings, False — кэш отключен, экземпляр — собственный кэш
+            scheduler: Планировщик запросов (по умолчанию общий для процесса,
+                см. get_default_scheduler())
+            single_flight: Склейка одинаковых одновременных запросов.
+                None — общая для процесса, False — отключена,
+                экземпляр — собственная
         """
         self.api_key = api_key or settings.gemini_api_key
+        if not self.api_key:
+            raise ValueError("Не задан API ключ Gemini (GEMINI_API_KEY)")
+
         self.model_name = model_name or settings.embedding_model
         self.dimension = dimension or settings.embedding_dimension
+        self.max_batch_items = min(
+            max_batch_items or self.MAX_BATCH_ITEMS, self.MAX_BATCH_ITEMS
+        )
+        self.max_batch_chars = max_batch_chars or self.MAX_BATCH_CHARS
+        if cache is None or cache is True:
+            self.cache = get_default_embedding_cache()
+        elif cache is False:
+            self.cache = None
+        else:
+            self.cache = cache
+
+        if query_cache is None or query_cache is True:
+            self.query_cache = get_default_query_cache()
+        elif query_cache is False:
+            self.query_cache = None
+        else:
+            self.query_cache = query_cache
+
+        self.scheduler = scheduler or get_default_scheduler()
+
+        if single_flight is None or single_flight is True:
+            self.single_flight = get_default_single_flight()
+        elif single_flight is False:
+            self.single_flight = None
+        else:
+            self.single_flight = single_flight
 
         # Конфигурируем API
-        genai.configure(api_key=self.api_key)
+        import_genai().configure(api_key=self.api_key)
 
     def embed_document(self, text: str) -> np.ndarray:
         """
@@ -78,12 +610,14 @@ class EmbeddingGenerator:
 
         Использует task_type="RETRIEVAL_QUERY" для оптимизации
         векторного представления пользовательских запросов.
+        При включенном query_cache повторный запрос не обращается к API.
 
         Args:
             text: Текст запроса
 
         Returns:
             np.ndarray: Нормализованный вектор размерности self.dimension
+                (read-only, если включен query_cache)
 
         Examples:
             >>> gen = EmbeddingGenerator()
@@ -91,7 +625,77 @@ class EmbeddingGenerator:
             >>> vec.shape
             (768,)
         """
-        return self._generate_embedding(text, task_type="RETRIEVAL_QUERY")
+        if self.query_cache is None:
+            return self._generate_embedding(text, task_type="RETRIEVAL_QUERY")
+
+        key = self.query_cache.make_key(self.model_name, self.dimension, text)
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = self._generate_embedding(text, task_type="RETRIEVAL_QUERY")
+        return self.query_cache.put(key, embedding)
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Генерирует эмбеддинги для набора документов пакетными запросами.
+
+        Тексты упаковываются в запросы batchEmbedContents с учетом
+        лимитов max_batch_items и max_batch_chars, поэтому 200 чанков
+        векторизуются за 2 HTTP-запроса вместо 200.
+
+        Args:
+            texts: Тексты документов для векторизации
+
+        Returns:
+            np.ndarray: Матрица (len(texts), self.dimension) с нормализованными
+                строками в порядке входных текстов
+
+        Examples:
+            >>> gen = EmbeddingGenerator()
+            >>> matrix = gen.embed_documents(["первый чанк", "второй чанк"])
+            >>> matrix.shape
+            (2, 768)
+        """
+        return self._generate_embeddings(texts, task_type="RETRIEVAL_DOCUMENT")
+
+    def embed_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Генерирует эмбеддинги для набора поисковых запросов пакетными запросами.
+
+        Args:
+            texts: Тексты запросов
+
+        Returns:
+            np.ndarray: Матрица (len(texts), self.dimension) с нормализованными
+                строками в порядке входных текстов
+        """
+        if self.query_cache is None:
+            return self._generate_embeddings(texts, task_type="RETRIEVAL_QUERY")
+
+        texts = list(texts)
+        matrix = np.empty((len(texts), self.dimension), dtype=np.float32)
+        keys = [
+            self.query_cache.make_key(self.model_name, self.dimension, text)
+            for text in texts
+        ]
+
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                matrix[i] = cached
+            else:
+                missing.append(i)
+
+        if missing:
+            computed = self._generate_embeddings(
+                [texts[i] for i in missing], task_type="RETRIEVAL_QUERY"
+            )
+            for i, vector in zip(missing, computed):
+                matrix[i] = self.query_cache.put(keys[i], vector)
+
+        return matrix
 
     def _generate_embedding(self, text: str, task_type: TaskType) -> np.ndarray:
         """
@@ -111,13 +715,36 @@ class EmbeddingGenerator:
         if not text or not text.strip():
             raise ValueError("Текст не может быть пустым")
 
+        if self.single_flight is None:
+            return self._compute_embedding(text, task_type)
+
+        # Одновременные вызовы с тем же ключом ждут один запрос к API.
+        # Результат общий, поэтому каждый вызывающий получает свою копию
+        flight_key = self._flight_key(text, task_type)
+        embedding = self.single_flight.do(
+            flight_key, lambda: self._compute_embedding(text, task_type)
+        )
+        return embedding.copy()
+
+    def _compute_embedding(self, text: str, task_type: TaskType) -> np.ndarray:
+        """Генерирует эмбеддинг одного текста (персистентный кэш + API)."""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(text, task_type)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         try:
-            # Генерируем эмбеддинг через Gemini API
-            result = genai.embed_content(
-                model=self.model_name,
-                content=text,
-                task_type=task_type,
-                output_dimensionality=self.dimension,  # MRL - режем до 768
+            # Генерируем эмбеддинг через Gemini API (с квотами и повторами)
+            result = self.scheduler.call(
+                lambda: import_genai().embed_content(
+                    model=self.model_name,
+                    content=text,
+                    task_type=task_type,
+                    output_dimensionality=self.dimension,  # MRL - режем до 768
+                ),
+                tokens=estimate_tokens([text]),
             )
 
             # Извлекаем вектор
@@ -126,11 +753,169 @@ class EmbeddingGenerator:
             # Нормализуем вектор (для косинусного сходства)
             embedding = self._normalize_vector(embedding)
 
-            return embedding
-
         except Exception as e:
             raise RuntimeError(f"Ошибка при генерации эмбеддинга: {e}")
 
+        if cache_key is not None:
+            self.cache.put(cache_key, embedding)
+
+        return embedding
+
+    def _generate_embeddings(
+        self, texts: Sequence[str], task_type: TaskType
+    ) -> np.ndarray:
+        """
+        Внутренний метод пакетной генерации эмбеддингов.
+
+        Args:
+            texts: Тексты для векторизации
+            task_type: Тип задачи (DOCUMENT или QUERY)
+
+        Returns:
+            np.ndarray: Матрица нормализованных векторов
+
+        Raises:
+            ValueError: Если хотя бы один текст пустой
+            RuntimeError: Если API вернул ошибку
+        """
+        texts = self._validate_texts(texts)
+        matrix, keys, missing = self._lookup_cache(texts, task_type)
+
+        if not missing:
+            return matrix
+
+        missing_texts = [texts[i] for i in missing]
+        computed = np.empty((len(missing), self.dimension), dtype=np.float32)
+
+        for start, end in self._iter_batches(missing_texts):
+            computed[start:end] = self._request_batch(
+                missing_texts[start:end], task_type
+            )
+
+        self._store_computed(matrix, keys, missing, computed)
+        return matrix
+
+    @staticmethod
+    def _validate_texts(texts: Sequence[str]) -> list[str]:
+        """Проверяет, что в пакете нет пустых текстов, и возвращает список."""
+        texts = list(texts)
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Текст не может быть пустым")
+        return texts
+
+    def _lookup_cache(
+        self, texts: list[str], task_type: TaskType
+    ) -> tuple[np.ndarray, list[bytes], list[int]]:
+        """
+        Заполняет результирующую матрицу векторами из персистентного кэша.
+
+        Returns:
+            tuple: (матрица результата, ключи кэша, индексы текстов-промахов)
+        """
+        matrix = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        if self.cache is None:
+            return matrix, [], list(range(len(texts)))
+
+        # Из кэша берем все, что уже векторизовано; в API уходят только промахи
+        keys = [self._cache_key(text, task_type) for text in texts]
+        cached = self.cache.get_many(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                matrix[i] = cached[key]
+            else:
+                missing.append(i)
+
+        return matrix, keys, missing
+
+    def _store_computed(
+        self,
+        matrix: np.ndarray,
+        keys: list[bytes],
+        missing: list[int],
+        computed: np.ndarray,
+    ) -> None:
+        """Нормализует полученные от API векторы, кладет их в матрицу и в кэш."""
+        computed = self._normalize_matrix(computed)
+        matrix[missing] = computed
+
+        if self.cache is not None:
+            self.cache.put_many(zip((keys[i] for i in missing), computed))
+
+    def _flight_key(self, text: str, task_type: TaskType) -> tuple:
+        """Ключ склейки одновременных запросов."""
+        return (text, task_type, self.model_name, self.dimension)
+
+    def _cache_key(self, text: str, task_type: TaskType) -> bytes:
+        """Вычисляет ключ кэша для текста с учетом модели и размерности."""
+        return self.cache.make_key(self.model_name, self.dimension, task_type, text)
+
+    def _iter_batches(self, texts: Sequence[str]) -> Iterator[tuple[int, int]]:
+        """
+        Нарезает список текстов на диапазоны [start, end) для отдельных запросов.
+
+        Каждый диапазон содержит не больше max_batch_items текстов и не больше
+        max_batch_chars символов (кроме случая, когда один текст сам по себе
+        длиннее лимита — он уходит отдельным запросом).
+        """
+        start = 0
+        batch_chars = 0
+
+        for i, text in enumerate(texts):
+            if i > start and (
+                i - start >= self.max_batch_items
+                or batch_chars + len(text) > self.max_batch_chars
+            ):
+                yield start, i
+                start = i
+                batch_chars = 0
+            batch_chars += len(text)
+
+        if start < len(texts):
+            yield start, len(texts)
+
+    def _request_batch(self, texts: list[str], task_type: TaskType) -> np.ndarray:
+        """
+        Выполняет один запрос batchEmbedContents.
+
+        Returns:
+            np.ndarray: Ненормализованная матрица (len(texts), self.dimension)
+
+        Raises:
+            RuntimeError: Если API вернул ошибку (после всех повторов)
+        """
+        try:
+            result = self.scheduler.call(
+                lambda: import_genai().embed_content(
+                    model=self.model_name,
+                    content=texts,
+                    task_type=task_type,
+                    output_dimensionality=self.dimension,
+                ),
+                tokens=estimate_tokens(texts),
+            )
+            return np.asarray(result["embedding"], dtype=np.float32)
+
+        except Exception as e:
+            raise RuntimeError(f"Ошибка при пакетной генерации эмбеддингов: {e}")
+
+    @staticmethod
+    def _normalize_matrix(matrix: np.ndarray) -> np.ndarray:
+        """
+        Нормализует строки матрицы на месте (L2-норма каждой строки = 1).
+
+        Args:
+            matrix: Матрица векторов float32
+
+        Returns:
+            np.ndarray: Та же матрица с нормализованными строками
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
+
     @staticmethod
     def _normalize_vector(vector: np.ndarray) -> np.ndarray:
         """
@@ -0,0 +1,178 @@
+"""
+Локальный детерминированный эмбеддер без обращения к сети.
+
+Векторизует текст через feature hashing символьных n-грамм: каждая n-грамма
+хэшируется в одну из dimension координат со знаком ±1, вектор нормализуется.
+Качество ниже, чем у Gemini, но векторы детерминированы, не требуют API-ключа
+и считаются векторизованно в NumPy — этого достаточно для нагрузочных тестов
+и бенчмарков индексации/поиска на сотнях тысяч чанков.
+
+Классы:
+    HashingEmbedder
+        Реализация протокола Embedder на хэшировании n-грамм.
+"""
+
+from typing import Sequence
+
+import numpy as np
+
+from config import settings
+from semantic_core.embeddings import EmbeddingGenerator
+
+
+# Множитель полиномиального хэша n-граммы и константа финализатора MurmurHash3
+_POLY_PRIME = np.uint64(1_000_003)
+_MIX_MULTIPLIER = np.uint64(0xFF51AFD7ED558CCD)
+
+# Сколько текстов векторизуем за один проход (ограничивает пиковую память)
+_TEXTS_PER_PASS = 256
+
+
+class HashingEmbedder:
+    """
+    Эмбеддер на хэшировании символьных n-грамм (hashing trick).
+
+    Весь пакет текстов обрабатывается одним набором операций NumPy:
+    тексты склеиваются в один массив кодов символов, хэши n-грамм считаются
+    скользящим полиномом, а векторы собираются через np.bincount.
+    Хэш не зависит от PYTHONHASHSEED, поэтому векторы совпадают
+    между процессами и запусками.
+
+    Attributes:
+        model_name: Имя "модели" (участвует в ключах кэшей)
+        dimension: Размерность векторов
+        ngram_sizes: Размеры символьных n-грамм
+    """
+
+    def __init__(
+        self,
+        dimension: int | None = None,
+        ngram_sizes: Sequence[int] = (3, 4),
+        model_name: str = "local/hashing-ngrams",
+    ):
+        """
+        Инициализация эмбеддера.
+
+        Args:
+            dimension: Размерность векторов (по умолчанию из settings)
+            ngram_sizes: Размеры символьных n-грамм
+            model_name: Имя модели для ключей кэшей
+
+        Raises:
+            ValueError: Если ngram_sizes пуст или содержит значения < 1
+        """
+        if not ngram_sizes or min(ngram_sizes) < 1:
+            raise ValueError(f"Некорректные размеры n-грамм: {ngram_sizes}")
+
+        self.dimension = dimension or settings.embedding_dimension
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.model_name = model_name
+
+    def embed_document(self, text: str) -> np.ndarray:
+        """Генерирует эмбеддинг документа."""
+        return self.embed_documents([text])[0]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Генерирует эмбеддинг запроса (симметрично документу)."""
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Генерирует эмбеддинги для набора текстов.
+
+        Args:
+            texts: Тексты для векторизации
+
+        Returns:
+            np.ndarray: Матрица (len(texts), self.dimension) с нормализованными строками
+
+        Raises:
+            ValueError: Если хотя бы один текст пустой
+
+        Examples:
+            >>> embedder = HashingEmbedder(dimension=256)
+            >>> embedder.embed_documents(["первый", "второй"]).shape
+            (2, 256)
+        """
+        texts = EmbeddingGenerator._validate_texts(texts)
+        matrix = np.empty((len(texts), self.dimension), dtype=np.float32)
+
+        for start in range(0, len(texts), _TEXTS_PER_PASS):
+            batch = texts[start : start + _TEXTS_PER_PASS]
+            matrix[start : start + len(batch)] = self._hash_batch(batch)
+
+        return EmbeddingGenerator._normalize_matrix(matrix)
+
+    def embed_queries(self, texts: Sequence[str]) -> np.ndarray:
+        """Генерирует эмбеддинги для набора запросов."""
+        return self.embed_documents(texts)
+
+    vector_to_blob = staticmethod(EmbeddingGenerator.vector_to_blob)
+    blob_to_vector = staticmethod(EmbeddingGenerator.blob_to_vector)
+
+    def _hash_batch(self, texts: list[str]) -> np.ndarray:
+        """Считает ненормализованные векторы для пакета текстов."""
+        # Каждый текст обрамляем пробелами, чтобы края слов давали свои n-граммы
+        encoded = [
+            np.frombuffer(f" {text.casefold()} ".encode("utf-32-le"), dtype=np.uint32)
+            for text in texts
+        ]
+        lengths = np.fromiter((len(codes) for codes in encoded), dtype=np.intp)
+        codes = np.concatenate(encoded).astype(np.uint64)
+        rows = np.repeat(np.arange(len(texts), dtype=np.intp), lengths)
+
+        hashes, owners = [], []
+        for n in self.ngram_sizes:
+            if n <= len(codes):
+                ngram_hashes, ngram_rows = self._ngram_hashes(codes, rows, n)
+                hashes.append(ngram_hashes)
+                owners.append(ngram_rows)
+
+        # Текст короче всех n-грамм: весь текст с пробелами — одна n-грамма,
+        # иначе у него не было бы ни одного признака
+        for row in np.flatnonzero(lengths < min(self.ngram_sizes)):
+            text_codes = encoded[row].astype(np.uint64)
+            ngram_hashes, _ = self._ngram_hashes(
+                text_codes, np.zeros(len(text_codes), dtype=np.intp), len(text_codes)
+            )
+            hashes.append(ngram_hashes)
+            owners.append(np.full(len(ngram_hashes), row, dtype=np.intp))
+
+        hashes = np.concatenate(hashes)
+        buckets = (hashes % np.uint64(self.dimension)).astype(np.intp)
+        flat_index = np.concatenate(owners) * self.dimension + buckets
+        counts = np.bincount(
+            flat_index,
+            weights=np.where(hashes >> np.uint64(63), -1.0, 1.0),
+            minlength=len(texts) * self.dimension,
+        )
+        return counts.reshape(len(texts), self.dimension)
+
+    @classmethod
+    def _ngram_hashes(
+        cls, codes: np.ndarray, rows: np.ndarray, n: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Хэши n-грамм, целиком лежащих внутри одного текста, и их тексты."""
+        count = len(codes) - n + 1
+
+        # n-грамма валидна, только если целиком лежит внутри одного текста
+        valid = rows[:count] == rows[n - 1 : n - 1 + count]
+
+        hashes = np.full(count, n, dtype=np.uint64)
+        for offset in range(n):
+            hashes = hashes * _POLY_PRIME + codes[offset : offset + count]
+        return cls._mix(hashes[valid]), rows[:count][valid]
+
+    @staticmethod
+    def _mix(hashes: np.ndarray) -> np.ndarray:
+        """Перемешивает биты хэшей (финализатор MurmurHash3)."""
+        hashes ^= hashes >> np.uint64(33)
+        hashes *= _MIX_MULTIPLIER
+        hashes ^= hashes >> np.uint64(33)
+        return hashes
+
+    def __repr__(self) -> str:
+        return (
+            f"HashingEmbedder(dimension={self.dimension}, "
+            f"ngram_sizes={self.ngram_sizes})"
+        )
@@ -0,0 +1,416 @@
+"""
+Обслуживание векторного индекса и файла базы данных.
+
+Проверка согласованности чанков и векторов, исправление пачками
+и возврат места ОС. Все шаги рассчитаны на работу с живой WAL-базой:
+чтение идет без блокировок, каждая исправляемая пачка — короткая
+транзакция IMMEDIATE, поэтому поиск и запись продолжают работать.
+
+Базы, созданные до триггера {table}_vec_cleanup, могли накопить
+векторы удаленных чанков: они раздувают vec0, замедляют KNN,
+а новый чанк может получить ID старого вектора.
+
+Классы:
+    ConsistencyReport
+        Счетчики несогласованности чанков и векторов.
+    SpaceReport
+        Свободные страницы до и после возврата места.
+
+Функции:
+    check_vector_consistency(chunk_model) -> ConsistencyReport
+        Находит векторы без чанков и чанки без векторов.
+    repair_vector_consistency(chunk_model, generator, batch_size) -> ConsistencyReport
+        Удаляет векторы-сироты и восстанавливает недостающие векторы.
+    reclaim_space(max_pages) -> SpaceReport
+        PRAGMA incremental_vacuum или VACUUM.
+    enable_incremental_vacuum() -> None
+        Переводит существующую базу в режим auto_vacuum=INCREMENTAL.
+    checkpoint_wal(mode) -> tuple[int, int, int]
+        Переносит WAL в основной файл.
+
+Запуск отдельным процессом (из корня репозитория):
+    python -m semantic_core.maintenance \\
+        --chunk-model domain.models.NoteChunk --repair --vacuum
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from peewee import Model
+
+from semantic_core.database import db
+from semantic_core.embeddings import Embedder
+from semantic_core.services import (
+    build_vector_text,
+    chunk_context_text,
+    note_context_text,
+)
+from semantic_core.status import ChunkStatus
+from semantic_core.vector_index import (
+    VectorIndexConfig,
+    delete_vectors,
+    get_vector_index_config,
+    insert_vectors,
+)
+
+
+# Режимы PRAGMA wal_checkpoint
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
+
+@dataclass
+class ConsistencyReport:
+    """
+    Счетчики несогласованности чанков и векторов.
+
+    Attributes:
+        orphan_vectors: Векторы без чанка по таблицам (vec0 и компаньоны)
+        missing_vectors: Чанки, у которых должен быть вектор, но его нет
+            хотя бы в одной векторной таблице
+        requeued: Чанков возвращено в очередь воркера (status=PENDING)
+        reembedded: Чанков векторизовано заново
+        unresolved: Чанков, которые нечем векторизовать (нет строки
+            заметки, например в базе, записанной без foreign_keys)
+    """
+
+    orphan_vectors: Dict[str, int] = field(default_factory=dict)
+    missing_vectors: int = 0
+    requeued: int = 0
+    reembedded: int = 0
+    unresolved: int = 0
+
+    @property
+    def total_orphans(self) -> int:
+        """Векторов-сирот во всех таблицах."""
+        return sum(self.orphan_vectors.values())
+
+    @property
+    def consistent(self) -> bool:
+        """Нет ни сирот, ни чанков без векторов."""
+        return not self.total_orphans and not self.missing_vectors
+
+
+@dataclass
+class SpaceReport:
+    """
+    Результат возврата места.
+
+    Attributes:
+        mode: "incremental" или "full"
+        page_size: Размер страницы (байты)
+        freelist_before: Свободных страниц до
+        freelist_after: Свободных страниц после
+    """
+
+    mode: str
+    page_size: int
+    freelist_before: int
+    freelist_after: int
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        """Сколько байт возвращено ОС."""
+        return (self.freelist_before - self.freelist_after) * self.page_size
+
+
+def check_vector_consistency(chunk_model: Model) -> ConsistencyReport:
+    """
+    Находит векторы без чанков и чанки без векторов.
+
+    Вектор обязателен у чанков со статусом DONE (или у всех чанков,
+    если у модели нет колонки status): PENDING/PROCESSING/FAILED
+    ждут воркера и не считаются ошибкой.
+
+    Args:
+        chunk_model: Класс модели чанков (векторы в {table}_vec)
+
+    Returns:
+        ConsistencyReport: Найденные расхождения (без исправлений)
+
+    Example:
+        >>> report = check_vector_consistency(NoteChunk)
+        >>> report.orphan_vectors
+        {'note_chunks_vec': 120, 'note_chunks_vec_f32': 120}
+    """
+    config = _vector_config(chunk_model)
+    chunk_table = chunk_model._meta.table_name
+
+    report = ConsistencyReport()
+    for table in config.vector_tables:
+        (report.orphan_vectors[table],) = db.obj.execute_sql(
+            f"SELECT COUNT(*) FROM {table} "
+            f"WHERE id NOT IN (SELECT id FROM {chunk_table})"
+        ).fetchone()
+
+    sql, params = _missing_query(chunk_model, config)
+    (report.missing_vectors,) = db.obj.execute_sql(
+        f"SELECT COUNT(*) FROM ({sql})", params
+    ).fetchone()
+
+    return report
+
+
+def repair_vector_consistency(
+    chunk_model: Model,
+    generator: Optional[Embedder] = None,
+    batch_size: int = 500,
+) -> ConsistencyReport:
+    """
+    Исправляет расхождения чанков и векторов пачками.
+
+    1. Векторы без чанков удаляются из vec0 и всех компаньонов
+    2. Чанки без векторов (или с неполным набором) очищаются от частичных
+       векторов и векторизуются заново через generator; без generator —
+       возвращаются в очередь EmbeddingWorker (status=PENDING), если у модели
+       есть колонка status, иначе только учитываются в отчете
+
+    Каждая пачка — отдельная короткая транзакция, поэтому исправление
+    можно запускать на работающей базе.
+
+    Args:
+        chunk_model: Класс модели чанков
+        generator: Эмбеддер для немедленной векторизации недостающих векторов
+        batch_size: Строк в одной пачке
+
+    Returns:
+        ConsistencyReport: Сколько найдено и что сделано
+
+    Raises:
+        ValueError: Если batch_size <= 0
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+
+    config = _vector_config(chunk_model)
+    chunk_table = chunk_model._meta.table_name
+    report = ConsistencyReport()
+
+    # 1. Векторы-сироты: удаляем из всех таблиц сразу
+    for table in config.vector_tables:
+        report.orphan_vectors[table] = 0
+        while True:
+            ids = [
+                row[0]
+                for row in db.obj.execute_sql(
+                    f"SELECT id FROM {table} "
+                    f"WHERE id NOT IN (SELECT id FROM {chunk_table}) LIMIT ?",
+                    (batch_size,),
+                )
+            ]
+            if not ids:
+                break
+            with db.atomic("IMMEDIATE"):
+                delete_vectors(config, ids)
+            report.orphan_vectors[table] += len(ids)
+
+    # 2. Чанки без векторов
+    track_status = "status" in chunk_model._meta.fields
+    if generator is None and not track_status:
+        # Восстановить нечем — только считаем
+        report.missing_vectors = check_vector_consistency(chunk_model).missing_vectors
+        return report
+
+    # Пагинация по id: чанки, которые _reembed не смог векторизовать
+    # (нет строки заметки), остаются без векторов и не должны попадать
+    # в следующие пачки снова
+    sql, params = _missing_query(chunk_model, config)
+    last_id = 0
+    while True:
+        ids = [
+            row[0]
+            for row in db.obj.execute_sql(
+                f"SELECT id FROM ({sql}) WHERE id > ? ORDER BY id LIMIT ?",
+                [*params, last_id, batch_size],
+            )
+        ]
+        if not ids:
+            break
+        last_id = ids[-1]
+        report.missing_vectors += len(ids)
+
+        if generator is not None:
+            reembedded = _reembed(chunk_model, config, ids, generator)
+            report.reembedded += reembedded
+            report.unresolved += len(ids) - reembedded
+        else:
+            with db.atomic("IMMEDIATE"):
+                delete_vectors(config, ids)
+                report.requeued += (
+                    chunk_model.update(
+                        status=ChunkStatus.PENDING, claimed_at=None, attempts=0
+                    )
+                    .where(chunk_model.id.in_(ids))
+                    .execute()
+                )
+
+    return report
+
+
+def reclaim_space(max_pages: Optional[int] = None) -> SpaceReport:
+    """
+    Возвращает ОС свободные страницы файла базы.
+
+    В режиме auto_vacuum=INCREMENTAL (по умолчанию для баз, созданных
+    init_database) выполняет PRAGMA incremental_vacuum: работает
+    короткими шагами и подходит для живой базы. Иначе выполняет полный
+    VACUUM, который перестраивает файл и блокирует запись на время работы.
+
+    vec0 не сжимает свои чанки при удалении векторов: место освобождается,
+    когда пустеет весь чанк vec0, а удаленные слоты переиспользуются новыми
+    векторами.
+
+    Args:
+        max_pages: Максимум страниц за вызов incremental_vacuum (None — все)
+
+    Returns:
+        SpaceReport: Свободные страницы до и после
+    """
+    (page_size,) = db.obj.execute_sql("PRAGMA page_size").fetchone()
+    (freelist_before,) = db.obj.execute_sql("PRAGMA freelist_count").fetchone()
+    (auto_vacuum,) = db.obj.execute_sql("PRAGMA auto_vacuum").fetchone()
+
+    if auto_vacuum == 2:
+        mode = "incremental"
+        # Прагма выполняется по шагам при чтении результата
+        db.obj.execute_sql(f"PRAGMA incremental_vacuum({max_pages or 0})").fetchall()
+    else:
+        mode = "full"
+        db.obj.execute_sql("VACUUM")
+
+    (freelist_after,) = db.obj.execute_sql("PRAGMA freelist_count").fetchone()
+    return SpaceReport(mode, page_size, freelist_before, freelist_after)
+
+
+def enable_incremental_vacuum() -> None:
+    """
+    Переводит существующую базу в режим auto_vacuum=INCREMENTAL.
+
+    Для уже созданной базы режим вступает в силу только после полного
+    VACUUM, поэтому функция выполняет его (один раз, блокирует запись).
+    """
+    db.obj.execute_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    db.obj.execute_sql("VACUUM")
+
+
+def checkpoint_wal(mode: str = "PASSIVE") -> tuple[int, int, int]:
+    """
+    Переносит страницы из WAL в основной файл базы.
+
+    PASSIVE не ждет читателей и писателей; TRUNCATE после VACUUM
+    дополнительно обрезает файл -wal до нуля.
+
+    Args:
+        mode: PASSIVE, FULL, RESTART или TRUNCATE
+
+    Returns:
+        tuple: (busy, кадров в WAL, перенесено кадров) — как в PRAGMA wal_checkpoint
+
+    Raises:
+        ValueError: Если режим неизвестен
+    """
+    mode = mode.upper()
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(
+            f"Неизвестный режим checkpoint: {mode}. Допустимые: {CHECKPOINT_MODES}"
+        )
+
+    return tuple(db.obj.execute_sql(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+def _vector_config(chunk_model: Model) -> VectorIndexConfig:
+    """Конфигурация векторной таблицы модели чанков."""
+    return get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
+
+
+def _missing_query(chunk_model: Model, config: VectorIndexConfig) -> tuple[str, list]:
+    """SQL (id) чанков, которым нужен вектор, но его нет хотя бы в одной таблице."""
+    chunk_table = chunk_model._meta.table_name
+    absent = " OR ".join(
+        f"id NOT IN (SELECT id FROM {table})" for table in config.written_tables
+    )
+
+    if "status" in chunk_model._meta.fields:
+        return (
+            f"SELECT id FROM {chunk_table} WHERE status = ? AND ({absent}) ORDER BY id",
+            [ChunkStatus.DONE],
+        )
+    return f"SELECT id FROM {chunk_table} WHERE {absent} ORDER BY id", []
+
+
+def _reembed(
+    chunk_model: Model, config: VectorIndexConfig, ids: list[int], generator: Embedder
+) -> int:
+    """Векторизует чанки заново и заменяет их векторы."""
+    note_model = chunk_model.note.rel_model
+    chunks = list(
+        chunk_model.select(chunk_model, note_model)
+        .join(note_model)
+        .where(chunk_model.id.in_(ids))
+        .order_by(chunk_model.id)
+    )
+    if not chunks:
+        return 0
+
+    texts = [
+        build_vector_text(
+            chunk_context_text(chunk, note_context_text(chunk.note)), chunk.content
+        )
+        for chunk in chunks
+    ]
+    embeddings = generator.embed_documents(texts)
+
+    with db.atomic("IMMEDIATE"):
+        delete_vectors(config, [chunk.id for chunk in chunks])
+        insert_vectors(config, [chunk.id for chunk in chunks], embeddings)
+
+    return len(chunks)
+
+
+def main() -> None:
+    from semantic_core.database import import_model, init_database
+    from semantic_core.embeddings import create_embedder
+
+    parser = argparse.ArgumentParser(description="Обслуживание векторного индекса")
+    parser.add_argument(
+        "--chunk-model", required=True, help="например domain.models.NoteChunk"
+    )
+    parser.add_argument("--repair", action="store_true", help="исправить расхождения")
+    parser.add_argument(
+        "--reembed",
+        action="store_true",
+        help="векторизовать недостающие сразу (иначе — в очередь воркера)",
+    )
+    parser.add_argument("--vacuum", action="store_true", help="вернуть место ОС")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    chunk_model = import_model(args.chunk_model)
+    init_database().connect()
+
+    if args.repair:
+        generator = create_embedder() if args.reembed else None
+        report = repair_vector_consistency(chunk_model, generator, args.batch_size)
+    else:
+        report = check_vector_consistency(chunk_model)
+
+    for table, count in report.orphan_vectors.items():
+        print(f"Векторов без чанка в {table}: {count}")
+    print(f"Чанков без вектора: {report.missing_vectors}")
+    if args.repair:
+        print(
+            f"Векторизовано заново: {report.reembedded}, "
+            f"возвращено в очередь: {report.requeued}"
+        )
+
+    if args.vacuum:
+        space = reclaim_space()
+        checkpoint_wal("TRUNCATE")
+        print(
+            f"Возвращено ({space.mode}): {space.reclaimed_bytes / 1024:.0f} КБ, "
+            f"свободных страниц: {space.freelist_before} → {space.freelist_after}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""
+Параллельный конвейер загрузки заметок.
+
+Стадии соединены ограниченными очередями, поэтому быстрая стадия
+упирается в медленную (backpressure), а память остается ограниченной:
+
+    чтение → [пул процессов: нарезка] → [потоки: эмбеддинги] → [писатель]
+
+- Нарезка и сборка текстов с контекстом нагружают CPU и идут в пуле
+  процессов (GIL не мешает)
+- Векторизация — сетевые запросы, идет в нескольких потоках
+- Запись — один поток со своим соединением, одна транзакция на пачку
+  (SQLite допускает одного писателя, конкуренция за блокировку не нужна)
+
+Пачки записываются в порядке чтения, поэтому ID заметок идут так же,
+как при последовательной загрузке через ingest_notes().
+
+Классы:
+    StageStats
+        Метрики одной стадии конвейера.
+    PipelineStats
+        Итоговые метрики конвейера.
+    IngestPipeline
+        Конвейер массовой загрузки заметок.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from peewee import Model
+
+from semantic_core.database import db
+from semantic_core.embeddings import Embedder
+from semantic_core.services import (
+    check_context_mode,
+    note_breadcrumb_root,
+    note_context_text,
+    split_with_context,
+    write_note_batch,
+)
+from semantic_core.text_processing import TextSplitter
+from semantic_core.vector_index import get_vector_index_config
+
+
+# Маркер конца потока данных в очередях
+_DONE = object()
+
+# Как часто заблокированные на очереди стадии проверяют флаг остановки (секунды)
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class StageStats:
+    """
+    Метрики одной стадии конвейера.
+
+    Attributes:
+        name: Имя стадии (split, embed, write)
+        workers: Количество параллельных воркеров стадии
+        batches: Обработано пачек
+        chunks: Обработано чанков
+        busy_seconds: Суммарное время работы воркеров (без ожидания очередей)
+    """
+
+    name: str
+    workers: int
+    batches: int = 0
+    chunks: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        """
+        Пропускная способность стадии, если все воркеры заняты.
+
+        Стадия с наименьшим значением — узкое место конвейера.
+        """
+        if not self.busy_seconds:
+            return 0.0
+        return self.chunks * self.workers / self.busy_seconds
+
+
+@dataclass
+class PipelineStats:
+    """
+    Итоговые метрики конвейера.
+
+    Attributes:
+        notes: Записано заметок
+        chunks: Записано чанков
+        batches: Закоммичено пачек
+        elapsed: Время работы конвейера (секунды)
+        stages: Метрики стадий по имени (split, embed, write)
+    """
+
+    notes: int = 0
+    chunks: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    @property
+    def notes_per_second(self) -> float:
+        """Скорость загрузки в заметках в секунду."""
+        return self.notes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Скорость загрузки в чанках в секунду."""
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bottleneck(self) -> Optional[str]:
+        """Имя стадии с наименьшей пропускной способностью."""
+        measured = [stage for stage in self.stages.values() if stage.busy_seconds]
+        if not measured:
+            return None
+        return min(measured, key=lambda stage: stage.chunks_per_second).name
+
+
+class IngestPipeline:
+    """
+    Конвейер массовой загрузки заметок.
+
+    Делает то же, что ingest_notes(), но стадии работают параллельно:
+    пока пачка N пишется в БД, пачка N+1 векторизуется, а N+2 нарезается.
+
+    Attributes:
+        batch_size: Заметок в одной пачке (и в одной транзакции)
+        split_workers: Процессов для нарезки (0 — нарезка в читающем потоке)
+        embed_workers: Потоков для векторизации
+        queue_size: Емкость очередей между стадиями (в пачках)
+
+    Example:
+        >>> pipeline = IngestPipeline(
+        ...     Note, NoteChunk, splitter, generator,
+        ...     batch_size=200, split_workers=4, embed_workers=8,
+        ... )
+        >>> stats = pipeline.run(read_notes())
+        >>> print(stats.chunks_per_second, stats.bottleneck)
+    """
+
+    def __init__(
+        self,
+        note_model: Model,
+        chunk_model: Model,
+        splitter: TextSplitter,
+        generator: Embedder,
+        batch_size: int = 100,
+        split_workers: Optional[int] = None,
+        embed_workers: int = 4,
+        queue_size: Optional[int] = None,
+        context: str = "note",
+    ):
+        """
+        Инициализирует конвейер.
+
+        Args:
+            note_model: Класс модели Note (родитель)
+            chunk_model: Класс модели NoteChunk (ребенок)
+            splitter: Сплиттер (должен сериализоваться pickle для пула процессов)
+            generator: Эмбеддер (вызывается из нескольких потоков)
+            batch_size: Заметок в одной пачке
+            split_workers: Процессов для нарезки (по умолчанию число ядер)
+            embed_workers: Потоков для векторизации
+            queue_size: Емкость очередей (по умолчанию 2 * embed_workers)
+            context: Контекст чанков, как в save_note_with_chunks
+
+        Raises:
+            ValueError: Если параметры некорректны
+        """
+        if split_workers is None:
+            split_workers = os.cpu_count() or 1
+        if queue_size is None:
+            queue_size = 2 * embed_workers
+
+        if batch_size <= 0:
+            raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+        if split_workers < 0:
+            raise ValueError(
+                f"split_workers не может быть отрицательным: {split_workers}"
+            )
+        if embed_workers <= 0:
+            raise ValueError(
+                f"embed_workers должен быть > 0, получено: {embed_workers}"
+            )
+        if queue_size <= 0:
+            raise ValueError(f"queue_size должен быть > 0, получено: {queue_size}")
+        check_context_mode(context)
+
+        self.note_model = note_model
+        self.chunk_model = chunk_model
+        self.splitter = splitter
+        self.generator = generator
+        self.batch_size = batch_size
+        self.split_workers = split_workers
+        self.embed_workers = embed_workers
+        self.queue_size = queue_size
+        self.context = context
+
+    def run(
+        self,
+        notes: Iterable[Dict[str, Any]],
+        on_batch: Optional[Callable[[PipelineStats], None]] = None,
+    ) -> PipelineStats:
+        """
+        Загружает заметки из итератора.
+
+        Итератор читается в вызывающем потоке по мере освобождения места
+        в очередях. При ошибке в любой стадии конвейер останавливается,
+        уже закоммиченные пачки остаются в БД, а исключение пробрасывается.
+
+        Args:
+            notes: Итератор словарей с данными заметок
+            on_batch: Колбэк прогресса, вызывается из потока-писателя
+                после коммита каждой пачки
+
+        Returns:
+            PipelineStats: Итоговые метрики
+
+        Raises:
+            Exception: Первая ошибка, возникшая в стадиях конвейера
+        """
+        run = _PipelineRun(self, on_batch)
+        return run.execute(notes)
+
+
+class _PipelineRun:
+    """Состояние одного запуска конвейера: очереди, потоки, метрики, ошибки."""
+
+    def __init__(
+        self,
+        pipeline: IngestPipeline,
+        on_batch: Optional[Callable[[PipelineStats], None]],
+    ):
+        self.pipeline = pipeline
+        self.on_batch = on_batch
+        self.vector_config = get_vector_index_config(
+            f"{pipeline.chunk_model._meta.table_name}_vec"
+        )
+        self.stats = PipelineStats(
+            stages={
+                "split": StageStats("split", max(pipeline.split_workers, 1)),
+                "embed": StageStats("embed", pipeline.embed_workers),
+                "write": StageStats("write", 1),
+            }
+        )
+        self.split_queue = queue.Queue(maxsize=pipeline.queue_size)
+        self.write_queue = queue.Queue(maxsize=pipeline.queue_size)
+        self.stop = threading.Event()
+        self.errors: List[BaseException] = []
+        self.lock = threading.Lock()
+        self.started = 0.0
+
+    def execute(self, notes: Iterable[Dict[str, Any]]) -> PipelineStats:
+        """Запускает стадии, читает итератор и дожидается записи всех пачек."""
+        self.started = time.perf_counter()
+        pool = None
+        if self.pipeline.split_workers:
+            # spawn: fork процесса с работающими потоками небезопасен
+            pool = ProcessPoolExecutor(
+                self.pipeline.split_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        embedders = [
+            threading.Thread(target=self._guard, args=(self._embed_loop,), daemon=True)
+            for _ in range(self.pipeline.embed_workers)
+        ]
+        writer = threading.Thread(
+            target=self._guard, args=(self._write_loop,), daemon=True
+        )
+        for thread in [*embedders, writer]:
+            thread.start()
+
+        try:
+            self._guard(self._feed, notes, pool)
+        finally:
+            for _ in embedders:
+                self._put(self.split_queue, _DONE)
+            for thread in embedders:
+                thread.join()
+            self._put(self.write_queue, _DONE)
+            writer.join()
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        self.stats.elapsed = time.perf_counter() - self.started
+        if self.errors:
+            raise self.errors[0]
+        return self.stats
+
+    def _guard(self, stage: Callable, *args) -> None:
+        """Запускает стадию и при ошибке останавливает весь конвейер."""
+        try:
+            stage(*args)
+        except BaseException as error:
+            with self.lock:
+                self.errors.append(error)
+            self.stop.set()
+
+    def _feed(self, notes: Iterable[Dict[str, Any]], pool) -> None:
+        """Стадия чтения: режет итератор на пачки и отправляет их на нарезку."""
+        pipeline = self.pipeline
+        iterator = iter(notes)
+        sequence = 0
+
+        while not self.stop.is_set():
+            batch = list(islice(iterator, pipeline.batch_size))
+            if not batch:
+                break
+
+            note_objects = [pipeline.note_model(**data) for data in batch]
+            items = [
+                (
+                    note.content,
+                    note_context_text(note),
+                    note_breadcrumb_root(note, pipeline.context),
+                )
+                for note in note_objects
+            ]
+
+            if pool is not None:
+                future = pool.submit(_split_batch, pipeline.splitter, items)
+            else:
+                future = Future()
+                future.set_result(_split_batch(pipeline.splitter, items))
+
+            if not self._put(self.split_queue, (sequence, note_objects, future)):
+                break
+            sequence += 1
+
+    def _embed_loop(self) -> None:
+        """Стадия векторизации: один эмбеддинг-запрос на пачку."""
+        while (item := self._get(self.split_queue)) is not _DONE:
+            sequence, note_objects, future = item
+            prepared, split_seconds = future.result()
+            vector_texts = [text for _, texts in prepared for text in texts]
+
+            started = time.perf_counter()
+            embeddings = (
+                self.pipeline.generator.embed_documents(vector_texts)
+                if vector_texts
+                else None
+            )
+            embed_seconds = time.perf_counter() - started
+
+            with self.lock:
+                self._record("split", len(vector_texts), split_seconds)
+                self._record("embed", len(vector_texts), embed_seconds)
+
+            if not self._put(
+                self.write_queue, (sequence, note_objects, prepared, embeddings)
+            ):
+                return
+
+    def _write_loop(self) -> None:
+        """Стадия записи: единственный писатель, пачки коммитятся по порядку."""
+        pipeline = self.pipeline
+        pending = {}
+        next_sequence = 0
+
+        # Отдельное соединение этого потока (соединения Peewee потоколокальные)
+        db.connect(reuse_if_open=True)
+        try:
+            while (item := self._get(self.write_queue)) is not _DONE:
+                pending[item[0]] = item
+
+                # Пачки приходят из нескольких потоков вразнобой — пишем по порядку
+                while next_sequence in pending:
+                    _, note_objects, prepared, embeddings = pending.pop(next_sequence)
+
+                    started = time.perf_counter()
+                    chunk_count = write_note_batch(
+                        pipeline.note_model,
+                        pipeline.chunk_model,
+                        note_objects,
+                        prepared,
+                        embeddings,
+                        self.vector_config,
+                    )
+
+                    with self.lock:
+                        self._record(
+                            "write", chunk_count, time.perf_counter() - started
+                        )
+                        self.stats.notes += len(note_objects)
+                        self.stats.chunks += chunk_count
+                        self.stats.batches += 1
+                        self.stats.elapsed = time.perf_counter() - self.started
+
+                    if self.on_batch is not None:
+                        self.on_batch(self.stats)
+                    next_sequence += 1
+        finally:
+            db.close()
+
+    def _record(self, stage: str, chunks: int, seconds: float) -> None:
+        """Добавляет обработанную пачку в метрики стадии (под self.lock)."""
+        stats = self.stats.stages[stage]
+        stats.batches += 1
+        stats.chunks += chunks
+        stats.busy_seconds += seconds
+
+    def _put(self, target: queue.Queue, item) -> bool:
+        """Кладет элемент в очередь, ожидая места. False — конвейер остановлен."""
+        # После остановки потребители сами выходят из _get, маркер не нужен
+        while not self.stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue):
+        """Берет элемент из очереди. _DONE — данные кончились или остановка."""
+        while not self.stop.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+
+def _split_batch(splitter: TextSplitter, items: list) -> tuple[list, float]:
+    """
+    Нарезает пачку заметок (выполняется в процессе пула).
+
+    Args:
+        splitter: Сплиттер
+        items: (текст заметки, контекст, начало хлебных крошек или None)
+
+    Returns:
+        tuple: ([(чанки, тексты для векторизации), ...], время нарезки в секундах)
+    """
+    started = time.perf_counter()
+    prepared = [
+        split_with_context(splitter, content, context, root)
+        for content, context, root in items
+    ]
+    return prepared, time.perf_counter() - started
@@ -3,14 +3,90 @@
 
 Поиск ведется по дочерним чанкам (NoteChunk), но возвращаются
 уникальные родительские документы (Note) с агрегированными скорами.
+
+Ближайшие чанки отбираются подзапросом кандидатов (candidate_kind),
+поэтому поиск работает с любым форматом хранения векторов (float32, int8
+с пересчетом) с бинарным компаньоном (Хэмминг + точный пересчет) и с
+префиксными копиями MRL (KNN по короткому префиксу + пересчет по полным
+векторам).
+
+SQL берется из кэша планов (search_plan): на каждый вызов подставляются
+только параметры.
+
+С fields=[...] функции возвращают SearchHit: ID, ранг, лучший чанк (ID,
+индекс и смещения в Note.content) и выбранные поля берутся из той же
+строки ранжирующего запроса, без второго запроса за заметками и без
+чтения их content. snippet=True добавляет фрагмент FTS5 snippet() с
+выделенными совпадениями — его тоже считает SQLite.
+
+Классы:
+    SearchHit
+        Компактный результат поиска с ленивой загрузкой заметки.
 """
 
-from typing import Any, Optional, List, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-from peewee import Model
+from peewee import Model, chunked
 
 from semantic_core.database import db
-from semantic_core.embeddings import EmbeddingGenerator
+from semantic_core.embeddings import Embedder, create_embedder
+from semantic_core.search_plan import SearchPlan, get_search_plan
+from semantic_core.vector_index import (
+    candidate_kind,
+    candidate_params,
+    get_vector_index_config,
+)
+
+
+# Сколько ID подставляем в один IN (...) при загрузке заметок
+_LOAD_BATCH = 500
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """
+    Компактный результат поиска без загрузки полной заметки.
+
+    Строится прямо из строки ранжирующего запроса (fields=...): content
+    заметки не читается. Полная заметка загружается лениво по hit.note.
+
+    Attributes:
+        id: ID заметки
+        score: distance, bm25_rank или rrf_score (как в кортежах)
+        title: Заголовок, если "title" есть в fields
+        chunk_id: ID лучшего чанка по distance (None для fts)
+        chunk_index: Позиция лучшего чанка в заметке
+        chunk_start: Начало лучшего чанка в Note.content (символы)
+        chunk_end: Конец лучшего чанка (не включительно)
+        snippet: Фрагмент FTS5 с совпадениями в <b>…</b> (snippet=True;
+            None в vector и для заметок, найденных только по векторам)
+        extra: Остальные поля из fields по именам полей модели
+        parent_model: Класс модели для ленивой загрузки note
+    """
+
+    id: int
+    score: float
+    title: Optional[str] = None
+    chunk_id: Optional[int] = None
+    chunk_index: Optional[int] = None
+    chunk_start: Optional[int] = None
+    chunk_end: Optional[int] = None
+    snippet: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+    parent_model: Optional[type] = field(default=None, repr=False, compare=False)
+    _note: Any = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def note(self) -> Any:
+        """Полная заметка (загружается при первом обращении)."""
+        if self._note is None:
+            self._note = self.parent_model.get_by_id(self.id)
+        return self._note
+
+
+# Кортежи (заметка, score) или SearchHit при заданных fields или snippet
+SearchResults = Union[List[Tuple[Any, float]], List[SearchHit]]
 
 
 def vector_search_chunks(
@@ -18,9 +94,14 @@ def vector_search_chunks(
     chunk_model: Model,
     query: str,
     limit: int = 10,
-    generator: Optional[EmbeddingGenerator] = None,
+    generator: Optional[Embedder] = None,
+    binary: Optional[bool] = None,
+    oversample: Optional[int] = None,
+    prefix_dimension: Optional[int] = None,
+    shortlist: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
     **filters,
-) -> List[Tuple[Any, float]]:
+) -> SearchResults:
     """
     Векторный поиск по чанкам с возвратом уникальных родителей.
 
@@ -36,11 +117,24 @@ def vector_search_chunks(
         chunk_model: Класс модели NoteChunk (ребенок)
         query: Текст поискового запроса
         limit: Максимальное количество результатов (уникальных заметок)
-        generator: Генератор эмбеддингов (создается автоматически)
+        generator: Эмбеддер (по умолчанию create_embedder())
+        binary: Грубый KNN по бинарному компаньону с точным пересчетом
+            (None — если компаньон создан для таблицы)
+        oversample: Множитель кандидатов бинарного поиска
+            (по умолчанию из конфигурации таблицы)
+        prefix_dimension: Размерность префикса MRL для первого прохода
+            (None — самый короткий из созданных; полная размерность —
+            без префиксного прохода)
+        shortlist: Сколько чанков отбирать по префиксу для пересчета
+        fields: Проекция вместо загрузки заметок: имена полей родителя
+            (например, ["title"]), которые вернет сам ранжирующий запрос;
+            результат — список SearchHit с лучшим чанком и его
+            смещениями (None — кортежи с Note)
         **filters: Фильтры для родительской модели (например, category_id=5)
 
     Returns:
         List[Tuple[Note, float]]: Список кортежей (заметка, distance)
+        или List[SearchHit], если задан fields
 
     Example:
         >>> from domain.models import Note, NoteChunk
@@ -54,75 +148,39 @@ def vector_search_chunks(
         ...     print(f"{note.title}: {distance:.4f}")
     """
     if generator is None:
-        generator = EmbeddingGenerator()
+        generator = create_embedder()
 
     # Генерируем эмбеддинг запроса
     query_embedding = generator.embed_query(query)
-    query_blob = generator.vector_to_blob(query_embedding)
-
-    chunk_table = chunk_model._meta.table_name
-    parent_table = parent_model._meta.table_name
-    vector_table = f"{chunk_table}_vec"
-
-    # Строим WHERE clause для фильтров родителя
-    where_conditions = []
-    where_params = []
-    for field, value in filters.items():
-        where_conditions.append(f"parent.{field} = ?")
-        where_params.append(value)
-
-    where_clause = f"AND {' AND '.join(where_conditions)}" if where_conditions else ""
-
-    # SQL: Ищем чанки → группируем по note_id → берем MIN(distance)
-    sql = f"""
-        SELECT 
-            chunk.note_id,
-            MIN(vec_distance_cosine(vec.embedding, ?)) as best_distance
-        FROM {chunk_table} chunk
-        INNER JOIN {vector_table} vec ON chunk.id = vec.id
-        INNER JOIN {parent_table} parent ON chunk.note_id = parent.id
-        WHERE vec.embedding MATCH ?
-          AND vec.k = ?
-          {where_clause}
-        GROUP BY chunk.note_id
-        ORDER BY best_distance ASC
-        LIMIT ?
-    """
-
-    # Параметры: query_blob (для distance), query_blob (для MATCH), k, [filters], limit
-    # MATCH с k - это предфильтр: сначала найти топ-(limit*10) чанков
-    params = [query_blob, query_blob, limit * 10] + where_params + [limit]
-
-    cursor = db.obj.execute_sql(sql, params)
-    results = cursor.fetchall()  # [(note_id, distance), ...]
 
-    if not results:
-        return []
+    vector_config = get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
 
-    # Получаем объекты Note в правильном порядке
-    note_ids = [row[0] for row in results]
-    id_to_distance = {row[0]: row[1] for row in results}
-
-    # Загружаем заметки
-    notes = {
-        note.id: note
-        for note in parent_model.select().where(parent_model.id.in_(note_ids))
-    }
+    # Предфильтр: топ-(limit*10) ближайших чанков с точным distance
+    k_candidates = limit * 10
+    kind = candidate_kind(vector_config, k_candidates, binary, prefix_dimension)
+    plan = get_search_plan(
+        "vector", parent_model, chunk_model, filters, vector_config, kind, fields or ()
+    )
+    params = plan.bind(
+        filters,
+        candidate_params(
+            vector_config, kind, query_embedding, k_candidates, oversample, shortlist
+        ),
+        limit=limit,
+    )
 
-    # Возвращаем в порядке релевантности
-    return [
-        (notes[note_id], id_to_distance[note_id])
-        for note_id in note_ids
-        if note_id in notes
-    ]
+    rows = db.obj.execute_sql(plan.sql, params).fetchall()
+    return finish_results(parent_model, plan, [rows], fields is not None)[0]
 
 
 def fulltext_search_parents(
     parent_model: Model,
     query: str,
     limit: int = 10,
+    fields: Optional[Sequence[str]] = None,
+    snippet: bool = False,
     **filters,
-) -> List[Tuple[Any, float]]:
+) -> SearchResults:
     """
     Полнотекстовый поиск по родительским документам (Note).
 
@@ -133,10 +191,17 @@ def fulltext_search_parents(
         parent_model: Класс модели Note
         query: Текст запроса (поддерживает FTS5 синтаксис)
         limit: Максимальное количество результатов
+        fields: Проекция вместо загрузки заметок: имена полей родителя
+            (например, ["title"]), которые вернет сам ранжирующий запрос;
+            результат — список SearchHit (None — кортежи с Note)
+        snippet: Вернуть SearchHit с фрагментом FTS5 snippet() — совпадения
+            выделены <b>…</b>, фрагмент считает SQLite без чтения content
+            в Python
         **filters: Фильтры (например, category_id=5)
 
     Returns:
         List[Tuple[Note, float]]: Список кортежей (заметка, bm25_rank)
+        или List[SearchHit], если заданы fields или snippet
 
     Example:
         >>> results = fulltext_search_parents(
@@ -145,51 +210,13 @@ def fulltext_search_parents(
         ...     limit=5
         ... )
     """
-    parent_table = parent_model._meta.table_name
-    fts_table = f"{parent_table}_fts"
-
-    # Строим WHERE clause для фильтров
-    where_conditions = []
-    where_params = []
-    for field, value in filters.items():
-        where_conditions.append(f"parent.{field} = ?")
-        where_params.append(value)
-
-    where_clause = f"AND {' AND '.join(where_conditions)}" if where_conditions else ""
-
-    sql = f"""
-        SELECT 
-            parent.id,
-            fts.rank as bm25_rank
-        FROM {parent_table} parent
-        INNER JOIN {fts_table} fts ON parent.id = fts.rowid
-        WHERE {fts_table} MATCH ?
-          {where_clause}
-        ORDER BY bm25_rank
-        LIMIT ?
-    """
-
-    params = [query] + where_params + [limit]
-
-    cursor = db.obj.execute_sql(sql, params)
-    results = cursor.fetchall()
-
-    if not results:
-        return []
-
-    note_ids = [row[0] for row in results]
-    id_to_rank = {row[0]: row[1] for row in results}
+    plan = get_search_plan(
+        "fts", parent_model, filter_names=filters, fields=fields or (), snippet=snippet
+    )
+    params = plan.bind(filters, query=query, limit=limit)
 
-    notes = {
-        note.id: note
-        for note in parent_model.select().where(parent_model.id.in_(note_ids))
-    }
-
-    return [
-        (notes[note_id], id_to_rank[note_id])
-        for note_id in note_ids
-        if note_id in notes
-    ]
+    rows = db.obj.execute_sql(plan.sql, params).fetchall()
+    return finish_results(parent_model, plan, [rows], fields is not None or snippet)[0]
 
 
 def hybrid_search_rrf(
@@ -198,9 +225,15 @@ def hybrid_search_rrf(
     query: str,
     limit: int = 10,
     k: int = 60,
-    generator: Optional[EmbeddingGenerator] = None,
+    generator: Optional[Embedder] = None,
+    binary: Optional[bool] = None,
+    oversample: Optional[int] = None,
+    prefix_dimension: Optional[int] = None,
+    shortlist: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+    snippet: bool = False,
     **filters,
-) -> List[Tuple[Any, float]]:
+) -> SearchResults:
     """
     Гибридный поиск с Reciprocal Rank Fusion (RRF).
 
@@ -220,10 +253,22 @@ def hybrid_search_rrf(
         limit: Максимальное количество результатов
         k: Параметр RRF (по умолчанию 60)
         generator: Генератор эмбеддингов
+        binary: Грубый KNN по бинарному компаньону в векторной ветке
+            (None — если компаньон создан для таблицы)
+        oversample: Множитель кандидатов бинарного поиска
+        prefix_dimension: Размерность префикса MRL в векторной ветке
+        shortlist: Сколько чанков отбирать по префиксу для пересчета
+        fields: Проекция вместо загрузки заметок: имена полей родителя
+            (например, ["title"]), которые вернет сам ранжирующий запрос;
+            результат — список SearchHit (None — кортежи с Note)
+        snippet: Вернуть SearchHit с фрагментом FTS5 snippet() — совпадения
+            выделены <b>…</b>, фрагмент считает SQLite без чтения content
+            в Python
         **filters: Фильтры для родительской модели
 
     Returns:
         List[Tuple[Note, float]]: Список кортежей (заметка, rrf_score)
+        или List[SearchHit], если заданы fields или snippet
 
     Example:
         >>> results = hybrid_search_rrf(
@@ -235,104 +280,102 @@ def hybrid_search_rrf(
         ... )
     """
     if generator is None:
-        generator = EmbeddingGenerator()
+        generator = create_embedder()
 
     # Генерируем эмбеддинг запроса
     query_embedding = generator.embed_query(query)
-    query_blob = generator.vector_to_blob(query_embedding)
-
-    chunk_table = chunk_model._meta.table_name
-    parent_table = parent_model._meta.table_name
-    vector_table = f"{chunk_table}_vec"
-    fts_table = f"{parent_table}_fts"
-
-    # Строим WHERE clause для фильтров
-    where_conditions = []
-    where_params = []
-    for field, value in filters.items():
-        where_conditions.append(f"parent.{field} = ?")
-        where_params.append(value)
-
-    where_clause_vector = (
-        f"AND {' AND '.join(where_conditions)}" if where_conditions else ""
+
+    vector_config = get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
+
+    k_candidates = limit * 10
+    kind = candidate_kind(vector_config, k_candidates, binary, prefix_dimension)
+    plan = get_search_plan(
+        "hybrid",
+        parent_model,
+        chunk_model,
+        filters,
+        vector_config,
+        kind,
+        fields or (),
+        snippet,
     )
-    where_clause_fts = (
-        f"AND {' AND '.join(where_conditions)}" if where_conditions else ""
+    params = plan.bind(
+        filters,
+        candidate_params(
+            vector_config, kind, query_embedding, k_candidates, oversample, shortlist
+        ),
+        query=query,
+        k=k,
+        limit=limit,
     )
 
-    # Гибридный поиск через CTE
-    sql = f"""
-        WITH vector_results AS (
-            SELECT 
-                chunk.note_id,
-                MIN(vec_distance_cosine(vec.embedding, ?)) as best_distance,
-                ROW_NUMBER() OVER (ORDER BY MIN(vec_distance_cosine(vec.embedding, ?))) as rank
-            FROM {chunk_table} chunk
-            INNER JOIN {vector_table} vec ON chunk.id = vec.id
-            INNER JOIN {parent_table} parent ON chunk.note_id = parent.id
-            WHERE vec.embedding MATCH ?
-              AND vec.k = ?
-              {where_clause_vector}
-            GROUP BY chunk.note_id
-            ORDER BY best_distance ASC
-            LIMIT 100
-        ),
-        fts_results AS (
-            SELECT 
-                parent.id as note_id,
-                fts.rank as bm25_rank,
-                ROW_NUMBER() OVER (ORDER BY fts.rank) as rank
-            FROM {parent_table} parent
-            INNER JOIN {fts_table} fts ON parent.id = fts.rowid
-            WHERE {fts_table} MATCH ?
-              {where_clause_fts}
-            ORDER BY bm25_rank
-            LIMIT 100
-        ),
-        rrf_scores AS (
-            SELECT 
-                COALESCE(v.note_id, f.note_id) as note_id,
-                (
-                    COALESCE(1.0 / (? + v.rank), 0) + 
-                    COALESCE(1.0 / (? + f.rank), 0)
-                ) as rrf_score
-            FROM vector_results v
-            FULL OUTER JOIN fts_results f ON v.note_id = f.note_id
-        )
-        SELECT note_id, rrf_score
-        FROM rrf_scores
-        ORDER BY rrf_score DESC
-        LIMIT ?
-    """
+    rows = db.obj.execute_sql(plan.sql, params).fetchall()
+    return finish_results(parent_model, plan, [rows], fields is not None or snippet)[0]
 
-    # Параметры:
-    # - vector: query_blob (distance), query_blob (distance в ROW_NUMBER), query_blob (MATCH), k, filters
-    # - fts: query, filters
-    # - rrf: k, k, limit
-    params = (
-        [query_blob, query_blob, query_blob, limit * 10]
-        + where_params
-        + [query]
-        + where_params
-        + [k, k, limit]
-    )
 
-    cursor = db.obj.execute_sql(sql, params)
-    results = cursor.fetchall()
+def finish_results(
+    parent_model: Model, plan: SearchPlan, results: List[List[tuple]], hits: bool
+) -> List[SearchResults]:
+    """
+    Превращает строки плана поиска в результаты.
 
-    if not results:
-        return []
+    Общий шаг для одиночного и пакетного поиска (batch_search).
 
-    note_ids = [row[0] for row in results]
-    id_to_score = {row[0]: row[1] for row in results}
+    Args:
+        parent_model: Модель родительских документов (Note)
+        plan: План, по которому получены строки
+        results: Строки плана, по списку на каждый запрос
+        hits: True — вернуть SearchHit, False — кортежи (Note, score)
 
-    notes = {
-        note.id: note
-        for note in parent_model.select().where(parent_model.id.in_(note_ids))
-    }
+    Returns:
+        Список результатов, по одному на каждый элемент results
+    """
+    if not hits:
+        return _load_parents(parent_model, results)
+
+    names = [field.name for field in plan.fields]
+    converters = [field.python_value for field in plan.fields]
+    finished = []
+    for rows in results:
+        page = []
+        for row in rows:
+            # (note_id, score, chunk_id, chunk_index, start, end, snippet, *fields)
+            extra = {
+                name: convert(value)
+                for name, convert, value in zip(names, converters, row[7:])
+            }
+            page.append(
+                SearchHit(
+                    row[0],
+                    row[1],
+                    extra.pop("title", None),
+                    *row[2:7],
+                    extra or None,
+                    parent_model,
+                )
+            )
+        finished.append(page)
+    return finished
+
+
+def _load_parents(
+    parent_model: Model, results: List[List[tuple]]
+) -> List[List[Tuple[Any, float]]]:
+    """
+    Загружает заметки для нескольких списков строк плана одним запросом.
 
+    Порядок внутри каждого списка сохраняется; удаленные между запросами
+    заметки пропускаются.
+    """
+    note_ids = {row[0] for rows in results for row in rows}  # (note_id, score, ...)
+    if not note_ids:
+        return [[] for _ in results]
+
+    notes = {}
+    for batch in chunked(note_ids, _LOAD_BATCH):
+        query = parent_model.select().where(parent_model.id.in_(batch))
+        notes.update((note.id, note) for note in query)
     return [
-        (notes[note_id], id_to_score[note_id])
-        for note_id in note_ids
-        if note_id in notes
+        [(notes[row[0]], row[1]) for row in rows if row[0] in notes]
+        for rows in results
     ]
@@ -11,7 +11,14 @@ import numpy as np
 from peewee import Model
 
 from semantic_core.database import db
-from semantic_core.embeddings import EmbeddingGenerator
+from semantic_core.embeddings import Embedder, create_embedder
+from semantic_core.vector_index import (
+    VectorIndexConfig,
+    candidate_query,
+    delete_vectors,
+    get_vector_index_config,
+    insert_vectors,
+)
 
 
 class HybridSearchMixin:
@@ -58,42 +65,42 @@ class HybridSearchMixin:
             f"{self.__class__.__name__} должен реализовать метод get_search_text()"
         )
 
-    def update_vector_index(self, generator: EmbeddingGenerator | None = None) -> None:
+    def update_vector_index(self, generator: Embedder | None = None) -> None:
         """
         Обновляет векторный индекс для текущего экземпляра.
 
         Args:
-            generator: Генератор эмбеддингов (создается автоматически, если не передан)
+            generator: Эмбеддер (по умолчанию create_embedder())
 
         Examples:
             >>> note = Note.create(content="Пример заметки")
             >>> note.update_vector_index()
         """
         if generator is None:
-            generator = EmbeddingGenerator()
+            generator = create_embedder()
 
         # Получаем текст для индексации
         text = self.get_search_text()
 
         # Генерируем эмбеддинг
         embedding = generator.embed_document(text)
-        blob = generator.vector_to_blob(embedding)
-
-        # Обновляем векторную таблицу
-        table_name = self._meta.table_name
-        vector_table = f"{table_name}_vec"
-
-        db.obj.execute_sql(
-            f"""
-            INSERT OR REPLACE INTO {vector_table} (id, {self._vector_column})
-            VALUES (?, ?)
-        """,
-            (self.id, blob),
+
+        # Заменяем вектор: vec0 не поддерживает INSERT OR REPLACE
+        vector_config = self._vector_index_config()
+        with db.atomic():
+            delete_vectors(vector_config, [self.id])
+            insert_vectors(vector_config, [self.id], embedding[np.newaxis])
+
+    @classmethod
+    def _vector_index_config(cls) -> VectorIndexConfig:
+        """Возвращает конфигурацию векторной таблицы модели."""
+        return get_vector_index_config(
+            f"{cls._meta.table_name}_vec", vector_column=cls._vector_column
         )
 
     @classmethod
     def vector_search(
-        cls, query: str, limit: int = 10, generator: EmbeddingGenerator | None = None
+        cls, query: str, limit: int = 10, generator: Embedder | None = None
     ) -> list[Any]:
         """
         Выполняет чисто векторный поиск (семантический).
@@ -110,27 +117,29 @@ class HybridSearchMixin:
             >>> results = Note.vector_search("как написать цикл", limit=5)
         """
         if generator is None:
-            generator = EmbeddingGenerator()
+            generator = create_embedder()
 
         # Генерируем эмбеддинг запроса
         query_embedding = generator.embed_query(query)
-        query_blob = generator.vector_to_blob(query_embedding)
 
         table_name = cls._meta.table_name
-        vector_table = f"{table_name}_vec"
+        candidates_sql, candidates_params = candidate_query(
+            cls._vector_index_config(), query_embedding, k=None
+        )
 
-        # Выполняем векторный поиск
+        # Выполняем векторный поиск (полный перебор с точным distance)
         sql = f"""
+            WITH candidates AS ({candidates_sql})
             SELECT 
                 main.id,
-                vec_distance_cosine(vec.{cls._vector_column}, ?) as distance
+                candidates.distance as distance
             FROM {table_name} main
-            INNER JOIN {vector_table} vec ON main.id = vec.id
+            INNER JOIN candidates ON main.id = candidates.id
             ORDER BY distance ASC
             LIMIT ?
         """
 
-        cursor = db.obj.execute_sql(sql, (query_blob, limit))
+        cursor = db.obj.execute_sql(sql, candidates_params + [limit])
         ids = [row[0] for row in cursor.fetchall()]
 
         # Возвращаем объекты в порядке релевантности
@@ -179,7 +188,7 @@ class HybridSearchMixin:
         query: str,
         limit: int = 10,
         k: int = 60,
-        generator: EmbeddingGenerator | None = None,
+        generator: Embedder | None = None,
         **filters,
     ) -> list[Any]:
         """
@@ -207,15 +216,16 @@ class HybridSearchMixin:
             ... )
         """
         if generator is None:
-            generator = EmbeddingGenerator()
+            generator = create_embedder()
 
         # Генерируем эмбеддинг запроса
         query_embedding = generator.embed_query(query)
-        query_blob = generator.vector_to_blob(query_embedding)
 
         table_name = cls._meta.table_name
-        vector_table = f"{table_name}_vec"
         fts_table = f"{table_name}_fts"
+        candidates_sql, candidates_params = candidate_query(
+            cls._vector_index_config(), query_embedding, k=None
+        )
 
         # Строим WHERE clause для фильтров
         where_conditions = []
@@ -230,12 +240,13 @@ class HybridSearchMixin:
 
         # Гибридный поиск с RRF через CTE
         sql = f"""
-            WITH vector_results AS (
+            WITH candidates AS ({candidates_sql}),
+            vector_results AS (
                 SELECT 
                     main.id,
-                    ROW_NUMBER() OVER (ORDER BY vec_distance_cosine(vec.{cls._vector_column}, ?)) as rank
+                    ROW_NUMBER() OVER (ORDER BY candidates.distance) as rank
                 FROM {table_name} main
-                INNER JOIN {vector_table} vec ON main.id = vec.id
+                INNER JOIN candidates ON main.id = candidates.id
                 {where_clause}
                 LIMIT 100
             ),
@@ -262,7 +273,9 @@ class HybridSearchMixin:
             LIMIT ?
         """
 
-        params = [query_blob] + where_params + [query] + where_params + [k, k, limit]
+        params = (
+            candidates_params + where_params + [query] + where_params + [k, k, limit]
+        )
 
         cursor = db.obj.execute_sql(sql, params)
         ids = [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,364 @@
+"""
+Планы поисковых запросов: готовый SQL и порядок параметров.
+
+Функции поиска раньше собирали SQL f-строками на каждый вызов, включая
+условия фильтров. План строится один раз на сочетание (режим поиска,
+модели, набор полей фильтра, вид подзапроса кандидатов) и дальше
+только подставляет параметры: на каждый запрос нет сборки строк, а
+SQLite получает побайтно тот же текст и берет подготовленный statement
+из кэша соединения.
+
+Строка результата плана: (note_id, score, chunk_id, chunk_index,
+chunk_start, chunk_end, snippet, *проекция). Лучший чанк заметки и его
+смещения в Note.content приходят из той же группировки MIN(distance),
+фрагмент FTS5 snippet() считается внутри SQLite — для страницы
+результатов не нужен второй проход по Note.content.
+
+В планах FTS порядок соединения зафиксирован (CROSS JOIN: сначала
+MATCH, затем заметки по rowid). С фильтром по индексированной колонке
+(category_id) планировщик SQLite иначе идет от заметок и выполняет
+MATCH заново для каждой строки — на 1000 заметок это ~100 мс вместо
+~2.5 мс.
+
+Классы:
+    SearchPlan
+        Готовый SQL поиска и раскладка его параметров.
+
+Функции:
+    get_search_plan(mode, parent_model, ...) -> SearchPlan
+        Возвращает план из кэша процесса или строит его.
+    clear_search_plans() -> None
+        Очищает кэш планов (после изменения схемы таблиц).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+from peewee import Field, Model
+
+from semantic_core.vector_index import (
+    CandidateKind,
+    VectorIndexConfig,
+    candidate_sql,
+)
+
+
+# Режимы поиска
+SEARCH_MODES = ("vector", "fts", "hybrid")
+
+# Сколько планов держим в кэше; наборов фильтров на практике единицы
+_MAX_PLANS = 256
+
+# Разметка snippet(): начало и конец совпадения, многоточие, токенов во фрагменте
+SNIPPET_MARKUP = ("<b>", "</b>", "…")
+SNIPPET_TOKENS = 16
+
+_plans: dict[tuple, "SearchPlan"] = {}
+
+
+@dataclass(frozen=True)
+class SearchPlan:
+    """
+    Готовый SQL поиска и раскладка его параметров.
+
+    Attributes:
+        mode: Режим поиска ("vector", "fts" или "hybrid")
+        sql: Текст запроса
+        filter_names: Имена фильтров в порядке плейсхолдеров
+        layout: Порядок групп параметров: "candidates" (параметры
+            подзапроса кандидатов), "filters" (значения фильтров),
+            "query", "k", "limit"
+        fields: Поля проекции родителя (колонки строки после snippet)
+    """
+
+    mode: str
+    sql: str
+    filter_names: tuple[str, ...]
+    layout: tuple[str, ...]
+    fields: tuple[Field, ...] = ()
+
+    def bind(
+        self,
+        filters: Mapping[str, Any],
+        candidates: Sequence = (),
+        query: Optional[str] = None,
+        k: Optional[int] = None,
+        limit: int = 10,
+    ) -> list:
+        """
+        Собирает параметры запроса в порядке плейсхолдеров.
+
+        Args:
+            filters: Значения фильтров по именам (как в **filters поиска)
+            candidates: Параметры подзапроса кандидатов
+            query: Текст запроса FTS5
+            k: Параметр RRF
+            limit: Количество результатов
+
+        Returns:
+            list: Параметры для db.obj.execute_sql(plan.sql, params)
+        """
+        values = {"query": query, "k": k, "limit": limit}
+        params = []
+        for slot in self.layout:
+            if slot == "candidates":
+                params.extend(candidates)
+            elif slot == "filters":
+                params.extend(filters[name] for name in self.filter_names)
+            else:
+                params.append(values[slot])
+        return params
+
+
+def get_search_plan(
+    mode: str,
+    parent_model: Model,
+    chunk_model: Optional[Model] = None,
+    filter_names: Sequence[str] = (),
+    vector_config: Optional[VectorIndexConfig] = None,
+    kind: Optional[CandidateKind] = None,
+    fields: Sequence[str] = (),
+    snippet: bool = False,
+) -> SearchPlan:
+    """
+    Возвращает план поиска из кэша процесса или строит его.
+
+    Ключ кэша — (mode, модели, отсортированный набор фильтров, таблица
+    и формат векторов, вид подзапроса кандидатов, проекция): смена
+    формата хранения или прохода KNN дает другой план.
+
+    Строка результата: (note_id, score, chunk_id, chunk_index,
+    chunk_start, chunk_end, snippet, *fields). chunk_* — лучший чанк
+    заметки по distance и его смещения в Note.content (NULL для fts, для
+    заметок, найденных в гибридном поиске только через FTS, и для
+    смещений, если модель чанков их не хранит). snippet — фрагмент FTS5
+    с выделенными совпадениями (NULL без snippet=True и в vector).
+
+    Args:
+        mode: "vector", "fts" или "hybrid"
+        parent_model: Класс модели Note
+        chunk_model: Класс модели NoteChunk (для vector и hybrid)
+        filter_names: Имена фильтров родителя: имена полей модели
+            (category) или колонок (category_id)
+        vector_config: Конфигурация векторной таблицы (для vector и hybrid)
+        kind: Вид подзапроса кандидатов из candidate_kind()
+        fields: Поля родителя, которые запрос возвращает вместе с рангом
+        snippet: Считать фрагмент snippet() для совпадений FTS
+
+    Returns:
+        SearchPlan: План запроса
+
+    Raises:
+        ValueError: Если режим неизвестен или у модели нет поля фильтра
+            или проекции
+
+    Example:
+        >>> plan = get_search_plan("fts", Note, filter_names=["category_id"])
+        >>> params = plan.bind({"category_id": 1}, query="python", limit=5)
+        >>> db.obj.execute_sql(plan.sql, params).fetchall()
+    """
+    filter_names = tuple(sorted(filter_names))
+    vector_key = (
+        None
+        if vector_config is None
+        else (
+            vector_config.table_name,
+            vector_config.vector_column,
+            vector_config.storage,
+            kind,
+        )
+    )
+    fields = tuple(fields)
+    key = (mode, parent_model, chunk_model, filter_names, vector_key, fields, snippet)
+
+    plan = _plans.get(key)
+    if plan is None:
+        plan = _build_plan(
+            mode,
+            parent_model,
+            chunk_model,
+            filter_names,
+            vector_config,
+            kind,
+            fields,
+            snippet,
+        )
+        if len(_plans) >= _MAX_PLANS:
+            _plans.clear()
+        _plans[key] = plan
+    return plan
+
+
+def clear_search_plans() -> None:
+    """Очищает кэш планов (например, после переименования таблиц)."""
+    _plans.clear()
+
+
+def _build_plan(
+    mode: str,
+    parent_model: Model,
+    chunk_model: Optional[Model],
+    filter_names: tuple[str, ...],
+    vector_config: Optional[VectorIndexConfig],
+    kind: Optional[CandidateKind],
+    fields: tuple[str, ...],
+    snippet: bool,
+) -> SearchPlan:
+    """Строит SQL плана и раскладку параметров."""
+    if mode not in SEARCH_MODES:
+        raise ValueError(
+            f"Неизвестный режим поиска: {mode!r}. Допустимые: {SEARCH_MODES}"
+        )
+
+    conditions = " AND ".join(
+        f"parent.{_model_field(parent_model, name, 'фильтра').column_name} = ?"
+        for name in filter_names
+    )
+    projection = tuple(_model_field(parent_model, name, "проекции") for name in fields)
+    columns = "".join(f", parent.{field.column_name}" for field in projection)
+    parent_table = parent_model._meta.table_name
+    fts_table = f"{parent_table}_fts"
+    fragment = "NULL"
+
+    if mode == "fts":
+        # ORDER BY rank с LIMIT FTS5 выполняет сам: snippet() считается
+        # только для возвращаемых строк
+        if snippet:
+            fragment = _snippet_sql(fts_table, "fts")
+        sql = f"""
+            SELECT
+                parent.id,
+                fts.rank as bm25_rank,
+                NULL, NULL, NULL, NULL,
+                {fragment}{columns}
+            FROM {fts_table} fts
+            CROSS JOIN {parent_table} parent ON parent.id = fts.rowid
+            WHERE {fts_table} MATCH ?
+              {f"AND {conditions}" if conditions else ""}
+            ORDER BY bm25_rank
+            LIMIT ?
+        """
+        return SearchPlan(
+            mode, sql, filter_names, ("query", "filters", "limit"), projection
+        )
+
+    chunk_table = chunk_model._meta.table_name
+    candidates = candidate_sql(vector_config, kind)
+    offsets = (
+        "chunk.start_offset as chunk_start, chunk.end_offset as chunk_end"
+        if "start_offset" in chunk_model._meta.fields
+        else "NULL as chunk_start, NULL as chunk_end"
+    )
+    # В vector строка плана — сама группировка: snippet NULL и проекция
+    tail = f", NULL{columns}" if mode == "vector" else ""
+    if snippet and mode == "hybrid":
+        # Фрагмент — только для итоговых строк (после LIMIT), повторным
+        # MATCH по rowid: для всех 100 кандидатов FTS он в разы дороже
+        fragment = f"""(
+            SELECT {_snippet_sql(fts_table, "snip")}
+            FROM {fts_table} snip
+            WHERE {fts_table} MATCH ? AND snip.rowid = r.note_id
+        )"""
+
+    # Чанки → группировка по note_id → MIN(distance). Голые колонки
+    # чанка при единственном MIN() SQLite берет из строки с минимумом —
+    # это лучший чанк заметки
+    best_chunks = f"""
+            SELECT
+                chunk.note_id,
+                MIN(candidates.distance) as best_distance,
+                chunk.id as chunk_id,
+                chunk.chunk_index,
+                {offsets}{tail}
+            FROM candidates
+            INNER JOIN {chunk_table} chunk ON chunk.id = candidates.id
+            INNER JOIN {parent_table} parent ON chunk.note_id = parent.id
+            {f"WHERE {conditions}" if conditions else ""}
+            GROUP BY chunk.note_id
+            ORDER BY best_distance ASC"""
+
+    if mode == "vector":
+        sql = f"""
+            WITH candidates AS ({candidates})
+            {best_chunks}
+            LIMIT ?
+        """
+        return SearchPlan(
+            mode, sql, filter_names, ("candidates", "filters", "limit"), projection
+        )
+
+    sql = f"""
+        WITH candidates AS ({candidates}),
+        vector_results AS (
+            SELECT
+                note_id,
+                chunk_id,
+                chunk_index,
+                chunk_start,
+                chunk_end,
+                ROW_NUMBER() OVER (ORDER BY best_distance) as rank
+            FROM ({best_chunks}
+            LIMIT 100)
+        ),
+        fts_results AS (
+            SELECT
+                parent.id as note_id,
+                fts.rank as bm25_rank,
+                ROW_NUMBER() OVER (ORDER BY fts.rank) as rank
+            FROM {fts_table} fts
+            CROSS JOIN {parent_table} parent ON parent.id = fts.rowid
+            WHERE {fts_table} MATCH ?
+              {f"AND {conditions}" if conditions else ""}
+            ORDER BY bm25_rank
+            LIMIT 100
+        ),
+        rrf_scores AS (
+            SELECT
+                COALESCE(v.note_id, f.note_id) as note_id,
+                (
+                    COALESCE(1.0 / (? + v.rank), 0) +
+                    COALESCE(1.0 / (? + f.rank), 0)
+                ) as rrf_score,
+                v.chunk_id,
+                v.chunk_index,
+                v.chunk_start,
+                v.chunk_end
+            FROM vector_results v
+            FULL OUTER JOIN fts_results f ON v.note_id = f.note_id
+        )
+        SELECT
+            r.note_id, r.rrf_score,
+            r.chunk_id, r.chunk_index, r.chunk_start, r.chunk_end,
+            {fragment}{columns}
+        FROM (
+            SELECT * FROM rrf_scores ORDER BY rrf_score DESC LIMIT ?
+        ) r
+        {f"INNER JOIN {parent_table} parent ON parent.id = r.note_id" if columns else ""}
+        ORDER BY r.rrf_score DESC
+    """
+    layout = ("candidates", "filters", "query", "filters", "k", "k")
+    if snippet:
+        layout += ("query",)
+    return SearchPlan(mode, sql, filter_names, layout + ("limit",), projection)
+
+
+def _snippet_sql(fts_table: str, alias: str) -> str:
+    """Вызов snippet() FTS5: колонка -1 — та, где совпадение лучше."""
+    start, end, ellipsis = (mark.replace("'", "''") for mark in SNIPPET_MARKUP)
+    return (
+        f"snippet({alias}.{fts_table}, -1, '{start}', '{end}', '{ellipsis}', "
+        f"{SNIPPET_TOKENS})"
+    )
+
+
+def _model_field(parent_model: Model, name: str, purpose: str) -> Field:
+    """Поле модели по имени поля (category) или колонки (category_id)."""
+    fields = parent_model._meta.fields
+    if name in fields:
+        return fields[name]
+    for field in fields.values():
+        if field.column_name == name:
+            return field
+    raise ValueError(
+        f"У модели {parent_model.__name__} нет поля для {purpose}: {name!r}"
+    )
@@ -3,15 +3,101 @@
 
 Обеспечивает атомарное сохранение заметок с автоматической нарезкой
 на чанки и векторизацией. Использует транзакции для гарантии целостности данных.
+
+При обновлении заметки чанки сверяются по хэшу текста: неизменившиеся
+чанки сохраняют строки и векторы, векторизуются только новые.
+
+В режиме mode="deferred" чанки пишутся без векторов со статусом PENDING
+и векторизуются фоновым EmbeddingWorker (semantic_core.worker).
+
+Для массовой загрузки есть ingest_notes(): потоковая обработка пачками
+с многострочными INSERT и одной транзакцией на пачку.
+
+Шаги нарезки и записи (split_with_context, write_note_batch и др.)
+публичны: на них собраны pipeline, directory, worker и maintenance.
 """
 
-from typing import List, Optional, Dict, Any
+import hashlib
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterable, List, Optional, Dict, Any, Union
 
-from peewee import Model
+from peewee import Model, ModelSelect, chunked
 
 from semantic_core.database import db
-from semantic_core.embeddings import EmbeddingGenerator
+from semantic_core.embeddings import Embedder
+from semantic_core.status import ChunkStatus
 from semantic_core.text_processing import TextSplitter
+from semantic_core.vector_index import (
+    VectorIndexConfig,
+    get_vector_index_config,
+    insert_vectors,
+)
+
+
+# Сколько строк в одном многострочном INSERT (ниже лимита переменных SQLite)
+_INSERT_BATCH = 200
+
+
+# Режимы сохранения заметки
+SAVE_MODES = ("sync", "deferred")
+
+# Что добавляется к тексту чанка перед векторизацией:
+# "note" — контекст заметки (get_context_text), "breadcrumb" — заголовок
+# заметки и путь заголовков раздела из chunk.metadata["headings"]
+CONTEXT_MODES = ("note", "breadcrumb")
+
+
+@dataclass
+class ChunkSyncStats:
+    """
+    Результат синхронизации чанков заметки при сохранении.
+
+    Attributes:
+        reused: Чанки, сохраненные вместе с векторами (текст не изменился)
+        embedded: Новые и изменившиеся чанки, отправленные на векторизацию
+        pending: Новые чанки, оставленные воркеру (mode="deferred")
+        deleted: Удаленные устаревшие чанки
+    """
+
+    reused: int = 0
+    embedded: int = 0
+    pending: int = 0
+    deleted: int = 0
+
+
+@dataclass
+class IngestStats:
+    """
+    Статистика массовой загрузки заметок.
+
+    Attributes:
+        notes: Количество сохраненных заметок
+        chunks: Количество сохраненных чанков (и векторов)
+        batches: Количество закоммиченных пачек
+        elapsed: Общее время загрузки (секунды)
+        embed_seconds: Время векторизации (секунды)
+        write_seconds: Время записи в БД (секунды)
+    """
+
+    notes: int = 0
+    chunks: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    embed_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+    @property
+    def notes_per_second(self) -> float:
+        """Скорость загрузки в заметках в секунду."""
+        return self.notes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        """Скорость загрузки в чанках в секунду."""
+        return self.chunks / self.elapsed if self.elapsed else 0.0
 
 
 def save_note_with_chunks(
@@ -19,19 +105,37 @@ def save_note_with_chunks(
     chunk_model: Model,
     note_data: Dict[str, Any],
     splitter: TextSplitter,
-    generator: EmbeddingGenerator,
+    generator: Optional[Embedder],
     update_existing: bool = False,
+    mode: str = "sync",
+    context: str = "note",
 ) -> Model:
     """
     Сохраняет заметку с автоматической нарезкой на чанки и векторизацией.
 
     Алгоритм:
     1. Создает/обновляет родительскую заметку (Note)
-    2. Удаляет старые чанки (если update_existing=True)
-    3. Нарезает контент на чанки
-    4. Генерирует эмбеддинги для каждого чанка с добавлением контекста
-    5. Массово вставляет чанки (bulk_create)
-    6. Массово вставляет векторы в виртуальную таблицу
+    2. Нарезает контент на чанки (с добавлением контекста)
+    3. При обновлении сверяет чанки со старыми по content_hash:
+       совпавшие остаются вместе с векторами, устаревшие удаляются
+    4. Генерирует эмбеддинги пакетными запросами только для новых чанков
+    5. Массово вставляет новые чанки (многострочный INSERT)
+    6. Массово вставляет векторы в формате векторной таблицы (float32/int8)
+
+    Хэш считается по тексту, который уходит в эмбеддер (контекст + чанк),
+    поэтому смена заголовка или категории переиндексирует все чанки.
+    Если у chunk_model нет поля content_hash, чанки пересоздаются целиком.
+
+    В режиме "deferred" шаги 4 и 6 пропускаются: новые чанки получают
+    статус PENDING, заметка сразу доступна полнотекстовому поиску,
+    а векторы записывает EmbeddingWorker. Время сохранения не зависит
+    от API эмбеддингов.
+
+    С context="breadcrumb" и сплиттером, заполняющим metadata["headings"]
+    (MarkdownTextSplitter), к чанку добавляется не весь контекст заметки,
+    а "Заголовок заметки > Раздел > Подраздел". Хлебные крошки сохраняются
+    в колонке breadcrumb (если она есть), чтобы EmbeddingWorker
+    векторизовал тот же текст.
 
     Все операции выполняются в транзакции: либо всё успешно, либо откат.
 
@@ -40,13 +144,19 @@ def save_note_with_chunks(
         chunk_model: Класс модели NoteChunk (ребенок)
         note_data: Словарь с данными заметки (title, content, category, etc.)
         splitter: Экземпляр TextSplitter для нарезки
-        generator: Экземпляр EmbeddingGenerator для векторизации
+        generator: Эмбеддер для векторизации (EmbeddingGenerator, HashingEmbedder);
+            в режиме "deferred" не используется и может быть None
         update_existing: Если True, обновляет существующую заметку
+        mode: "sync" — векторизовать сразу, "deferred" — оставить воркеру
+        context: "note" — контекст заметки, "breadcrumb" — путь заголовков
 
     Returns:
-        Model: Созданный/обновленный объект заметки
+        Model: Созданный/обновленный объект заметки. В атрибуте chunk_stats
+        (ChunkSyncStats) — сколько чанков переиспользовано и векторизовано
 
     Raises:
+        ValueError: Неизвестный mode или context, или у chunk_model нет колонки
+            status для режима "deferred"
         Exception: При ошибке в процессе сохранения (откат транзакции)
 
     Example:
@@ -55,7 +165,7 @@ def save_note_with_chunks(
         >>> from domain.models import Note, NoteChunk
         >>>
         >>> splitter = SimpleTextSplitter(chunk_size=1000, overlap=200)
-        >>> generator = EmbeddingGenerator()
+        >>> generator = create_embedder()
         >>>
         >>> note_data = {
         ...     "title": "Длинная статья",
@@ -71,7 +181,23 @@ def save_note_with_chunks(
         ...     generator=generator
         ... )
         >>> print(f"Создано {len(note.chunks)} чанков")
+        >>>
+        >>> note_data = {"id": note.id, "content": "Исправленный текст..."}
+        >>> note = save_note_with_chunks(..., note_data=note_data, update_existing=True)
+        >>> print(note.chunk_stats)
+        ChunkSyncStats(reused=9, embedded=1, pending=0, deleted=1)
     """
+    if mode not in SAVE_MODES:
+        raise ValueError(f"Неизвестный mode: {mode!r}. Допустимые: {SAVE_MODES}")
+    check_context_mode(context)
+    deferred = mode == "deferred"
+    if deferred and "status" not in chunk_model._meta.fields:
+        raise ValueError(
+            f"Для mode='deferred' у {chunk_model.__name__} нужна колонка status"
+        )
+
+    vector_config = get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
+
     with db.atomic():  # Транзакция
         # 1. Создаем/обновляем родительскую заметку
         if update_existing and "id" in note_data:
@@ -83,80 +209,474 @@ def save_note_with_chunks(
                 setattr(note, field, value)
             note.save()
 
-            # Удаляем старые чанки (каскадно удалятся и векторы)
-            chunk_model.delete().where(chunk_model.note == note).execute()
+            old_chunks = list(chunk_model.select().where(chunk_model.note == note))
         else:
             # Создаем новую заметку
             note = note_model.create(**note_data)
+            old_chunks = []
+
+        # 2. Нарезаем контент на чанки и добавляем контекст заметки
+        chunks_data, vector_texts = prepare_note_chunks(note, splitter, context)
+
+        # 3-6. Сверяем со старыми чанками, векторизуем и вставляем новые
+        note.chunk_stats = _sync_chunks(
+            chunk_model,
+            note.id,
+            chunks_data,
+            vector_texts,
+            old_chunks,
+            None if deferred else generator,
+            vector_config,
+        )
+
+    return note
+
 
-        # 2. Нарезаем контент на чанки
-        content = note_data.get("content", note.content)
-        chunks_data = splitter.split_text(content)
+def ingest_notes(
+    note_model: Model,
+    chunk_model: Model,
+    notes: Iterable[Dict[str, Any]],
+    splitter: TextSplitter,
+    generator: Embedder,
+    batch_size: int = 100,
+    on_batch: Optional[Callable[[IngestStats], None]] = None,
+    context: str = "note",
+) -> IngestStats:
+    """
+    Массово загружает заметки из итератора пачками.
+
+    Для каждой пачки из batch_size заметок:
+    1. Нарезает заметки на чанки
+    2. Векторизует все чанки пачки одним вызовом embed_documents
+       (до открытия транзакции, чтобы не держать блокировку записи)
+    3. В одной транзакции выделяет ID, вставляет заметки и чанки
+       многострочными INSERT, а векторы — через executemany
+    4. Коммитит пачку и вызывает on_batch со статистикой
 
-        if not chunks_data:
-            # Пустой контент — ничего не индексируем
-            return note
+    Итератор потребляется лениво, в памяти одновременно находится
+    только одна пачка, поэтому размер корпуса не ограничен.
+    При ошибке откатывается только текущая пачка: предыдущие уже закоммичены.
+
+    Args:
+        note_model: Класс модели Note (родитель)
+        chunk_model: Класс модели NoteChunk (ребенок)
+        notes: Итератор словарей с данными заметок (как в save_note_with_chunks)
+        splitter: Экземпляр TextSplitter для нарезки
+        generator: Эмбеддер для векторизации
+        batch_size: Сколько заметок в одной транзакции
+        on_batch: Колбэк прогресса, вызывается после коммита каждой пачки
+        context: Контекст чанков, как в save_note_with_chunks
 
-        # 3. Получаем контекст для добавления к чанкам
-        # Используем метод get_context_text() из модели Note
-        context_text = (
-            note.get_context_text() if hasattr(note, "get_context_text") else ""
+    Returns:
+        IngestStats: Итоговая статистика загрузки
+
+    Raises:
+        ValueError: Если batch_size <= 0 или context неизвестен
+
+    Example:
+        >>> def read_notes():
+        ...     for path in Path("docs").glob("*.md"):
+        ...         yield {"title": path.stem, "content": path.read_text()}
+        >>>
+        >>> stats = ingest_notes(
+        ...     Note, NoteChunk, read_notes(), splitter, generator,
+        ...     batch_size=500,
+        ...     on_batch=lambda s: print(f"{s.notes} заметок, {s.chunks_per_second:.0f} чанков/с"),
+        ... )
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+    check_context_mode(context)
+
+    vector_config = get_vector_index_config(f"{chunk_model._meta.table_name}_vec")
+    stats = IngestStats()
+    started = time.perf_counter()
+    iterator = iter(notes)
+
+    while batch := list(islice(iterator, batch_size)):
+        _ingest_batch(
+            note_model,
+            chunk_model,
+            batch,
+            splitter,
+            generator,
+            vector_config,
+            stats,
+            context,
         )
+        stats.batches += 1
+        stats.elapsed = time.perf_counter() - started
 
-        # 4. Подготавливаем данные для bulk_create
-        chunks_to_insert = []
-        embeddings = []
-
-        for chunk in chunks_data:
-            # Формируем текст для векторизации: контекст + текст чанка
-            if context_text:
-                vector_text = f"{context_text}\n\n{chunk.text}"
-            else:
-                vector_text = chunk.text
-
-            # Генерируем эмбеддинг
-            vector = generator.embed_document(vector_text)
-
-            # Готовим запись для вставки
-            chunks_to_insert.append(
-                {
-                    "note": note,
-                    "chunk_index": chunk.index,
-                    "content": chunk.text,
-                }
-            )
-            embeddings.append(vector)
-
-        # 5. Массовая вставка чанков (INSERT INTO note_chunks ...)
-        # Создаем объекты и сохраняем их по одному, чтобы получить ID
-        created_chunks = []
-        for data in chunks_to_insert:
-            chunk = chunk_model.create(**data)
-            created_chunks.append(chunk)
-
-        # 6. Массовая вставка векторов в виртуальную таблицу vec0
-        # note_chunks_vec(id, embedding)
-        table_name = chunk_model._meta.table_name
-        vector_table_name = f"{table_name}_vec"
-
-        for chunk_obj, vector in zip(created_chunks, embeddings):
-            blob = generator.vector_to_blob(vector)
-            db.obj.execute_sql(
-                f"INSERT INTO {vector_table_name}(id, embedding) VALUES (?, ?)",
-                (chunk_obj.id, blob),
-            )
+        if on_batch is not None:
+            on_batch(stats)
 
-    return note
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def _ingest_batch(
+    note_model: Model,
+    chunk_model: Model,
+    batch: List[Dict[str, Any]],
+    splitter: TextSplitter,
+    generator: Embedder,
+    vector_config: VectorIndexConfig,
+    stats: IngestStats,
+    context: str = "note",
+) -> None:
+    """Нарезает, векторизует и записывает одну пачку заметок."""
+    notes = [note_model(**data) for data in batch]
+    prepared = [prepare_note_chunks(note, splitter, context) for note in notes]
+    vector_texts = [text for _, texts in prepared for text in texts]
+
+    started = time.perf_counter()
+    embeddings = generator.embed_documents(vector_texts) if vector_texts else None
+    stats.embed_seconds += time.perf_counter() - started
+
+    started = time.perf_counter()
+    chunk_count = write_note_batch(
+        note_model, chunk_model, notes, prepared, embeddings, vector_config
+    )
+    stats.write_seconds += time.perf_counter() - started
+    stats.notes += len(notes)
+    stats.chunks += chunk_count
+
+
+def write_note_batch(
+    note_model: Model,
+    chunk_model: Model,
+    notes: list,
+    prepared: list,
+    embeddings,
+    vector_config: VectorIndexConfig,
+) -> int:
+    """
+    Записывает пачку заметок, чанков и векторов одной транзакцией.
+
+    Args:
+        note_model: Модель заметок
+        chunk_model: Модель чанков
+        notes: Несохраненные экземпляры note_model (получают id после записи)
+        prepared: (чанки, тексты для векторизации) для каждой заметки
+        embeddings: Матрица эмбеддингов всех чанков пачки по порядку
+        vector_config: Конфигурация векторной таблицы чанков
+
+    Returns:
+        int: Количество записанных чанков
+    """
+    # IMMEDIATE: блокировка записи берется сразу, и выделенные ID
+    # не могут пересечься с параллельным писателем
+    with db.atomic("IMMEDIATE"):
+        note_ids = _insert_rows(
+            note_model, [note.__data__ for note in notes], allocate_ids=True
+        )
+
+        chunk_rows = []
+        for note_id, (chunks, texts) in zip(note_ids, prepared):
+            chunk_rows.extend(_chunk_rows(chunk_model, note_id, chunks, texts))
+
+        chunk_ids = _insert_rows(chunk_model, chunk_rows, allocate_ids=True)
+        if chunk_ids:
+            insert_vectors(vector_config, chunk_ids, embeddings)
+
+    for note, note_id in zip(notes, note_ids):
+        note.id = note_id
+
+    return len(chunk_rows)
+
+
+def _sync_chunks(
+    chunk_model: Model,
+    note_id: int,
+    chunks: list,
+    vector_texts: List[str],
+    old_chunks: list,
+    generator: Optional[Embedder],
+    vector_config: VectorIndexConfig,
+) -> ChunkSyncStats:
+    """
+    Приводит чанки заметки к новой нарезке, переиспользуя неизменившиеся.
+
+    Старый чанк переиспользуется, если его content_hash совпадает с хэшем
+    нового чанка (одинаковые чанки сопоставляются по порядку). Строка
+    и вектор остаются, меняются только chunk_index и смещения. Остальные старые
+    чанки удаляются, новые — векторизуются и вставляются.
+    Без generator новые чанки вставляются со статусом PENDING без векторов.
+
+    Returns:
+        ChunkSyncStats: Статистика синхронизации
+    """
+    # Чанк без вектора переиспользуется, только если вектор и так отложен
+    if generator is not None:
+        usable_statuses = {ChunkStatus.DONE}
+    else:
+        usable_statuses = {
+            ChunkStatus.DONE,
+            ChunkStatus.PENDING,
+            ChunkStatus.PROCESSING,
+        }
+    track_status = "status" in chunk_model._meta.fields
+
+    # Кандидаты на переиспользование: хэш → старые чанки в порядке индексов
+    reusable = defaultdict(list)
+    if _tracks_hashes(chunk_model):
+        for chunk in sorted(old_chunks, key=lambda c: c.chunk_index):
+            if track_status and chunk.status not in usable_statuses:
+                continue
+            if chunk.content_hash:
+                reusable[chunk.content_hash].append(chunk)
+
+    moved = []  # (новый индекс, id) для переиспользованных чанков со сдвигом
+    shifted = []  # (start, end, id) для переиспользованных с новыми смещениями
+    track_offsets = _tracks_offsets(chunk_model)
+    reused_ids = set()
+    fresh = []  # позиции новых чанков, которым нужен эмбеддинг
+    for position, text in enumerate(vector_texts):
+        candidates = reusable.get(_chunk_hash(text))
+        if candidates:
+            old = candidates.pop(0)
+            reused_ids.add(old.id)
+            chunk = chunks[position]
+            if old.chunk_index != chunk.index:
+                moved.append((chunk.index, old.id))
+            if track_offsets and (old.start_offset, old.end_offset) != (
+                chunk.start,
+                chunk.end,
+            ):
+                shifted.append((chunk.start, chunk.end, old.id))
+        else:
+            fresh.append(position)
+
+    # Векторы удаленных чанков чистит триггер {table}_vec_cleanup
+    stale_ids = [chunk.id for chunk in old_chunks if chunk.id not in reused_ids]
+    if stale_ids:
+        for batch in chunked(stale_ids, _INSERT_BATCH):
+            chunk_model.delete().where(chunk_model.id.in_(batch)).execute()
+
+    if moved:
+        # Индексы уникальны в пределах заметки: сначала уводим сдвигаемые
+        # чанки в отрицательные значения, затем ставим новые
+        table = chunk_model._meta.table_name
+        cursor = db.obj.cursor()
+        cursor.executemany(
+            f"UPDATE {table} SET chunk_index = -1 - chunk_index WHERE id = ?",
+            [(chunk_id,) for _, chunk_id in moved],
+        )
+        cursor.executemany(f"UPDATE {table} SET chunk_index = ? WHERE id = ?", moved)
+
+    if shifted:
+        # Тот же текст в другом месте заметки (например, после вставки абзаца)
+        db.obj.cursor().executemany(
+            f"UPDATE {chunk_model._meta.table_name} "
+            f"SET start_offset = ?, end_offset = ? WHERE id = ?",
+            shifted,
+        )
+
+    if fresh:
+        rows = _chunk_rows(
+            chunk_model,
+            note_id,
+            [chunks[p] for p in fresh],
+            [vector_texts[p] for p in fresh],
+        )
+
+        if generator is None:
+            # Отложенная векторизация: воркер заберет чанки по статусу
+            for row in rows:
+                row["status"] = ChunkStatus.PENDING
+            _insert_rows(chunk_model, rows, allocate_ids=True)
+        else:
+            # Генерируем эмбеддинги пакетно: один запрос на ~100 чанков
+            embeddings = generator.embed_documents([vector_texts[p] for p in fresh])
+            chunk_ids = _insert_rows(chunk_model, rows, allocate_ids=True)
+            insert_vectors(vector_config, chunk_ids, embeddings)
+
+    return ChunkSyncStats(
+        reused=len(reused_ids),
+        embedded=len(fresh) if generator is not None else 0,
+        pending=len(fresh) if generator is None else 0,
+        deleted=len(stale_ids),
+    )
+
+
+def prepare_note_chunks(
+    note: Model, splitter: TextSplitter, context: str = "note"
+) -> tuple[list, list[str]]:
+    """
+    Нарезает заметку на чанки и формирует тексты для векторизации.
+
+    Args:
+        note: Экземпляр модели заметки (может быть еще не сохранен)
+        splitter: Сплиттер
+        context: Режим контекста чанков (см. CONTEXT_MODES)
+
+    Returns:
+        tuple: (чанки, тексты "контекст + текст чанка" для эмбеддингов)
+    """
+    return split_with_context(
+        splitter,
+        note.content,
+        note_context_text(note),
+        note_breadcrumb_root(note, context),
+    )
+
+
+def check_context_mode(context: str) -> None:
+    """
+    Проверяет режим контекста чанков.
+
+    Raises:
+        ValueError: Если context не входит в CONTEXT_MODES
+    """
+    if context not in CONTEXT_MODES:
+        raise ValueError(
+            f"Неизвестный context: {context!r}. Допустимые: {CONTEXT_MODES}"
+        )
+
+
+def note_breadcrumb_root(note: Model, context: str) -> Optional[str]:
+    """
+    Начало хлебных крошек для split_with_context().
+
+    Returns:
+        Заголовок заметки для context="breadcrumb", None для context="note"
+    """
+    if context != "breadcrumb":
+        return None
+    return getattr(note, "title", None) or ""
+
+
+def note_context_text(note: Model) -> str:
+    """Контекст заметки (заголовок, категория), добавляемый к каждому чанку."""
+    return note.get_context_text() if hasattr(note, "get_context_text") else ""
+
+
+def split_with_context(
+    splitter: TextSplitter,
+    content: str,
+    context_text: str,
+    breadcrumb_root: Optional[str] = None,
+) -> tuple[list, list[str]]:
+    """
+    Нарезает текст и добавляет контекст к текстам для векторизации.
+
+    Если задан breadcrumb_root, чанки с путем заголовков (metadata["headings"])
+    получают контекст "breadcrumb_root > Раздел > Подраздел" — он же
+    записывается в metadata["breadcrumb"]; остальные — context_text.
+    """
+    chunks = splitter.split_text(content)
+    if breadcrumb_root is None:
+        return chunks, [build_vector_text(context_text, chunk.text) for chunk in chunks]
+
+    vector_texts = []
+    for chunk in chunks:
+        headings = chunk.metadata.get("headings")
+        if headings:
+            breadcrumb = " > ".join(filter(None, [breadcrumb_root, *headings]))
+            chunk.metadata["breadcrumb"] = breadcrumb
+            vector_texts.append(build_vector_text(breadcrumb, chunk.text))
+        else:
+            vector_texts.append(build_vector_text(context_text, chunk.text))
+    return chunks, vector_texts
+
+
+def chunk_context_text(chunk: Model, note_context: str) -> str:
+    """
+    Контекст сохраненного чанка: его хлебные крошки или контекст заметки.
+
+    Нужен при векторизации уже записанных чанков (worker, maintenance):
+    вместе с build_vector_text() дает тот же текст, что и при сохранении.
+    """
+    return getattr(chunk, "breadcrumb", None) or note_context
+
+
+def build_vector_text(context_text: str, chunk_text: str) -> str:
+    """Текст для векторизации: контекст заметки + текст чанка."""
+    return f"{context_text}\n\n{chunk_text}" if context_text else chunk_text
+
+
+def _chunk_rows(
+    chunk_model: Model, note_id: int, chunks: list, vector_texts: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Строки для вставки чанков (с content_hash, breadcrumb и смещениями
+    start_offset/end_offset, если модель их хранит).
+    """
+    track_hashes = _tracks_hashes(chunk_model)
+    track_breadcrumbs = "breadcrumb" in chunk_model._meta.fields
+    track_offsets = _tracks_offsets(chunk_model)
+    rows = []
+    for chunk, text in zip(chunks, vector_texts):
+        row = {"note": note_id, "chunk_index": chunk.index, "content": chunk.text}
+        if track_hashes:
+            row["content_hash"] = _chunk_hash(text)
+        if track_breadcrumbs:
+            row["breadcrumb"] = chunk.metadata.get("breadcrumb")
+        if track_offsets:
+            row["start_offset"] = chunk.start
+            row["end_offset"] = chunk.end
+        rows.append(row)
+    return rows
+
+
+def _chunk_hash(vector_text: str) -> str:
+    """Хэш текста чанка вместе с контекстом: SHA-256 в hex."""
+    return hashlib.sha256(vector_text.encode("utf-8")).hexdigest()
+
+
+def _tracks_hashes(chunk_model: Model) -> bool:
+    """Проверяет, хранит ли модель чанков content_hash."""
+    return "content_hash" in chunk_model._meta.fields
+
+
+def _tracks_offsets(chunk_model: Model) -> bool:
+    """Проверяет, хранит ли модель чанков смещения start_offset/end_offset."""
+    return "start_offset" in chunk_model._meta.fields
+
+
+def _insert_rows(
+    model: Model, rows: List[Dict[str, Any]], allocate_ids: bool = False
+) -> List[int]:
+    """
+    Вставляет строки многострочными INSERT пачками по _INSERT_BATCH.
+
+    Должна вызываться внутри транзакции, уже держащей блокировку записи:
+    ID выделяются подряд после текущего MAX(id), что совпадает с тем,
+    как их назначил бы сам SQLite.
+
+    Args:
+        model: Класс модели Peewee
+        rows: Строки (словари поле → значение)
+        allocate_ids: Выделить ID заранее (иначе ID должны быть в строках)
+
+    Returns:
+        List[int]: ID вставленных строк в порядке rows
+    """
+    if not rows:
+        return []
+
+    if allocate_ids:
+        table = model._meta.table_name
+        (max_id,) = db.obj.execute_sql(
+            f"SELECT COALESCE(MAX(id), 0) FROM {table}"
+        ).fetchone()
+        rows = [{**row, "id": max_id + 1 + i} for i, row in enumerate(rows)]
+
+    # Все строки многострочного INSERT должны иметь одинаковый набор колонок
+    columns = set().union(*rows)
+    rows = [{column: row.get(column) for column in columns} for row in rows]
+
+    for batch in chunked(rows, _INSERT_BATCH):
+        model.insert_many(batch).execute()
+
+    return [row["id"] for row in rows]
 
 
 def delete_note_with_chunks(note_model: Model, chunk_model: Model, note_id: int) -> int:
     """
     Удаляет заметку вместе со всеми чанками и векторами.
 
-    Благодаря CASCADE DELETE в определении ForeignKey,
-    при удалении Note автоматически удаляются:
-    - Все связанные NoteChunk
-    - Все векторы из note_chunks_vec (через триггер или вручную)
+    Обертка над delete_notes_with_chunks() для одной заметки.
 
     Args:
         note_model: Класс модели Note
@@ -164,37 +684,62 @@ def delete_note_with_chunks(note_model: Model, chunk_model: Model, note_id: int)
         note_id: ID заметки для удаления
 
     Returns:
-        int: Количество удаленных строк (должно быть 1)
+        int: Количество удаленных заметок (1 или 0, если заметки нет)
 
     Example:
         >>> from domain.models import Note, NoteChunk
         >>> delete_note_with_chunks(Note, NoteChunk, note_id=5)
         1
     """
-    with db.atomic():
-        # Получаем заметку
-        try:
-            note = note_model.get_by_id(note_id)
-        except note_model.DoesNotExist:
-            return 0
+    return delete_notes_with_chunks(note_model, chunk_model, [note_id])
 
-        # Удаляем векторы из vec0 таблицы
-        # (если нет триггера CASCADE на виртуальной таблице)
-        table_name = chunk_model._meta.table_name
-        vector_table_name = f"{table_name}_vec"
 
-        # Получаем ID всех чанков этой заметки
-        chunk_ids = [chunk.id for chunk in note.chunks]
+def delete_notes_with_chunks(
+    note_model: Model,
+    chunk_model: Model,
+    notes: Union[Iterable[int], ModelSelect],
+    batch_size: int = 500,
+) -> int:
+    """
+    Удаляет заметки вместе с чанками и векторами пачками.
+
+    Каждая пачка из batch_size заметок удаляется двумя запросами
+    (чанки по note_id, затем заметки) в своей транзакции, поэтому
+    список параметров IN (...) ограничен, а блокировка записи
+    не держится на все время удаления. Векторы удаляет триггер
+    {chunk_table}_vec_cleanup (create_vector_table), FTS-индекс — триггеры FTS.
 
-        if chunk_ids:
-            # Формируем плейсхолдеры для IN (?, ?, ?)
-            placeholders = ", ".join("?" * len(chunk_ids))
-            db.obj.execute_sql(
-                f"DELETE FROM {vector_table_name} WHERE id IN ({placeholders})",
-                chunk_ids,
-            )
+    Args:
+        note_model: Класс модели Note
+        chunk_model: Класс модели NoteChunk
+        notes: ID заметок или запрос к note_model (например,
+            Note.select().where(Note.category == category))
+        batch_size: Заметок в одной пачке (и в одной транзакции)
+
+    Returns:
+        int: Количество удаленных заметок
+
+    Raises:
+        ValueError: Если batch_size <= 0
+
+    Example:
+        >>> delete_notes_with_chunks(Note, NoteChunk, [1, 2, 3])
+        3
+        >>> old = Note.select().where(Note.created_at < datetime(2024, 1, 1))
+        >>> delete_notes_with_chunks(Note, NoteChunk, old)
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+
+    if isinstance(notes, ModelSelect):
+        # ID читаются заранее: удалять строки, пока курсор по ним открыт, нельзя
+        notes = [row[0] for row in notes.select(note_model.id).tuples()]
 
-        # Удаляем саму заметку (чанки удалятся каскадно)
-        rows_deleted = note.delete_instance()
+    deleted = 0
+    for batch in chunked(notes, batch_size):
+        with db.atomic("IMMEDIATE"):
+            # Чанки удаляются явно: не полагаемся на PRAGMA foreign_keys
+            chunk_model.delete().where(chunk_model.note.in_(batch)).execute()
+            deleted += note_model.delete().where(note_model.id.in_(batch)).execute()
 
-        return rows_deleted
+    return deleted
@@ -0,0 +1,27 @@
+"""
+Статусы векторизации чанков.
+
+Модуль без зависимостей: модели предметной области читают константы
+статусов, не импортируя сервисный слой (эмбеддеры, сплиттеры, NumPy).
+
+Классы:
+    ChunkStatus
+        Статусы векторизации чанка (колонка status).
+"""
+
+
+class ChunkStatus:
+    """
+    Статусы векторизации чанка (колонка status).
+
+    Attributes:
+        PENDING: Ждет векторизации (режим deferred)
+        PROCESSING: Захвачен воркером
+        DONE: Вектор записан
+        FAILED: Векторизация не удалась после всех попыток
+    """
+
+    PENDING = "PENDING"
+    PROCESSING = "PROCESSING"
+    DONE = "DONE"
+    FAILED = "FAILED"
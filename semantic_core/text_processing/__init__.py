@@ -7,9 +7,14 @@
 
 from .base import TextSplitter, Chunk
 from .simple_splitter import SimpleTextSplitter
+from .token_splitter import TokenEstimator, TokenTextSplitter
+from .markdown_splitter import MarkdownTextSplitter
 
 __all__ = [
     "TextSplitter",
     "Chunk",
     "SimpleTextSplitter",
+    "TokenEstimator",
+    "TokenTextSplitter",
+    "MarkdownTextSplitter",
 ]
@@ -6,28 +6,96 @@
 варианты (Markdown, HTML, Code-aware) без изменения кода базы данных.
 """
 
+import codecs
+import mmap
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+
+# Источник текста для iter_chunks: строка, текстовый/бинарный файл или mmap
+TextSource = Union[str, IO[str], IO[bytes], mmap.mmap]
 
 
-@dataclass
 class Chunk:
     """
     Фрагмент текста после нарезки.
 
+    Компактный тип со __slots__: у экземпляра нет __dict__. Чанк может
+    хранить только смещения (start, end) и ссылку на исходную строку —
+    тогда text вырезается при обращении, и список чанков большого
+    документа не копирует его по частям. При pickle (пул процессов
+    IngestPipeline) передается только текст чанка, без исходной строки.
+
     Attributes:
         text: Содержимое чанка
         index: Порядковый номер чанка в документе (начиная с 0)
         metadata: Дополнительные данные (например, заголовок секции, номер строки)
+        start: Смещение начала в исходном тексте (символы) или None
+        end: Смещение конца (не включительно) или None
     """
 
-    text: str
-    index: int
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    __slots__ = ("index", "metadata", "start", "end", "_text", "_source")
+
+    def __init__(
+        self,
+        text: Optional[str] = None,
+        index: int = 0,
+        metadata: Optional[Dict[str, Any]] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        source: Optional[str] = None,
+    ):
+        """
+        Создает чанк с текстом или ленивый чанк по смещениям.
+
+        Args:
+            text: Содержимое чанка (None — вырезать из source по start:end)
+            index: Порядковый номер чанка
+            metadata: Дополнительные данные
+            start: Смещение начала в исходном тексте
+            end: Смещение конца в исходном тексте
+            source: Исходная строка для ленивого чанка
+
+        Raises:
+            ValueError: Если не задан ни text, ни source со смещениями
+        """
+        if text is None and (source is None or start is None or end is None):
+            raise ValueError("Нужен text или source вместе со start и end")
+
+        self.index = index
+        self.metadata = {} if metadata is None else metadata
+        self.start = start
+        self.end = end
+        self._text = text
+        self._source = source if text is None else None
+
+    @property
+    def text(self) -> str:
+        """Содержимое чанка (для ленивого чанка — срез исходной строки)."""
+        if self._text is not None:
+            return self._text
+        return self._source[self.start : self.end]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Chunk):
+            return NotImplemented
+        return (self.index, self.text, self.metadata) == (
+            other.index,
+            other.text,
+            other.metadata,
+        )
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (
+            Chunk,
+            (self.text, self.index, self.metadata, self.start, self.end),
+        )
 
     def __repr__(self) -> str:
-        preview = self.text[:50] + "..." if len(self.text) > 50 else self.text
+        text = self.text
+        preview = text[:50] + "..." if len(text) > 50 else text
         return f"Chunk(index={self.index}, text='{preview}')"
 
 
@@ -37,6 +105,7 @@ class TextSplitter(ABC):
 
     Реализации должны определить метод split_text(),
     который принимает текст и возвращает список Chunk.
+    Потоковые реализации дополнительно переопределяют iter_chunks().
     """
 
     @abstractmethod
@@ -54,3 +123,52 @@ class TextSplitter(ABC):
             NotImplementedError: Если метод не переопределен в подклассе
         """
         raise NotImplementedError("Метод split_text() должен быть реализован")
+
+    def iter_chunks(self, source: TextSource, encoding: str = "utf-8") -> Iterator[Chunk]:
+        """
+        Лениво выдает чанки из строки, файла или mmap.
+
+        Реализация по умолчанию читает источник целиком и вызывает
+        split_text(); сплиттеры с ограниченной памятью ее переопределяют.
+
+        Args:
+            source: Строка, файловый объект (текстовый или бинарный) или mmap
+            encoding: Кодировка для бинарных источников
+
+        Yields:
+            Chunk: Чанки по порядку
+        """
+        yield from self.split_text("".join(iter_text_blocks(source, encoding=encoding)))
+
+
+def iter_text_blocks(
+    source: TextSource, block_size: int = 1 << 16, encoding: str = "utf-8"
+) -> Iterator[str]:
+    """
+    Читает источник текста блоками.
+
+    Строка отдается целиком. Бинарные файлы и mmap читаются через
+    инкрементальный декодер, поэтому многобайтовый символ на границе
+    блоков не ломается. Чтение идет с текущей позиции источника.
+
+    Args:
+        source: Строка, файловый объект или mmap
+        block_size: Размер блока чтения (символы или байты)
+        encoding: Кодировка для бинарных источников
+
+    Yields:
+        str: Непустые блоки текста
+    """
+    if isinstance(source, str):
+        if source:
+            yield source
+        return
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while data := source.read(block_size):
+        block = data if isinstance(data, str) else decoder.decode(data)
+        if block:
+            yield block
+
+    if tail := decoder.decode(b"", final=True):
+        yield tail
@@ -0,0 +1,300 @@
+"""
+Сплиттер Markdown с учетом структуры документа.
+
+SimpleTextSplitter режет по символам и разрывает блоки кода и таблицы:
+половина блока векторизуется плохо. MarkdownTextSplitter за один
+линейный проход по строкам делит текст на блоки:
+
+- заголовок (ATX: # ... ######)
+- блок кода (``` или ~~~ до закрывающего забора)
+- таблица (подряд идущие строки с |)
+- элемент списка (вместе со строками продолжения)
+- абзац (до пустой строки или начала другого блока)
+
+Блоки жадно собираются в чанки до chunk_size символов. Заголовок
+начинает новый чанк, если текущий уже не меньше min_chunk_size;
+короткие разделы склеиваются. В metadata["headings"] — путь заголовков
+чанка (общее начало путей его блоков).
+
+Блок кода или таблица не режутся, если они не длиннее max_block_size;
+более длинные блоки (и абзацы длиннее chunk_size) режутся
+SimpleTextSplitter с перекрытием overlap.
+
+Чанки ленивые и покрывают текст подряд, без перекрытия между блоками.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from .base import Chunk, TextSplitter
+from .simple_splitter import SimpleTextSplitter
+
+
+_HEADING = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_LIST_ITEM = re.compile(r"[ \t]*(?:[-*+]|\d{1,9}[.)])[ \t]+")
+_MARKERS = frozenset("#`~|-*+0123456789")
+
+# Виды блоков
+HEADING, CODE, TABLE, LIST, PARAGRAPH = "heading", "code", "table", "list", "paragraph"
+
+# (start, end, вид, путь заголовков)
+Block = Tuple[int, int, str, Tuple[str, ...]]
+
+
+class MarkdownTextSplitter(TextSplitter):
+    """
+    Сплиттер Markdown: режет по границам заголовков, блоков кода, таблиц и списков.
+
+    Attributes:
+        chunk_size: Целевой размер чанка в символах
+        overlap: Перекрытие при нарезке блоков длиннее chunk_size
+        threshold: Радиус поиска переноса строки при такой нарезке
+        max_block_size: Блоки кода и таблицы до этого размера не режутся
+        min_chunk_size: Разделы короче склеиваются со следующим разделом
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        threshold: int = 100,
+        max_block_size: Optional[int] = None,
+        min_chunk_size: Optional[int] = None,
+    ):
+        """
+        Инициализирует сплиттер с параметрами нарезки.
+
+        Args:
+            chunk_size: Целевой размер чанка (по умолчанию 1000 символов)
+            overlap: Перекрытие при нарезке длинных блоков (по умолчанию 200)
+            threshold: Окно поиска переноса строки при нарезке длинных блоков
+            max_block_size: Предел целого блока кода или таблицы
+                (по умолчанию 3 * chunk_size)
+            min_chunk_size: Раздел короче этого склеивается со следующим,
+                путь заголовков чанка — их общее начало
+                (по умолчанию chunk_size // 4)
+
+        Raises:
+            ValueError: Если параметры некорректны
+        """
+        self._fallback = SimpleTextSplitter(chunk_size, overlap, threshold)
+        max_block_size = 3 * chunk_size if max_block_size is None else max_block_size
+        if max_block_size < chunk_size:
+            raise ValueError(
+                f"max_block_size ({max_block_size}) должен быть не меньше "
+                f"chunk_size ({chunk_size})"
+            )
+
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.threshold = threshold
+        self.max_block_size = max_block_size
+        self.min_chunk_size = (
+            chunk_size // 4 if min_chunk_size is None else min_chunk_size
+        )
+
+    def split_text(self, text: str) -> List[Chunk]:
+        """
+        Разбивает Markdown на чанки по структуре документа.
+
+        Args:
+            text: Исходный Markdown
+
+        Returns:
+            Список ленивых Chunk; в metadata — headings (путь заголовков)
+
+        Example:
+            >>> splitter = MarkdownTextSplitter(chunk_size=1000)
+            >>> chunks = splitter.split_text("# API\\n\\n## Лимиты\\n\\nТекст...")
+            >>> chunks[0].metadata["headings"]
+            ['API', 'Лимиты']
+        """
+        chunks: List[Chunk] = []
+        start = end = None  # Границы собираемого чанка
+        headings: Optional[Tuple[str, ...]] = None  # Общий путь блоков чанка
+        has_content = False
+
+        def flush() -> None:
+            nonlocal start, end, headings, has_content
+            if start is not None and end > start:
+                self._emit(chunks, text, start, end, headings)
+            start = end = headings = None
+            has_content = False
+
+        def extend(block_start: int, block_end: int, path: tuple) -> None:
+            nonlocal start, end, headings
+            if start is None:
+                start, headings = block_start, path
+            else:
+                headings = _common_prefix(headings, path)
+            end = block_end
+
+        for block_start, block_end, kind, path in scan_blocks(text):
+            if kind == HEADING:
+                # Заголовок начинает новый раздел, если текущий чанк уже
+                # не меньше min_chunk_size; короткие разделы склеиваются
+                if has_content and end - start >= self.min_chunk_size:
+                    flush()
+                extend(block_start, block_end, path)
+                continue
+
+            if has_content and block_end - start > self.chunk_size:
+                flush()
+
+            limit = self.max_block_size if kind in (CODE, TABLE) else self.chunk_size
+            if block_end - block_start > limit:
+                # Блок не помещается целиком: режем вместе с заголовками перед ним
+                extend(block_start, block_end, path)
+                self._emit_split(chunks, text, start, end, headings)
+                start = end = headings = None
+                has_content = False
+                continue
+
+            extend(block_start, block_end, path)
+            has_content = True
+
+        flush()
+        if chunks:
+            chunks[-1].metadata["is_last"] = True
+        return chunks
+
+    def _emit(
+        self, chunks: List[Chunk], text: str, start: int, end: int, headings: tuple
+    ) -> None:
+        """Добавляет ленивый чанк text[start:end]."""
+        chunks.append(
+            Chunk(
+                index=len(chunks),
+                metadata={
+                    "start": start,
+                    "end": end,
+                    "headings": list(headings),
+                    "is_last": False,
+                },
+                start=start,
+                end=end,
+                source=text,
+            )
+        )
+
+    def _emit_split(
+        self, chunks: List[Chunk], text: str, start: int, end: int, headings: tuple
+    ) -> None:
+        """Режет длинный участок text[start:end] с перекрытием."""
+        for piece in self._fallback.split_text(text[start:end]):
+            self._emit(
+                chunks, text, start + piece.start, start + piece.end, headings
+            )
+
+    def __repr__(self) -> str:
+        return (
+            f"MarkdownTextSplitter("
+            f"chunk_size={self.chunk_size}, "
+            f"overlap={self.overlap}, "
+            f"max_block_size={self.max_block_size})"
+        )
+
+
+def _common_prefix(first: tuple, second: tuple) -> tuple:
+    """Общее начало двух путей заголовков."""
+    size = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        size += 1
+    return first[:size]
+
+
+def scan_blocks(text: str) -> List[Block]:
+    """
+    Делит Markdown на блоки за один проход по строкам.
+
+    Пустые строки присоединяются к предыдущему блоку, поэтому блоки
+    покрывают текст подряд. Заголовки внутри блоков кода не учитываются.
+
+    Args:
+        text: Исходный Markdown
+
+    Returns:
+        List[Block]: (start, end, вид, путь заголовков) по порядку
+    """
+    blocks: List[Block] = []
+    if not text:
+        return blocks
+    path: List[Tuple[int, str]] = []  # (уровень, текст) открытых заголовков
+    headings: Tuple[str, ...] = ()
+
+    kind = None  # Вид открытого блока
+    block_start = 0
+    fence = ""  # Открывающий забор блока кода
+
+    def close(position: int) -> None:
+        nonlocal kind
+        if kind is not None:
+            blocks.append((block_start, position, kind, headings))
+            kind = None
+
+    pos = 0
+    length = len(text)
+    for line in text.split("\n"):
+        line_end = min(pos + len(line) + 1, length)
+        line = line.rstrip("\r")
+        # Только строки с этими первыми символами могут начать новый блок
+        marker = line.lstrip()[:1]
+
+        if kind == CODE:
+            match = marker in "`~" and _FENCE.match(line)
+            if (
+                match
+                and match.group(1)[0] == fence[0]
+                and len(match.group(1)) >= len(fence)
+                and not line[match.end() :].strip()
+            ):
+                close(line_end)
+        elif not marker:
+            # Пустая строка закрывает абзац и таблицу, но не список
+            # (элементы «рыхлого» списка разделены пустыми строками)
+            if kind in (PARAGRAPH, TABLE):
+                close(pos)
+            if blocks and kind is None:
+                start, _, last_kind, last_headings = blocks[-1]
+                blocks[-1] = (start, line_end, last_kind, last_headings)
+            elif kind is None:
+                # Пустые строки в начале текста — отдельный «абзац»
+                kind, block_start = PARAGRAPH, pos
+        elif marker not in _MARKERS:
+            if kind == LIST and line[:1] in (" ", "\t"):
+                pass  # Строка продолжения элемента списка
+            elif kind != PARAGRAPH:
+                close(pos)
+                kind, block_start = PARAGRAPH, pos
+        elif match := _FENCE.match(line):
+            close(pos)
+            kind, block_start, fence = CODE, pos, match.group(1)
+        elif match := _HEADING.match(line):
+            close(pos)
+            level, title = len(match.group(1)), (match.group(2) or "").strip()
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, title))
+            headings = tuple(title for _, title in path)
+            blocks.append((pos, line_end, HEADING, headings))
+        elif marker == "|":
+            if kind != TABLE:
+                close(pos)
+                kind, block_start = TABLE, pos
+        elif _LIST_ITEM.match(line):
+            # Каждый элемент списка — отдельный блок
+            close(pos)
+            kind, block_start = LIST, pos
+        elif kind == LIST and line[:1] in (" ", "\t"):
+            pass  # Строка продолжения элемента списка
+        elif kind != PARAGRAPH:
+            close(pos)
+            kind, block_start = PARAGRAPH, pos
+
+        pos = line_end
+
+    close(length)
+    return blocks
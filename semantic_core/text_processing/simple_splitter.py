@@ -8,12 +8,16 @@
 4. Если нет — режет жестко по позиции (hard cut)
 5. Создает перекрытие (overlap) между соседними чанками
 
+iter_chunks() делает то же самое потоково: над файлом или mmap
+в памяти держится только скользящее окно текста.
+
 Это "тупой как пробка, но надежный" подход (KISS).
 Не парсит Markdown, не понимает структуру — просто режет по символам.
 """
 
-from typing import List
-from .base import TextSplitter, Chunk
+from typing import Iterator, List, Optional
+
+from .base import Chunk, TextSource, TextSplitter, iter_text_blocks
 
 
 class SimpleTextSplitter(TextSplitter):
@@ -60,6 +64,9 @@ class SimpleTextSplitter(TextSplitter):
         """
         Разбивает текст на чанки с умной нарезкой по переносам.
 
+        Чанки ленивые: хранят смещения и ссылку на text, срез
+        создается при обращении к chunk.text.
+
         Args:
             text: Исходный текст для нарезки
 
@@ -74,44 +81,85 @@ class SimpleTextSplitter(TextSplitter):
             >>> chunks[0].index
             0
         """
-        if not text:
-            return []
+        return list(self.iter_chunks(text))
+
+    def iter_chunks(self, source: TextSource, encoding: str = "utf-8") -> Iterator[Chunk]:
+        """
+        Лениво выдает чанки из строки, файла или mmap.
+
+        Нарезка совпадает со split_text(), но в памяти держится только
+        скользящее окно: хвост текущего чанка плюс один блок чтения.
+        Для строки чанки ленивые (смещения + ссылка на строку), для файлов
+        и mmap текст чанка копируется из окна. Смещения start/end считаются
+        в символах от текущей позиции источника; текстовые файлы отдают
+        уже декодированный текст (с переводом переносов строк).
+
+        Args:
+            source: Строка, файловый объект (текстовый или бинарный) или mmap
+            encoding: Кодировка для бинарных файлов и mmap
+
+        Yields:
+            Chunk: Чанки по порядку
 
-        chunks = []
+        Example:
+            >>> with open("transcript.txt", encoding="utf-8") as f:
+            ...     for chunk in splitter.iter_chunks(f):
+            ...         process(chunk.start, chunk.end, chunk.text)
+        """
+        lazy_source = source if isinstance(source, str) else None
+        blocks = iter_text_blocks(source, encoding=encoding)
+
+        window = ""  # Текст от offset до конца прочитанного
+        offset = 0  # Смещение window[0] в тексте
+        eof = False
+        # Сколько символов от start нужно, чтобы решить, где резать
+        lookahead = self.chunk_size + max(self.threshold, 1)
         start = 0
-        text_len = len(text)
         chunk_idx = 0
 
-        while start < text_len:
+        while True:
+            # Дочитываем блоки, пока окно не покрывает [start, start + lookahead)
+            while not eof and offset + len(window) < start + lookahead:
+                block = next(blocks, None)
+                if block is None:
+                    eof = True
+                else:
+                    # Сдвигаем окно: все до start больше не понадобится
+                    window = window[start - offset :] + block
+                    offset = start
+
+            window_end = offset + len(window)
+            if start >= window_end:
+                return
+
             # 1. Вычисляем идеальную позицию разреза
             target_end = start + self.chunk_size
 
             # Если это последний чанк (дошли до конца)
-            if target_end >= text_len:
-                chunk_content = text[start:]
-                chunks.append(
-                    Chunk(
-                        text=chunk_content,
-                        index=chunk_idx,
-                        metadata={"start": start, "end": text_len, "is_last": True},
-                    )
+            if eof and target_end >= window_end:
+                yield self._make_chunk(
+                    window,
+                    offset,
+                    lazy_source,
+                    chunk_idx,
+                    start,
+                    window_end,
+                    {"start": start, "end": window_end, "is_last": True},
                 )
-                break
+                return
 
             # 2. Ищем "умный" разрез по переносу строки
             # Окно поиска: [target_end - threshold, target_end + threshold]
             search_start = max(start, target_end - self.threshold)
-            search_end = min(text_len, target_end + self.threshold)
-
-            search_window = text[search_start:search_end]
+            search_end = min(window_end, target_end + self.threshold)
 
             # Ищем ПОСЛЕДНИЙ перенос строки в окне (rfind = reverse find)
             # Нам выгодно резать как можно позже (ближе к target_end)
-            newline_pos = search_window.rfind("\n")
+            newline_pos = window.rfind("\n", search_start - offset, search_end - offset)
 
             if newline_pos != -1:
                 # Нашли перенос! Режем после него
-                cut_point = search_start + newline_pos + 1  # +1 включаем \n в чанк
+                cut_point = offset + newline_pos + 1  # +1 включаем \n в чанк
                 cut_type = "newline"
             else:
                 # Перенос не найден — жесткий разрез по target_end
@@ -119,28 +167,44 @@ class SimpleTextSplitter(TextSplitter):
                 cut_type = "hard"
 
             # 3. Создаем чанк
-            chunk_content = text[start:cut_point]
-            chunks.append(
-                Chunk(
-                    text=chunk_content,
-                    index=chunk_idx,
-                    metadata={
-                        "start": start,
-                        "end": cut_point,
-                        "cut_type": cut_type,
-                        "is_last": False,
-                    },
-                )
+            yield self._make_chunk(
+                window,
+                offset,
+                lazy_source,
+                chunk_idx,
+                start,
+                cut_point,
+                {
+                    "start": start,
+                    "end": cut_point,
+                    "cut_type": cut_type,
+                    "is_last": False,
+                },
             )
 
             # 4. Вычисляем начало следующего чанка с учетом overlap
             # Важно: не уходим назад за границу текущего чанка
-            next_start = max(start + 1, cut_point - self.overlap)
-
-            start = next_start
+            start = max(start + 1, cut_point - self.overlap)
             chunk_idx += 1
 
-        return chunks
+    @staticmethod
+    def _make_chunk(
+        window: str,
+        offset: int,
+        lazy_source: Optional[str],
+        index: int,
+        start: int,
+        end: int,
+        metadata: dict,
+    ) -> Chunk:
+        """Ленивый чанк для строки, чанк с копией текста для потока."""
+        if lazy_source is not None:
+            return Chunk(
+                index=index, metadata=metadata, start=start, end=end, source=lazy_source
+            )
+        return Chunk(
+            window[start - offset : end - offset], index, metadata, start=start, end=end
+        )
 
     def __repr__(self) -> str:
         return (
@@ -0,0 +1,288 @@
+"""
+Сплиттер с бюджетом в токенах вместо символов.
+
+1000 символов — это ~250 токенов для английского текста, но заметно
+больше для кириллицы и кода: часть чанков не использует лимит входа
+модели эмбеддингов, часть обрезается. TokenTextSplitter режет так,
+чтобы каждый чанк укладывался в max_tokens.
+
+Оценка токенов векторизована: каждому символу по его классу
+(латиница, кириллица, цифры, пробелы, знаки, CJK) сопоставляется вес,
+а префиксные суммы весов дают число токенов любого среза за O(1).
+Граница чанка находится бинарным поиском по префиксным суммам.
+Если подключен точный токенайзер (tokenizer), граница проверяется
+и при превышении бюджета сдвигается назад.
+
+Разрез, как и в SimpleTextSplitter, прилипает к последнему переносу
+строки в окне threshold символов — но только назад: вперед бюджет
+уже исчерпан.
+
+Классы:
+    TokenEstimator
+        Быстрая векторизованная оценка токенов.
+    TokenTextSplitter
+        Нарезка по бюджету токенов с перекрытием.
+"""
+
+import math
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from .base import Chunk, TextSplitter
+
+
+# Веса в сотых долях токена на символ (грубая калибровка под
+# SentencePiece/BPE-токенайзеры многоязычных моделей)
+_WEIGHT_LATIN = 25  # ~4 символа на токен
+_WEIGHT_DIGIT = 50  # числа режутся на группы по 2-3 цифры
+_WEIGHT_SPACE = 10  # пробелы в основном сливаются со словом
+_WEIGHT_NEWLINE = 50
+_WEIGHT_PUNCT = 70  # скобки и операторы кода — почти по токену
+_WEIGHT_CYRILLIC = 40  # ~2.5 символа на токен
+_WEIGHT_CJK = 100
+_WEIGHT_OTHER = 60
+
+# Символы за пределами BMP (эмодзи и т.п.) получают вес последней ячейки
+_TABLE_SIZE = 0x10000
+
+
+def _build_weight_table() -> np.ndarray:
+    """Таблица весов для кодовых точек BMP."""
+    table = np.full(_TABLE_SIZE, _WEIGHT_OTHER, dtype=np.int64)
+    table[0x21:0x7F] = _WEIGHT_PUNCT
+    for first, last in (("a", "z"), ("A", "Z")):
+        table[ord(first) : ord(last) + 1] = _WEIGHT_LATIN
+    table[ord("0") : ord("9") + 1] = _WEIGHT_DIGIT
+    table[[ord(" "), ord("\t"), ord("\r")]] = _WEIGHT_SPACE
+    table[ord("\n")] = _WEIGHT_NEWLINE
+    table[0x0400:0x0530] = _WEIGHT_CYRILLIC
+    table[0x3040:0x30FF] = _WEIGHT_CJK  # Хирагана и катакана
+    table[0x4E00:0xA000] = _WEIGHT_CJK  # Иероглифы CJK
+    table[0xAC00:0xD7A4] = _WEIGHT_CJK  # Хангыль
+    table[_TABLE_SIZE - 1] = _WEIGHT_CJK
+    return table
+
+
+_WEIGHTS = _build_weight_table()
+
+
+class TokenEstimator:
+    """Быстрая оценка количества токенов по классам символов."""
+
+    def prefix_sums(self, text: str) -> np.ndarray:
+        """
+        Префиксные суммы весов символов (в сотых долях токена).
+
+        Args:
+            text: Исходный текст
+
+        Returns:
+            np.ndarray: int64 массив длины len(text) + 1; оценка токенов
+            среза text[a:b] — (sums[b] - sums[a]) / 100
+        """
+        data = text.encode("utf-32-le", "surrogatepass")
+        codepoints = np.frombuffer(data, dtype=np.uint32)
+        weights = _WEIGHTS[np.minimum(codepoints, _TABLE_SIZE - 1)]
+        sums = np.zeros(len(codepoints) + 1, dtype=np.int64)
+        np.cumsum(weights, out=sums[1:])
+        return sums
+
+    def count(self, text: str) -> int:
+        """
+        Оценивает токены одного текста.
+
+        Args:
+            text: Исходный текст
+
+        Returns:
+            int: Оценка токенов (округление вверх)
+        """
+        return self.count_many([text])[0]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """
+        Оценивает токены набора текстов одним векторизованным проходом.
+
+        Args:
+            texts: Тексты
+
+        Returns:
+            List[int]: Оценка токенов для каждого текста (округление вверх)
+        """
+        if not texts:
+            return []
+
+        sums = self.prefix_sums("".join(texts))
+        bounds = np.cumsum([0] + [len(text) for text in texts])
+        totals = sums[bounds[1:]] - sums[bounds[:-1]]
+        return [math.ceil(total / 100) for total in totals.tolist()]
+
+    def __repr__(self) -> str:
+        return "TokenEstimator()"
+
+
+class TokenTextSplitter(TextSplitter):
+    """
+    Сплиттер с бюджетом токенов на чанк и перекрытием в токенах.
+
+    Attributes:
+        max_tokens: Максимум токенов в чанке
+        overlap_tokens: Перекрытие соседних чанков в токенах
+        threshold: Насколько символов назад искать перенос строки
+        estimator: Оценщик токенов
+        tokenizer: Точный подсчет токенов (text -> int) или None
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        threshold: int = 100,
+        estimator: Optional[TokenEstimator] = None,
+        tokenizer: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Инициализирует сплиттер с параметрами нарезки.
+
+        Args:
+            max_tokens: Бюджет токенов чанка (с учетом контекста заметки,
+                который добавляется к тексту перед векторизацией, бюджет
+                стоит брать с запасом от лимита модели)
+            overlap_tokens: Перекрытие между чанками в токенах
+            threshold: Окно поиска переноса строки назад от границы бюджета
+            estimator: Оценщик токенов (по умолчанию TokenEstimator())
+            tokenizer: Точный токенайзер, например
+                lambda text: len(encoding.encode(text)); оценка тогда
+                используется только для выбора кандидата разреза
+
+        Raises:
+            ValueError: Если параметры некорректны
+        """
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens должен быть > 0, получено: {max_tokens}")
+        if overlap_tokens < 0:
+            raise ValueError(
+                f"overlap_tokens не может быть отрицательным: {overlap_tokens}"
+            )
+        if overlap_tokens >= max_tokens:
+            raise ValueError(
+                f"overlap_tokens ({overlap_tokens}) должен быть меньше "
+                f"max_tokens ({max_tokens})"
+            )
+        if threshold < 0:
+            raise ValueError(f"threshold не может быть отрицательным: {threshold}")
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.threshold = threshold
+        self.estimator = estimator or TokenEstimator()
+        self.tokenizer = tokenizer
+
+    def split_text(self, text: str) -> List[Chunk]:
+        """
+        Разбивает текст на чанки не длиннее max_tokens.
+
+        Args:
+            text: Исходный текст для нарезки
+
+        Returns:
+            Список ленивых Chunk; в metadata — оценка tokens
+
+        Example:
+            >>> splitter = TokenTextSplitter(max_tokens=256, overlap_tokens=32)
+            >>> chunks = splitter.split_text(long_russian_text)
+            >>> max(chunk.metadata["tokens"] for chunk in chunks) <= 256
+            True
+        """
+        if not text:
+            return []
+
+        sums = self.estimator.prefix_sums(text)
+        text_len = len(text)
+        budget = self.max_tokens * 100
+        overlap = self.overlap_tokens * 100
+
+        chunks = []
+        start = 0
+        chunk_idx = 0
+
+        while start < text_len:
+            # 1. Самая дальняя позиция, при которой срез укладывается в бюджет
+            target_end = int(np.searchsorted(sums, sums[start] + budget, "right")) - 1
+            target_end = max(target_end, start + 1)  # Хотя бы один символ
+
+            if target_end >= text_len and self._fits(text, start, text_len):
+                chunks.append(
+                    self._make_chunk(
+                        text, sums, chunk_idx, start, text_len, {"is_last": True}
+                    )
+                )
+                break
+
+            # 2. Разрез по переносу строки (только назад) и проверка токенайзером
+            cut_point, cut_type = self._cut(text, start, min(target_end, text_len))
+
+            chunks.append(
+                self._make_chunk(
+                    text,
+                    sums,
+                    chunk_idx,
+                    start,
+                    cut_point,
+                    {"cut_type": cut_type, "is_last": cut_point >= text_len},
+                )
+            )
+            if cut_point >= text_len:
+                break
+
+            # 3. Перекрытие: отступаем на overlap_tokens, но не дальше start + 1
+            overlap_start = int(np.searchsorted(sums, sums[cut_point] - overlap, "left"))
+            start = max(start + 1, overlap_start)
+            chunk_idx += 1
+
+        return chunks
+
+    def _cut(self, text: str, start: int, end: int) -> tuple[int, str]:
+        """Позиция разреза в [start + 1, end], прилипающая к переносу строки."""
+        while True:
+            newline_pos = text.rfind("\n", max(start, end - self.threshold), end)
+            if newline_pos != -1 and newline_pos + 1 > start + 1:
+                cut_point, cut_type = newline_pos + 1, "newline"
+            else:
+                cut_point, cut_type = end, "hard"
+
+            if self._fits(text, start, cut_point) or cut_point - start <= 1:
+                return cut_point, cut_type
+
+            # Точный токенайзер насчитал больше оценки: сужаем пропорционально
+            excess = self.max_tokens / self.tokenizer(text[start:cut_point])
+            length = cut_point - start
+            end = start + max(1, min(length - 1, int(length * excess)))
+
+    def _fits(self, text: str, start: int, end: int) -> bool:
+        """Укладывается ли срез в бюджет по точному токенайзеру (если он есть)."""
+        if self.tokenizer is None:
+            return True
+        return self.tokenizer(text[start:end]) <= self.max_tokens
+
+    @staticmethod
+    def _make_chunk(
+        text: str, sums: np.ndarray, index: int, start: int, end: int, metadata: dict
+    ) -> Chunk:
+        """Ленивый чанк с оценкой токенов в metadata."""
+        metadata = {
+            "start": start,
+            "end": end,
+            "tokens": math.ceil(int(sums[end] - sums[start]) / 100),
+            **metadata,
+        }
+        return Chunk(index=index, metadata=metadata, start=start, end=end, source=text)
+
+    def __repr__(self) -> str:
+        return (
+            f"TokenTextSplitter("
+            f"max_tokens={self.max_tokens}, "
+            f"overlap_tokens={self.overlap_tokens}, "
+            f"threshold={self.threshold})"
+        )
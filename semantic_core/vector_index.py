@@ -0,0 +1,834 @@
+"""
+Хранение векторов в vec0 и построение KNN-запросов с учетом формата хранения.
+
+Формат хранения задается для каждой векторной таблицы при создании
+(create_vector_table) и записывается в служебную таблицу vector_index_config.
+Поиск и сервисный слой читают конфигурацию и работают с любым форматом
+одинаково:
+
+- float32: вектор FLOAT[N] в vec0 (4 байта на координату).
+- int8: вектор int8[N] в vec0 (1 байт на координату), квантованный
+  с масштабом по каждой координате. Точные float32-векторы лежат
+  в обычной таблице {vec_table}_f32: KNN по int8 отбирает
+  rescore_multiplier * k кандидатов, которые затем пересчитываются
+  по точному косинусному расстоянию. Пока векторов меньше
+  _MIN_CALIBRATION_SAMPLE, масштабы не калибруются: векторы пишутся
+  только в {vec_table}_f32, а поиск перебирает их точно. Вставка,
+  на которой набирается выборка, калибрует масштабы и квантует все
+  накопленные векторы.
+
+Независимо от формата у таблицы может быть бинарный компаньон
+{vec_table}_bit: bit[N] из знаков нормализованных векторов (в 32 раза
+меньше float32). Грубый KNN по расстоянию Хэмминга отбирает
+k * oversample кандидатов, которые затем пересчитываются по точному
+косинусному расстоянию.
+
+Для моделей с MRL (Matryoshka) можно хранить префиксные копии:
+{vec_table}_p{d} с первыми d координатами, перенормированными до
+единичной длины. KNN по короткому префиксу отбирает shortlist
+кандидатов, которые пересчитываются по полным векторам. Размерность
+префикса и размер shortlist выбираются на каждый вызов поиска
+без повторной векторизации.
+
+Классы:
+    VectorIndexConfig
+        Конфигурация векторной таблицы (формат, размерность, масштабы int8).
+
+Функции:
+    create_vector_index(config) -> VectorIndexConfig
+        Создает vec0, вспомогательные таблицы и запись конфигурации.
+    get_vector_index_config(table_name, vector_column) -> VectorIndexConfig
+        Читает конфигурацию векторной таблицы.
+    insert_vectors(config, ids, matrix) -> None
+        Вставляет векторы в формате таблицы.
+    delete_vectors(config, ids) -> None
+        Удаляет векторы из vec0 и вспомогательных таблиц.
+    create_cleanup_trigger(config, source_table) -> None
+        Триггер, удаляющий векторы вместе со строками исходной таблицы.
+    candidate_query(config, query_vector, k, ...) -> tuple[str, list]
+        SQL подзапроса (id, distance) для ближайших чанков.
+    candidate_kind(config, k, binary, prefix_dimension) -> CandidateKind
+        Вид подзапроса кандидатов (какой проход KNN будет выполнен).
+    candidate_sql(config, kind) -> str
+        SQL подзапроса кандидатов без параметров (для кэширования).
+    candidate_params(config, kind, query_vector, k, ...) -> list
+        Параметры подзапроса кандидатов для вектора запроса.
+    calibrate_vector_index(table_name, sample_size) -> VectorIndexConfig
+        Перекалибрует масштабы int8 по сохраненным векторам.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Literal, Optional, Sequence
+
+import numpy as np
+from peewee import OperationalError
+
+from config import settings
+from semantic_core.database import db
+
+
+VectorStorage = Literal["float32", "int8"]
+
+# Вид подзапроса кандидатов: строка или размерность префикса MRL
+CandidateKind = str | int
+
+# Служебная таблица с конфигурацией векторных таблиц
+CONFIG_TABLE = "vector_index_config"
+
+# Квантиль |x| по координате, который отображается в 127 (отсекает выбросы)
+_CALIBRATION_QUANTILE = 0.999
+
+# Сколько векторов перекодируем за одну пачку при перекалибровке
+_REQUANTIZE_BATCH = 1000
+
+# Минимум векторов для автоматической калибровки int8: по одной заметке
+# масштабы слишком велики, и половина координат корпуса обрезается до ±127
+_MIN_CALIBRATION_SAMPLE = 1000
+
+# Сколько ID в одном DELETE ... WHERE id IN (...) (ниже лимита переменных SQLite)
+_DELETE_BATCH = 500
+
+
+@dataclass
+class VectorIndexConfig:
+    """
+    Конфигурация векторной таблицы vec0.
+
+    Attributes:
+        table_name: Имя виртуальной таблицы vec0 (например, note_chunks_vec)
+        vector_column: Имя колонки с векторами
+        dimension: Размерность векторов
+        storage: Формат хранения ("float32" или "int8")
+        rescore_multiplier: Во сколько раз больше кандидатов отбирается
+            по int8 перед точным пересчетом
+        binary: Есть ли бинарный компаньон {table_name}_bit
+        binary_oversample: Во сколько раз больше кандидатов отбирается
+            по Хэммингу перед точным пересчетом (по умолчанию для поиска)
+        prefix_dimensions: Размерности префиксных копий (MRL), по возрастанию
+        prefix_oversample: Во сколько раз больше кандидатов отбирается
+            по префиксу, если shortlist не задан явно
+        scales: Масштабы квантования по координатам (только для int8;
+            None — еще не откалиброваны, векторы есть только в _f32)
+    """
+
+    table_name: str
+    vector_column: str = "embedding"
+    dimension: int = field(default_factory=lambda: settings.embedding_dimension)
+    storage: VectorStorage = "float32"
+    rescore_multiplier: int = 4
+    binary: bool = False
+    binary_oversample: int = 8
+    prefix_dimensions: tuple[int, ...] = ()
+    prefix_oversample: int = 4
+    scales: Optional[np.ndarray] = None
+
+    @property
+    def float_table(self) -> str:
+        """Имя таблицы с точными float32-векторами (для int8)."""
+        return f"{self.table_name}_f32"
+
+    @property
+    def bit_table(self) -> str:
+        """Имя бинарного компаньона bit[N]."""
+        return f"{self.table_name}_bit"
+
+    def prefix_table(self, dimension: int) -> str:
+        """Имя таблицы с префиксной копией размерности dimension."""
+        return f"{self.table_name}_p{dimension}"
+
+    @property
+    def exact_source(self) -> tuple[str, str]:
+        """Таблица и колонка с точными float32-векторами."""
+        if self.quantized:
+            return self.float_table, "embedding"
+        return self.table_name, self.vector_column
+
+    @property
+    def quantized(self) -> bool:
+        """True, если KNN идет по квантованным векторам."""
+        return self.storage == "int8"
+
+    @property
+    def layout(self) -> str:
+        """Описание набора таблиц (формат, компаньоны) для сравнения и ошибок."""
+        return (
+            f"{self.storage}[{self.dimension}] binary={self.binary} "
+            f"prefixes={list(self.prefix_dimensions)}"
+        )
+
+    @property
+    def vector_tables(self) -> list[str]:
+        """vec0 и все вспомогательные таблицы с векторами."""
+        tables = [self.table_name]
+        if self.quantized:
+            tables.append(self.float_table)
+        if self.binary:
+            tables.append(self.bit_table)
+        tables.extend(self.prefix_table(prefix) for prefix in self.prefix_dimensions)
+        return tables
+
+    @property
+    def written_tables(self) -> list[str]:
+        """
+        Таблицы, в которых сейчас должен быть вектор каждого чанка.
+
+        int8-таблица vec0 до калибровки пуста: векторы лежат только в _f32.
+        """
+        tables = self.vector_tables
+        if self.quantized and self.scales is None:
+            tables.remove(self.table_name)
+        return tables
+
+    def to_options(self) -> str:
+        """Сериализует параметры (кроме масштабов) в JSON."""
+        return json.dumps(
+            {
+                "vector_column": self.vector_column,
+                "dimension": self.dimension,
+                "storage": self.storage,
+                "rescore_multiplier": self.rescore_multiplier,
+                "binary": self.binary,
+                "binary_oversample": self.binary_oversample,
+                "prefix_dimensions": list(self.prefix_dimensions),
+                "prefix_oversample": self.prefix_oversample,
+            }
+        )
+
+
+def truncate_vectors(matrix: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Обрезает векторы до первых dimension координат и перенормирует их.
+
+    Для MRL-эмбеддингов префикс сам по себе является осмысленным
+    вектором меньшей размерности.
+
+    Args:
+        matrix: Векторы (n, full_dimension) или один вектор (full_dimension,)
+        dimension: Размерность префикса
+
+    Returns:
+        np.ndarray: Нормализованные префиксы float32
+    """
+    prefix = np.array(matrix[..., :dimension], dtype=np.float32)
+    norms = np.linalg.norm(prefix, axis=-1, keepdims=True)
+    np.divide(prefix, norms, out=prefix, where=norms > 0)
+    return prefix
+
+
+def _float_blob(vector: np.ndarray) -> bytes:
+    """Конвертирует вектор в BLOB float32 для sqlite-vec."""
+    return np.ascontiguousarray(vector, dtype=np.float32).tobytes()
+
+
+def create_vector_index(config: VectorIndexConfig) -> VectorIndexConfig:
+    """
+    Создает векторную таблицу vec0 в заданном формате.
+
+    Повторный вызов для существующей таблицы ничего не меняет
+    и возвращает сохраненную конфигурацию.
+
+    Args:
+        config: Требуемая конфигурация
+
+    Returns:
+        VectorIndexConfig: Действующая конфигурация таблицы
+
+    Raises:
+        ValueError: Если формат неизвестен или таблица уже создана
+            с другим форматом, размерностью или без бинарного компаньона
+    """
+    if config.storage not in ("float32", "int8"):
+        raise ValueError(f"Неизвестный формат хранения векторов: {config.storage}")
+    if config.rescore_multiplier < 1:
+        raise ValueError(
+            f"rescore_multiplier должен быть >= 1, получено: {config.rescore_multiplier}"
+        )
+    if config.binary_oversample < 1 or config.prefix_oversample < 1:
+        raise ValueError("binary_oversample и prefix_oversample должны быть >= 1")
+
+    config.prefix_dimensions = tuple(sorted(set(config.prefix_dimensions)))
+    for prefix in config.prefix_dimensions:
+        if not 0 < prefix < config.dimension:
+            raise ValueError(
+                f"Размерность префикса должна быть в (0, {config.dimension}), "
+                f"получено: {prefix}"
+            )
+
+    db.obj.execute_sql(f"""
+        CREATE TABLE IF NOT EXISTS {CONFIG_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            options TEXT NOT NULL,
+            scales BLOB
+        )
+    """)
+
+    exists = db.obj.execute_sql(
+        f"SELECT 1 FROM {CONFIG_TABLE} WHERE table_name = ?", (config.table_name,)
+    ).fetchone()
+    if exists:
+        existing = get_vector_index_config(config.table_name)
+        if existing.layout != config.layout:
+            raise ValueError(
+                f"Таблица {config.table_name} уже создана с форматом "
+                f"{existing.layout}, запрошен {config.layout}"
+            )
+        return existing
+
+    if config.quantized:
+        column_type = f"int8[{config.dimension}] distance_metric=cosine"
+    else:
+        column_type = f"FLOAT[{config.dimension}]"
+
+    db.obj.execute_sql(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {config.table_name}
+        USING vec0(
+            id INTEGER PRIMARY KEY,
+            {config.vector_column} {column_type}
+        )
+    """)
+
+    if config.quantized:
+        db.obj.execute_sql(f"""
+            CREATE TABLE IF NOT EXISTS {config.float_table} (
+                id INTEGER PRIMARY KEY,
+                embedding BLOB NOT NULL
+            )
+        """)
+
+    if config.binary:
+        db.obj.execute_sql(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {config.bit_table}
+            USING vec0(
+                id INTEGER PRIMARY KEY,
+                embedding bit[{config.dimension}]
+            )
+        """)
+
+    for prefix in config.prefix_dimensions:
+        db.obj.execute_sql(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {config.prefix_table(prefix)}
+            USING vec0(
+                id INTEGER PRIMARY KEY,
+                embedding FLOAT[{prefix}]
+            )
+        """)
+
+    db.obj.execute_sql(
+        f"INSERT INTO {CONFIG_TABLE}(table_name, options) VALUES (?, ?)",
+        (config.table_name, config.to_options()),
+    )
+
+    return get_vector_index_config(config.table_name)
+
+
+def get_vector_index_config(
+    table_name: str, vector_column: str = "embedding"
+) -> VectorIndexConfig:
+    """
+    Читает конфигурацию векторной таблицы.
+
+    Для таблиц, созданных до появления конфигурации (нет записи
+    или нет служебной таблицы), возвращается float32 по умолчанию.
+
+    Args:
+        table_name: Имя виртуальной таблицы vec0
+        vector_column: Имя колонки для таблиц без конфигурации
+
+    Returns:
+        VectorIndexConfig: Конфигурация таблицы
+    """
+    try:
+        row = db.obj.execute_sql(
+            f"SELECT options, scales FROM {CONFIG_TABLE} WHERE table_name = ?",
+            (table_name,),
+        ).fetchone()
+    except OperationalError:
+        row = None
+
+    if row is None:
+        return VectorIndexConfig(table_name=table_name, vector_column=vector_column)
+
+    options, scales = row
+    options = json.loads(options)
+    options["prefix_dimensions"] = tuple(options.get("prefix_dimensions", ()))
+
+    return VectorIndexConfig(
+        table_name=table_name,
+        scales=np.frombuffer(scales, dtype=np.float32) if scales else None,
+        **options,
+    )
+
+
+def calibrate_scales(matrix: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет масштабы int8-квантования по каждой координате.
+
+    Квантиль 0.999 модуля координаты отображается в 127; более редкие
+    выбросы при квантовании обрезаются.
+
+    Args:
+        matrix: Выборка векторов (n, dimension)
+
+    Returns:
+        np.ndarray: Масштабы float32 размерности dimension
+    """
+    bounds = np.quantile(np.abs(matrix), _CALIBRATION_QUANTILE, axis=0)
+
+    # Координаты, которые в выборке всегда нулевые, масштабируем по общей границе
+    fallback = bounds.max() if bounds.max() > 0 else 1.0
+    bounds = np.where(bounds > 0, bounds, fallback)
+
+    return (127.0 / bounds).astype(np.float32)
+
+
+def quantize_int8(matrix: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """
+    Квантует векторы в int8 с масштабом по каждой координате.
+
+    Args:
+        matrix: Векторы (n, dimension) или один вектор (dimension,)
+        scales: Масштабы из calibrate_scales()
+
+    Returns:
+        np.ndarray: Векторы int8 той же формы
+    """
+    scaled = np.rint(np.asarray(matrix, dtype=np.float32) * scales)
+    return np.clip(scaled, -127, 127).astype(np.int8)
+
+
+def _stored_scales(config: VectorIndexConfig) -> Optional[np.ndarray]:
+    """Масштабы квантования из конфигурации таблицы (None — не откалибрована)."""
+    (scales,) = db.obj.execute_sql(
+        f"SELECT scales FROM {CONFIG_TABLE} WHERE table_name = ?",
+        (config.table_name,),
+    ).fetchone()
+    return np.frombuffer(scales, dtype=np.float32) if scales else None
+
+
+def _save_scales(config: VectorIndexConfig, scales: np.ndarray) -> None:
+    """Сохраняет масштабы квантования в конфигурацию таблицы."""
+    db.obj.execute_sql(
+        f"UPDATE {CONFIG_TABLE} SET scales = ? WHERE table_name = ?",
+        (scales.astype(np.float32).tobytes(), config.table_name),
+    )
+    config.scales = scales
+
+
+def insert_vectors(
+    config: VectorIndexConfig, ids: Sequence[int], matrix: np.ndarray
+) -> None:
+    """
+    Вставляет векторы в формате таблицы.
+
+    Для int8 до калибровки векторы пишутся только в таблицу float32.
+    Вставка, после которой в ней набирается _MIN_CALIBRATION_SAMPLE
+    векторов, калибрует масштабы по выборке и квантует все векторы;
+    перекалибровать по выросшему корпусу можно через
+    calibrate_vector_index(). Если таблицу уже откалибровал другой
+    писатель, config получает сохраненные масштабы вместо новой калибровки.
+
+    Args:
+        config: Конфигурация векторной таблицы
+        ids: ID строк (совпадают с ID чанков)
+        matrix: Нормализованные векторы (len(ids), dimension)
+    """
+    if not len(ids):
+        return
+
+    cursor = db.obj.cursor()
+    float_rows = [(row_id, _float_blob(vector)) for row_id, vector in zip(ids, matrix)]
+
+    if config.quantized:
+        with db.atomic():
+            cursor.executemany(
+                f"INSERT INTO {config.float_table}(id, embedding) VALUES (?, ?)",
+                float_rows,
+            )
+            if config.scales is None:
+                # Долгий писатель держит конфигурацию с начала загрузки, а
+                # таблицу мог откалибровать другой процесс. Вставка выше уже
+                # взяла блокировку записи, поэтому прочитанные масштабы
+                # не изменятся до конца транзакции
+                config.scales = _stored_scales(config)
+
+            if config.scales is not None:
+                _insert_int8(config, ids, quantize_int8(matrix, config.scales))
+            else:
+                (stored,) = db.obj.execute_sql(
+                    f"SELECT COUNT(*) FROM {config.float_table}"
+                ).fetchone()
+                if stored >= _MIN_CALIBRATION_SAMPLE:
+                    _calibrate(config, _MIN_CALIBRATION_SAMPLE * 10)
+    else:
+        cursor.executemany(
+            f"INSERT INTO {config.table_name}(id, {config.vector_column}) VALUES (?, ?)",
+            float_rows,
+        )
+
+    if config.binary:
+        # Бит = знак координаты нормализованного вектора
+        cursor.executemany(
+            f"INSERT INTO {config.bit_table}(id, embedding) "
+            f"VALUES (?, vec_quantize_binary(?))",
+            float_rows,
+        )
+
+    for prefix in config.prefix_dimensions:
+        cursor.executemany(
+            f"INSERT INTO {config.prefix_table(prefix)}(id, embedding) VALUES (?, ?)",
+            [
+                (row_id, vector.tobytes())
+                for row_id, vector in zip(ids, truncate_vectors(matrix, prefix))
+            ],
+        )
+
+
+def delete_vectors(config: VectorIndexConfig, ids: Sequence[int]) -> None:
+    """
+    Удаляет векторы из vec0 и вспомогательных таблиц.
+
+    Args:
+        config: Конфигурация векторной таблицы
+        ids: ID удаляемых строк
+    """
+    ids = list(ids)
+    for start in range(0, len(ids), _DELETE_BATCH):
+        batch = ids[start : start + _DELETE_BATCH]
+        placeholders = ", ".join("?" * len(batch))
+        for table in config.vector_tables:
+            db.obj.execute_sql(f"DELETE FROM {table} WHERE id IN ({placeholders})", batch)
+
+
+def create_cleanup_trigger(config: VectorIndexConfig, source_table: str) -> None:
+    """
+    Создает триггер, удаляющий векторы при удалении строки source_table.
+
+    На vec0 нет внешних ключей, поэтому без триггера каскадное удаление
+    чанков или DELETE в обход сервисного слоя оставляли бы векторы-сироты.
+    Триггер пересоздается, чтобы учитывать текущий набор компаньонов.
+
+    Args:
+        config: Конфигурация векторной таблицы
+        source_table: Таблица, чьи id совпадают с id векторов (например, note_chunks)
+    """
+    trigger = f"{source_table}_vec_cleanup"
+    body = " ".join(
+        f"DELETE FROM {table} WHERE id = old.id;" for table in config.vector_tables
+    )
+
+    db.obj.execute_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    db.obj.execute_sql(
+        f"CREATE TRIGGER {trigger} AFTER DELETE ON {source_table} BEGIN {body} END"
+    )
+
+
+def _insert_int8(
+    config: VectorIndexConfig, ids: Sequence[int], quantized: np.ndarray
+) -> None:
+    """Вставляет квантованные векторы в int8-таблицу vec0."""
+    db.obj.cursor().executemany(
+        f"INSERT INTO {config.table_name}(id, {config.vector_column}) "
+        f"VALUES (?, vec_int8(?))",
+        [(row_id, vector.tobytes()) for row_id, vector in zip(ids, quantized)],
+    )
+
+
+def candidate_query(
+    config: VectorIndexConfig,
+    query_vector: np.ndarray,
+    k: Optional[int],
+    binary: Optional[bool] = None,
+    oversample: Optional[int] = None,
+    prefix_dimension: Optional[int] = None,
+    shortlist: Optional[int] = None,
+) -> tuple[str, list]:
+    """
+    Строит подзапрос (id, distance) ближайших векторов для CTE поиска.
+
+    distance — всегда точное косинусное расстояние по полным float32:
+    - float32: KNN по vec0 напрямую;
+    - int8: KNN отбирает k * rescore_multiplier кандидатов по квантованным
+      векторам, которые пересчитываются по таблице {vec_table}_f32;
+    - binary: KNN по Хэммингу в {vec_table}_bit отбирает k * oversample
+      кандидатов, которые пересчитываются по точным векторам;
+    - prefix: KNN по префиксной копии {vec_table}_p{d} отбирает shortlist
+      кандидатов, которые пересчитываются по полным векторам.
+
+    Грубый проход выбирается так: явно запрошенный (binary=True или
+    prefix_dimension), иначе бинарный компаньон, иначе самый короткий
+    префикс, иначе KNN по основной таблице. prefix_dimension, равный
+    полной размерности, отключает префиксный проход.
+
+    SQL зависит только от конфигурации и вида прохода (candidate_kind),
+    поэтому его можно построить один раз (candidate_sql) и подставлять
+    на каждый запрос только параметры (candidate_params).
+
+    Args:
+        config: Конфигурация векторной таблицы
+        query_vector: Нормализованный вектор запроса
+        k: Количество ближайших векторов (None — полный перебор)
+        binary: Использовать бинарный компаньон (None — если он есть у таблицы)
+        oversample: Множитель кандидатов для binary
+            (по умолчанию config.binary_oversample)
+        prefix_dimension: Размерность префикса для первого прохода
+        shortlist: Количество кандидатов префиксного прохода
+            (по умолчанию k * config.prefix_oversample, не меньше k)
+
+    Returns:
+        tuple[str, list]: SQL подзапроса и его параметры
+
+    Raises:
+        ValueError: Если запрошенного компаньона или префикса у таблицы нет,
+            запрошены одновременно binary и prefix_dimension
+            или oversample < 1
+
+    Examples:
+        >>> sql, params = candidate_query(config, query_vector, k=100)
+        >>> db.obj.execute_sql(f"WITH candidates AS ({sql}) ...", params)
+    """
+    kind = candidate_kind(config, k, binary, prefix_dimension)
+    return candidate_sql(config, kind), candidate_params(
+        config, kind, query_vector, k, oversample, shortlist
+    )
+
+
+def candidate_kind(
+    config: VectorIndexConfig,
+    k: Optional[int],
+    binary: Optional[bool] = None,
+    prefix_dimension: Optional[int] = None,
+) -> CandidateKind:
+    """
+    Определяет вид подзапроса кандидатов (см. candidate_query).
+
+    Returns:
+        "scan" (полный перебор точных векторов; так же для int8-таблицы,
+        пока масштабы не откалиброваны), "knn" (KNN по основной таблице
+        float32), "int8", "binary" или размерность префикса
+
+    Raises:
+        ValueError: Как в candidate_query
+    """
+    if k is None:
+        return "scan"
+
+    coarse = _resolve_coarse_pass(config, binary, prefix_dimension)
+    if coarse is not None:
+        return coarse
+    if not config.quantized:
+        return "knn"
+    if config.scales is None:
+        # Меньше _MIN_CALIBRATION_SAMPLE векторов: точный перебор _f32
+        return "scan"
+    return "int8"
+
+
+def candidate_sql(config: VectorIndexConfig, kind: CandidateKind) -> str:
+    """
+    SQL подзапроса кандидатов вида kind (без параметров).
+
+    Args:
+        config: Конфигурация векторной таблицы
+        kind: Вид подзапроса из candidate_kind()
+
+    Returns:
+        str: SQL подзапроса (id, distance)
+    """
+    column = config.vector_column
+    exact_table, exact_column = config.exact_source
+
+    if kind == "scan":
+        return f"""
+            SELECT id, vec_distance_cosine({exact_column}, ?) AS distance
+            FROM {exact_table}
+        """
+    if kind == "knn":
+        return f"""
+            SELECT id, vec_distance_cosine({column}, ?) AS distance
+            FROM {config.table_name}
+            WHERE {column} MATCH ? AND k = ?
+        """
+    if kind == "binary":
+        approx_sql = f"""
+            SELECT id FROM {config.bit_table}
+            WHERE embedding MATCH vec_quantize_binary(?) AND k = ?
+        """
+    elif kind == "int8":
+        approx_sql = f"""
+            SELECT id FROM {config.table_name}
+            WHERE {column} MATCH vec_int8(?) AND k = ?
+        """
+    else:
+        approx_sql = f"""
+            SELECT id FROM {config.prefix_table(kind)}
+            WHERE embedding MATCH ? AND k = ?
+        """
+
+    # Точный пересчет distance кандидатов грубого KNN и отбор top-k
+    return f"""
+        SELECT exact.id, vec_distance_cosine(exact.{exact_column}, ?) AS distance
+        FROM ({approx_sql}) approx
+        INNER JOIN {exact_table} exact ON exact.id = approx.id
+        ORDER BY distance ASC
+        LIMIT ?
+    """
+
+
+def candidate_params(
+    config: VectorIndexConfig,
+    kind: CandidateKind,
+    query_vector: np.ndarray,
+    k: Optional[int],
+    oversample: Optional[int] = None,
+    shortlist: Optional[int] = None,
+) -> list:
+    """
+    Параметры подзапроса candidate_sql(config, kind) для вектора запроса.
+
+    Args:
+        config: Конфигурация векторной таблицы
+        kind: Вид подзапроса из candidate_kind()
+        query_vector: Нормализованный вектор запроса
+        k: Количество ближайших векторов
+        oversample: Множитель кандидатов для binary
+        shortlist: Количество кандидатов префиксного прохода
+
+    Returns:
+        list: Параметры в порядке плейсхолдеров SQL
+
+    Raises:
+        ValueError: Если oversample < 1
+    """
+    query_blob = _float_blob(query_vector)
+    if kind == "scan":
+        return [query_blob]
+    if kind == "knn":
+        return [query_blob, query_blob, k]
+
+    if kind == "binary":
+        oversample = oversample or config.binary_oversample
+        if oversample < 1:
+            raise ValueError(f"oversample должен быть >= 1, получено: {oversample}")
+        approx_params = [query_blob, k * oversample]
+    elif kind == "int8":
+        quantized_blob = quantize_int8(query_vector, config.scales).tobytes()
+        approx_params = [quantized_blob, k * config.rescore_multiplier]
+    else:
+        prefix_blob = _float_blob(truncate_vectors(query_vector, kind))
+        approx_params = [prefix_blob, max(shortlist or k * config.prefix_oversample, k)]
+
+    return [query_blob] + approx_params + [k]
+
+
+def _resolve_coarse_pass(
+    config: VectorIndexConfig,
+    binary: Optional[bool],
+    prefix_dimension: Optional[int],
+) -> Optional[str | int]:
+    """
+    Выбирает грубый проход KNN.
+
+    Returns:
+        "binary", размерность префикса или None (KNN по основной таблице)
+    """
+    if prefix_dimension == config.dimension:
+        prefix_dimension, use_prefixes = None, False
+    else:
+        use_prefixes = True
+
+    if binary and prefix_dimension is not None:
+        raise ValueError("Нельзя одновременно задать binary=True и prefix_dimension")
+
+    if binary and not config.binary:
+        raise ValueError(f"У таблицы {config.table_name} нет бинарного компаньона")
+
+    if prefix_dimension is not None:
+        if prefix_dimension not in config.prefix_dimensions:
+            raise ValueError(
+                f"У таблицы {config.table_name} нет префикса {prefix_dimension}, "
+                f"доступны: {list(config.prefix_dimensions)}"
+            )
+        return prefix_dimension
+
+    if binary or (binary is None and config.binary):
+        return "binary"
+
+    if use_prefixes and config.prefix_dimensions:
+        return config.prefix_dimensions[0]
+
+    return None
+
+
+def calibrate_vector_index(
+    table_name: str, sample_size: int = 10_000
+) -> VectorIndexConfig:
+    """
+    Перекалибровывает масштабы int8 по сохраненным float32-векторам.
+
+    Масштабы считаются по случайной выборке из {vec_table}_f32,
+    после чего все int8-векторы перекодируются пачками в одной транзакции.
+    Автоматически масштабы калибруются один раз, когда набирается
+    _MIN_CALIBRATION_SAMPLE векторов; после роста корпуса или смены
+    модели их стоит пересчитать по большей выборке.
+
+    Args:
+        table_name: Имя виртуальной таблицы vec0
+        sample_size: Размер выборки для калибровки
+
+    Returns:
+        VectorIndexConfig: Обновленная конфигурация
+
+    Raises:
+        ValueError: Если таблица хранит не int8 или в ней нет векторов
+    """
+    config = get_vector_index_config(table_name)
+    if not config.quantized:
+        raise ValueError(f"Таблица {table_name} не использует int8-квантование")
+
+    if not _calibrate(config, sample_size):
+        raise ValueError(f"В таблице {table_name} нет векторов для калибровки")
+    return config
+
+
+def _calibrate(config: VectorIndexConfig, sample_size: int) -> bool:
+    """
+    Калибрует масштабы по выборке из _f32 и перекодирует все int8-векторы.
+
+    Returns:
+        bool: False, если в таблице нет векторов
+    """
+    rows = db.obj.execute_sql(
+        f"SELECT embedding FROM {config.float_table} ORDER BY random() LIMIT ?",
+        (sample_size,),
+    ).fetchall()
+    if not rows:
+        return False
+
+    sample = np.stack([np.frombuffer(row[0], dtype=np.float32) for row in rows])
+
+    with db.atomic():
+        _save_scales(config, calibrate_scales(sample))
+
+        last_id = 0
+        while True:
+            batch = db.obj.execute_sql(
+                f"SELECT id, embedding FROM {config.float_table} "
+                f"WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, _REQUANTIZE_BATCH),
+            ).fetchall()
+            if not batch:
+                break
+
+            ids = [row[0] for row in batch]
+            matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in batch])
+
+            # UPDATE в vec0 теряет подтип int8, поэтому перевставляем строки
+            placeholders = ", ".join("?" * len(ids))
+            db.obj.execute_sql(
+                f"DELETE FROM {config.table_name} WHERE id IN ({placeholders})", ids
+            )
+            _insert_int8(config, ids, quantize_int8(matrix, config.scales))
+            last_id = ids[-1]
+
+    return True
@@ -0,0 +1,420 @@
+"""
+Фоновая векторизация чанков, сохраненных в режиме deferred.
+
+save_note_with_chunks(..., mode="deferred") пишет чанки без векторов
+со статусом PENDING. EmbeddingWorker забирает их пачками, векторизует
+и записывает векторы:
+
+1. Захват пачки (транзакция IMMEDIATE): PENDING → PROCESSING,
+   claimed_at = сейчас (аренда), attempts + 1
+2. Векторизация вне транзакции — один запрос embed_documents на пачку
+3. Запись векторов и PROCESSING → DONE в одной транзакции, только для
+   чанков, которые все еще захвачены этим воркером (чанк могли удалить
+   или перезахватить после истечения аренды)
+
+Если воркер упал, его чанки остаются в PROCESSING. После lease_timeout
+любой воркер возвращает их в PENDING, а после max_attempts попыток
+помечает FAILED.
+
+Запуск отдельным процессом (из корня репозитория):
+    python -m semantic_core.worker \\
+        --note-model domain.models.Note --chunk-model domain.models.NoteChunk
+
+Классы:
+    WorkerStats
+        Счетчики работы воркера.
+    EmbeddingWorker
+        Воркер отложенной векторизации.
+"""
+
+import argparse
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from peewee import Model
+
+from semantic_core.database import db
+from semantic_core.embeddings import Embedder
+from semantic_core.services import (
+    build_vector_text,
+    chunk_context_text,
+    note_context_text,
+)
+from semantic_core.status import ChunkStatus
+from semantic_core.vector_index import get_vector_index_config, insert_vectors
+
+
+@dataclass
+class WorkerStats:
+    """
+    Счетчики работы воркера.
+
+    Attributes:
+        batches: Обработано пачек
+        embedded: Чанков векторизовано (DONE)
+        errors: Пачек, на которых упала векторизация
+        recovered: Зависших чанков возвращено в PENDING
+        failed: Чанков помечено FAILED (попытки исчерпаны)
+    """
+
+    batches: int = 0
+    embedded: int = 0
+    errors: int = 0
+    recovered: int = 0
+    failed: int = 0
+
+    def add(self, other: "WorkerStats") -> None:
+        """Прибавляет счетчики другого запуска."""
+        self.batches += other.batches
+        self.embedded += other.embedded
+        self.errors += other.errors
+        self.recovered += other.recovered
+        self.failed += other.failed
+
+
+class EmbeddingWorker:
+    """
+    Воркер отложенной векторизации чанков.
+
+    Может работать в том же процессе (run_once() или start() в фоновом
+    потоке) или отдельным процессом (python -m semantic_core.worker).
+    Несколько воркеров могут работать с одной БД одновременно:
+    захват пачки атомарен.
+
+    Attributes:
+        batch_size: Чанков в одной пачке (и в одном запросе эмбеддингов)
+        lease_timeout: Через сколько секунд захват считается зависшим
+        max_attempts: Попыток векторизации до статуса FAILED
+        poll_interval: Пауза между проверками очереди, когда она пуста
+
+    Example:
+        >>> worker = EmbeddingWorker(Note, NoteChunk, create_embedder())
+        >>> stats = worker.run_once()  # обработать все, что накопилось
+        >>>
+        >>> worker.start()  # или обрабатывать в фоне
+        >>> ...
+        >>> worker.stop()
+    """
+
+    def __init__(
+        self,
+        note_model: Model,
+        chunk_model: Model,
+        generator: Embedder,
+        batch_size: int = 100,
+        lease_timeout: float = 300.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+    ):
+        """
+        Инициализирует воркер.
+
+        Args:
+            note_model: Класс модели Note (родитель, источник контекста)
+            chunk_model: Класс модели NoteChunk с колонками status, claimed_at,
+                attempts, last_error
+            generator: Эмбеддер для векторизации
+            batch_size: Чанков в одной пачке
+            lease_timeout: Время аренды захваченной пачки (секунды)
+            max_attempts: Максимум попыток векторизации чанка
+            poll_interval: Пауза при пустой очереди (секунды)
+
+        Raises:
+            ValueError: Если параметры некорректны или у модели нет колонок статуса
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size должен быть > 0, получено: {batch_size}")
+        if lease_timeout <= 0:
+            raise ValueError(
+                f"lease_timeout должен быть > 0, получено: {lease_timeout}"
+            )
+        if max_attempts <= 0:
+            raise ValueError(f"max_attempts должен быть > 0, получено: {max_attempts}")
+
+        missing = {"status", "claimed_at", "attempts", "last_error"} - set(
+            chunk_model._meta.fields
+        )
+        if missing:
+            raise ValueError(
+                f"У {chunk_model.__name__} нет колонок: {', '.join(sorted(missing))}"
+            )
+
+        self.note_model = note_model
+        self.chunk_model = chunk_model
+        self.generator = generator
+        self.batch_size = batch_size
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def pending_count(self) -> int:
+        """Возвращает количество чанков, ожидающих векторизации."""
+        return (
+            self.chunk_model.select()
+            .where(self.chunk_model.status == ChunkStatus.PENDING)
+            .count()
+        )
+
+    def recover_stale(self) -> WorkerStats:
+        """
+        Возвращает в очередь чанки, чья аренда истекла.
+
+        Returns:
+            WorkerStats: recovered — возвращено в PENDING,
+            failed — помечено FAILED (попытки исчерпаны)
+        """
+        chunk = self.chunk_model
+        deadline = datetime.now() - timedelta(seconds=self.lease_timeout)
+        stale = (chunk.status == ChunkStatus.PROCESSING) & (chunk.claimed_at < deadline)
+
+        with db.atomic("IMMEDIATE"):
+            failed = (
+                chunk.update(
+                    status=ChunkStatus.FAILED,
+                    claimed_at=None,
+                    last_error="Истекла аренда: воркер не завершил обработку",
+                )
+                .where(stale & (chunk.attempts >= self.max_attempts))
+                .execute()
+            )
+            recovered = (
+                chunk.update(status=ChunkStatus.PENDING, claimed_at=None)
+                .where(stale)
+                .execute()
+            )
+
+        return WorkerStats(recovered=recovered, failed=failed)
+
+    def claim_batch(self) -> tuple[list, Optional[datetime]]:
+        """
+        Атомарно захватывает пачку чанков со статусом PENDING.
+
+        Returns:
+            tuple: (захваченные чанки с загруженными заметками, метка захвата)
+        """
+        chunk = self.chunk_model
+        claimed_at = datetime.now()
+
+        with db.atomic("IMMEDIATE"):
+            ids = [
+                row.id
+                for row in chunk.select(chunk.id)
+                .where(chunk.status == ChunkStatus.PENDING)
+                .order_by(chunk.id)
+                .limit(self.batch_size)
+            ]
+            if not ids:
+                return [], None
+
+            chunk.update(
+                status=ChunkStatus.PROCESSING,
+                claimed_at=claimed_at,
+                attempts=chunk.attempts + 1,
+            ).where(chunk.id.in_(ids)).execute()
+
+        chunks = list(
+            chunk.select(chunk, self.note_model)
+            .join(self.note_model)
+            .where(chunk.id.in_(ids))
+            .order_by(chunk.id)
+        )
+        return chunks, claimed_at
+
+    def process_batch(self) -> WorkerStats:
+        """
+        Захватывает, векторизует и записывает одну пачку.
+
+        Returns:
+            WorkerStats: Счетчики пачки (batches=0, если очередь пуста)
+        """
+        chunks, claimed_at = self.claim_batch()
+        if not chunks:
+            return WorkerStats()
+
+        # Контекст заметки один на все ее чанки (если у чанка нет хлебных крошек)
+        contexts = {}
+        texts = []
+        for chunk in chunks:
+            if chunk.note_id not in contexts:
+                contexts[chunk.note_id] = note_context_text(chunk.note)
+            texts.append(
+                build_vector_text(
+                    chunk_context_text(chunk, contexts[chunk.note_id]), chunk.content
+                )
+            )
+
+        try:
+            embeddings = self.generator.embed_documents(texts)
+        except Exception as error:
+            return self._release(chunks, claimed_at, error)
+
+        model = self.chunk_model
+        vector_config = get_vector_index_config(f"{model._meta.table_name}_vec")
+
+        with db.atomic("IMMEDIATE"):
+            # Пока шла векторизация, чанки могли удалить или перезахватить
+            owned = self._owned(chunks, claimed_at)
+            positions = [i for i, chunk in enumerate(chunks) if chunk.id in owned]
+
+            if positions:
+                insert_vectors(
+                    vector_config,
+                    [chunks[i].id for i in positions],
+                    embeddings[positions],
+                )
+                model.update(
+                    status=ChunkStatus.DONE, claimed_at=None, last_error=None
+                ).where(model.id.in_(list(owned))).execute()
+
+        return WorkerStats(batches=1, embedded=len(positions))
+
+    def run_once(self) -> WorkerStats:
+        """
+        Обрабатывает очередь, пока в ней есть чанки.
+
+        Сначала возвращает зависшие чанки. Останавливается на первой
+        ошибке векторизации, чтобы не тратить попытки при недоступном API:
+        следующий запуск повторит пачку.
+
+        Returns:
+            WorkerStats: Счетчики запуска
+        """
+        stats = self.recover_stale()
+
+        while not self._stop.is_set():
+            batch = self.process_batch()
+            stats.add(batch)
+            if not batch.batches or batch.errors:
+                break
+
+        return stats
+
+    def run_forever(self) -> WorkerStats:
+        """
+        Обрабатывает очередь до вызова stop().
+
+        Returns:
+            WorkerStats: Счетчики за все время работы
+        """
+        total = WorkerStats()
+
+        while not self._stop.is_set():
+            stats = self.run_once()
+            total.add(stats)
+            if not stats.batches or stats.errors:
+                self._stop.wait(self.poll_interval)
+
+        return total
+
+    def start(self) -> None:
+        """Запускает run_forever() в фоновом потоке со своим соединением."""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("Воркер уже запущен")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_in_thread, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Останавливает фоновый поток после текущей пачки."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_in_thread(self) -> None:
+        """Тело фонового потока: отдельное соединение на время работы."""
+        db.connect(reuse_if_open=True)
+        try:
+            self.run_forever()
+        finally:
+            db.close()
+
+    def _owned(self, chunks: list, claimed_at: datetime) -> set[int]:
+        """ID чанков, которые все еще захвачены с меткой claimed_at."""
+        model = self.chunk_model
+        return {
+            row.id
+            for row in model.select(model.id).where(
+                model.id.in_([chunk.id for chunk in chunks])
+                & (model.status == ChunkStatus.PROCESSING)
+                & (model.claimed_at == claimed_at)
+            )
+        }
+
+    def _release(
+        self, chunks: list, claimed_at: datetime, error: Exception
+    ) -> WorkerStats:
+        """Возвращает пачку в очередь после ошибки (или FAILED, если попытки кончились)."""
+        model = self.chunk_model
+
+        with db.atomic("IMMEDIATE"):
+            owned = list(self._owned(chunks, claimed_at))
+            failed = (
+                model.update(
+                    status=ChunkStatus.FAILED, claimed_at=None, last_error=str(error)
+                )
+                .where(model.id.in_(owned) & (model.attempts >= self.max_attempts))
+                .execute()
+            )
+            model.update(
+                status=ChunkStatus.PENDING, claimed_at=None, last_error=str(error)
+            ).where(
+                model.id.in_(owned) & (model.status == ChunkStatus.PROCESSING)
+            ).execute()
+
+        return WorkerStats(batches=1, errors=1, failed=failed)
+
+
+def main() -> None:
+    from semantic_core.database import import_model, init_database
+    from semantic_core.embeddings import create_embedder
+
+    parser = argparse.ArgumentParser(description="Воркер отложенной векторизации")
+    parser.add_argument("--note-model", required=True, help="например domain.models.Note")
+    parser.add_argument(
+        "--chunk-model", required=True, help="например domain.models.NoteChunk"
+    )
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--lease-timeout", type=float, default=300.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--once", action="store_true", help="обработать очередь и выйти"
+    )
+    args = parser.parse_args()
+
+    note_model = import_model(args.note_model)
+    chunk_model = import_model(args.chunk_model)
+    init_database().connect()
+
+    worker = EmbeddingWorker(
+        note_model,
+        chunk_model,
+        create_embedder(),
+        batch_size=args.batch_size,
+        lease_timeout=args.lease_timeout,
+        max_attempts=args.max_attempts,
+        poll_interval=args.poll_interval,
+    )
+    print(f"В очереди: {worker.pending_count()} чанков")
+
+    try:
+        stats = worker.run_once() if args.once else worker.run_forever()
+    except KeyboardInterrupt:
+        worker.stop()
+        return
+
+    print(
+        f"Векторизовано: {stats.embedded}, ошибок: {stats.errors}, "
+        f"возвращено зависших: {stats.recovered}, FAILED: {stats.failed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
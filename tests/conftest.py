@@ -15,7 +15,8 @@ from semantic_core import (
     init_database,
     create_vector_table,
     create_fts_table,
-    EmbeddingGenerator,
+    create_embedding_cache_table,
+    create_embedder,
     SimpleTextSplitter,
 )
 from domain.models import Note, NoteChunk, Category, Tag, NoteTag
@@ -55,14 +56,25 @@ def test_db(temp_db_path):
     # Создаем виртуальные таблицы
     create_vector_table(NoteChunk, vector_column="embedding")
     create_fts_table(Note, text_columns=["title", "content"])
+    create_embedding_cache_table()
 
     yield database
 
     # Cleanup: удаляем все таблицы после теста
     # Сначала удаляем виртуальные таблицы
     try:
+        # Векторная таблица и ее компаньоны (_f32, _bit, _p{d})
+        companions = database.execute_sql(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name GLOB 'note_chunks_vec_*' AND sql IS NOT NULL"
+        ).fetchall()
         database.execute_sql("DROP TABLE IF EXISTS note_chunks_vec")
+        for (name,) in companions:
+            database.execute_sql(f"DROP TABLE IF EXISTS {name}")
+        database.execute_sql("DROP TABLE IF EXISTS vector_index_config")
         database.execute_sql("DROP TABLE IF EXISTS notes_fts")
+        database.execute_sql("DROP TABLE IF EXISTS embedding_cache")
+        database.execute_sql("DROP TABLE IF EXISTS source_manifest")
     except Exception:
         pass  # Игнорируем ошибки при удалении виртуальных таблиц
     
@@ -90,8 +102,13 @@ def sample_tags(test_db):
 
 @pytest.fixture
 def embedding_generator():
-    """Создает экземпляр генератора эмбеддингов."""
-    return EmbeddingGenerator()
+    """
+    Создает эмбеддер по настройке EMBEDDING_PROVIDER.
+
+    По умолчанию — Gemini API; с EMBEDDING_PROVIDER=local тесты
+    работают без сети и API-ключа.
+    """
+    return create_embedder()
 
 
 @pytest.fixture
@@ -0,0 +1,146 @@
+"""
+Тесты загрузки каталога с манифестом.
+
+Проверяет:
+- Первичную загрузку и пропуск неизменившихся файлов
+- Инкрементальное обновление измененных файлов и touch без изменений
+- Удаление заметок исчезнувших файлов
+- Продолжение прерванной загрузки с контрольной точки
+"""
+
+import os
+
+import pytest
+
+from semantic_core import DirectoryIngester, HashingEmbedder
+from semantic_core.database import db
+from domain.models import Note, NoteChunk
+
+
+SECTIONS = [
+    "Цикл for перебирает элементы последовательности. " * 15,
+    "Конструкция try-except перехватывает исключения. " * 15,
+    "Виртуальные окружения venv изолируют зависимости. " * 15,
+]
+
+
+class CountingEmbedder(HashingEmbedder):
+    """Эмбеддер, считающий векторизованные тексты и падающий по запросу."""
+
+    def __init__(self, fail_on: int = 0):
+        super().__init__()
+        self.texts = 0
+        self.calls = 0
+        self.fail_on = fail_on
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("API недоступен")
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def docs(tmp_path):
+    """Каталог с вложенной папкой и markdown-файлами."""
+    (tmp_path / "guides").mkdir()
+    for i in range(5):
+        folder = tmp_path / "guides" if i % 2 else tmp_path
+        (folder / f"doc_{i}.md").write_text(
+            "\n\n".join(SECTIONS[i % 3 :] + SECTIONS[: i % 3]), encoding="utf-8"
+        )
+    (tmp_path / "notes.txt").write_text("не markdown", encoding="utf-8")
+    return tmp_path
+
+
+def ingester(splitter, embedder, **kwargs):
+    """Создает DirectoryIngester для Note/NoteChunk."""
+    return DirectoryIngester(Note, NoteChunk, splitter, embedder, **kwargs)
+
+
+def count_vectors() -> int:
+    """Возвращает количество векторов."""
+    return db.obj.execute_sql("SELECT COUNT(*) FROM note_chunks_vec").fetchone()[0]
+
+
+class TestDirectoryIngester:
+    """Тесты DirectoryIngester."""
+
+    def test_first_sync_and_unchanged_rerun(self, test_db, text_splitter, docs):
+        """Проверяет загрузку и повторный запуск без чтения и векторизации."""
+        first = ingester(text_splitter, HashingEmbedder(), batch_size=2).sync(docs)
+
+        assert (first.scanned, first.added, first.batches) == (5, 5, 3)
+        assert Note.select().count() == 5
+        assert {note.title for note in Note.select()} == {
+            f"Doc {i}" for i in range(5)
+        }
+        assert count_vectors() == NoteChunk.select().count() == first.chunks
+
+        embedder = CountingEmbedder()
+        second = ingester(text_splitter, embedder).sync(docs)
+
+        assert second.unchanged == 5
+        assert second.added == second.updated == second.deleted == 0
+        assert embedder.calls == 0
+        assert Note.select().count() == 5
+
+    def test_changed_and_touched_files(self, test_db, text_splitter, docs):
+        """Проверяет обновление по чанкам и пропуск файла с тем же содержимым."""
+        ingester(text_splitter, HashingEmbedder()).sync(docs)
+        edited = docs / "doc_0.md"
+        note_id = Note.get(Note.title == "Doc 0").id
+        edited.write_text(
+            edited.read_text(encoding="utf-8") + "\n\nНовый раздел про генераторы.",
+            encoding="utf-8",
+        )
+        touched = docs / "doc_2.md"
+        stat = touched.stat()
+        os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        embedder = CountingEmbedder()
+        stats = ingester(text_splitter, embedder).sync(docs)
+
+        assert (stats.updated, stats.unchanged, stats.added) == (1, 4, 0)
+        assert Note.get(Note.title == "Doc 0").id == note_id
+        assert "генераторы" in Note.get_by_id(note_id).content
+        assert 0 < embedder.texts < Note.get_by_id(note_id).chunks.count()
+        assert count_vectors() == NoteChunk.select().count()
+
+        # mtime touch-файла записан в манифест: следующий запуск не читает его
+        assert ingester(text_splitter, embedder).sync(docs).unchanged == 5
+
+    def test_deleted_files(self, test_db, text_splitter, docs):
+        """Проверяет удаление заметок и строк манифеста исчезнувших файлов."""
+        ingester(text_splitter, HashingEmbedder()).sync(docs)
+        (docs / "guides" / "doc_1.md").unlink()
+        (docs / "doc_4.md").unlink()
+
+        stats = ingester(text_splitter, HashingEmbedder()).sync(docs)
+
+        assert stats.deleted == 2
+        assert {note.title for note in Note.select()} == {"Doc 0", "Doc 2", "Doc 3"}
+        assert count_vectors() == NoteChunk.select().count()
+        manifest = db.obj.execute_sql("SELECT COUNT(*) FROM source_manifest")
+        assert manifest.fetchone()[0] == 3
+
+    def test_interrupted_sync_resumes(self, test_db, text_splitter, docs):
+        """Проверяет, что после сбоя загружаются только оставшиеся файлы."""
+        failing = ingester(text_splitter, CountingEmbedder(fail_on=2), batch_size=2)
+        with pytest.raises(RuntimeError, match="API недоступен"):
+            failing.sync(docs)
+        assert Note.select().count() == 2
+
+        embedder = CountingEmbedder()
+        stats = ingester(text_splitter, embedder, batch_size=2).sync(docs)
+
+        assert (stats.added, stats.unchanged, stats.deleted) == (3, 2, 0)
+        assert Note.select().count() == 5
+        assert embedder.texts == stats.chunks
+        assert count_vectors() == NoteChunk.select().count()
+
+    def test_missing_directory(self, test_db, text_splitter, tmp_path):
+        """Проверяет ошибку для несуществующего каталога."""
+        with pytest.raises(ValueError, match="Каталог не найден"):
+            ingester(text_splitter, HashingEmbedder()).sync(tmp_path / "nope")
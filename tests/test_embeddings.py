@@ -0,0 +1,628 @@
+"""
+Тесты для EmbeddingGenerator без обращения к сети.
+
+Проверяет:
+- Нарезку пакетных запросов по лимитам API
+- Нормализацию результирующей матрицы
+- Сохранение порядка текстов
+- Персистентный кэш эмбеддингов
+- In-process кэш эмбеддингов запросов
+- Асинхронную генерацию с ограничением параллелизма
+- Планировщик запросов с квотами и повторами
+- Склейку одинаковых одновременных запросов
+- Локальный эмбеддер на хэшировании n-грамм
+- Ленивый импорт SDK провайдера и настроек
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from semantic_core import embeddings
+from semantic_core import embedding_cache as embeddings_cache_module
+from semantic_core.embeddings import (
+    EmbeddingGenerator,
+    Embedder,
+    EmbeddingScheduler,
+    TokenBucket,
+    is_retryable_error,
+)
+from semantic_core.async_embeddings import AsyncEmbeddingGenerator
+from semantic_core.local_embeddings import HashingEmbedder
+from semantic_core.embedding_cache import EmbeddingCache, QueryEmbeddingCache
+from semantic_core.coalescing import SingleFlight, AsyncSingleFlight
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    Подменяет genai.embed_content детерминированной заглушкой.
+
+    Возвращает список вызовов: для каждого запроса — список текстов.
+    """
+    calls = []
+
+    def fake_embed_content(model, content, task_type, output_dimensionality):
+        texts = [content] if isinstance(content, str) else list(content)
+        calls.append(texts)
+        vectors = [
+            [float(len(text)), 1.0] + [0.0] * (output_dimensionality - 2)
+            for text in texts
+        ]
+        return {"embedding": vectors[0] if isinstance(content, str) else vectors}
+
+    monkeypatch.setattr(embeddings.genai, "embed_content", fake_embed_content)
+    # Кэш по умолчанию привязан к последней открытой базе: вызовы API
+    # считаются без него (тесты кэша передают его явно)
+    monkeypatch.setattr(embeddings.settings, "embedding_cache_enabled", False)
+    return calls
+
+
+@pytest.fixture
+def generator():
+    """Генератор с маленькой размерностью и фиктивным ключом."""
+    return EmbeddingGenerator(api_key="test-key", dimension=8, query_cache=False)
+
+
+class TestBatchEmbeddings:
+    """Тесты пакетной векторизации."""
+
+    def test_splits_by_item_limit(self, fake_api, generator):
+        """Проверяет, что в одном запросе не больше max_batch_items текстов."""
+        texts = [f"text {i}" for i in range(250)]
+
+        matrix = generator.embed_documents(texts)
+
+        assert matrix.shape == (250, 8)
+        assert [len(call) for call in fake_api] == [100, 100, 50]
+
+    def test_splits_by_char_limit(self, fake_api):
+        """Проверяет, что запрос режется по суммарному размеру текстов."""
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, max_batch_chars=25, query_cache=False
+        )
+
+        generator.embed_documents(["a" * 10, "b" * 10, "c" * 10, "d" * 30])
+
+        assert [len(call) for call in fake_api] == [2, 1, 1]
+
+    def test_rows_are_normalized_and_ordered(self, fake_api, generator):
+        """Проверяет нормализацию строк и сохранение порядка."""
+        matrix = generator.embed_queries(["a", "bbbbbbbb"])
+
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-6)
+        # Первая компонента пропорциональна длине текста
+        assert matrix[1, 0] > matrix[0, 0]
+
+    def test_empty_input(self, fake_api, generator):
+        """Проверяет, что пустой список не обращается к API."""
+        matrix = generator.embed_documents([])
+
+        assert matrix.shape == (0, 8)
+        assert fake_api == []
+
+    def test_empty_text_raises_error(self, fake_api, generator):
+        """Проверяет валидацию пустых текстов в пакете."""
+        with pytest.raises(ValueError, match="Текст не может быть пустым"):
+            generator.embed_documents(["ok", "   "])
+
+
+class TestEmbeddingCache:
+    """Тесты персистентного кэша эмбеддингов."""
+
+    def test_repeated_texts_skip_api(self, test_db, fake_api):
+        """Проверяет, что закэшированные тексты не уходят в API повторно."""
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, cache=EmbeddingCache(), query_cache=False
+        )
+
+        first = generator.embed_documents(["alpha", "beta"])
+        second = generator.embed_documents(["beta", "gamma", "alpha"])
+
+        assert fake_api == [["alpha", "beta"], ["gamma"]]
+        np.testing.assert_allclose(second[0], first[1])
+        np.testing.assert_allclose(second[2], first[0])
+        assert generator.cache.stats.hits == 2
+        assert generator.cache.stats.misses == 3
+
+    def test_key_depends_on_task_type(self, test_db, fake_api):
+        """Проверяет, что документ и запрос с одинаковым текстом кэшируются раздельно."""
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, cache=EmbeddingCache(), query_cache=False
+        )
+
+        generator.embed_document("same text")
+        generator.embed_query("same text")
+        generator.embed_query("same text")
+
+        assert len(fake_api) == 2
+        assert len(generator.cache) == 2
+
+    def test_default_cache_from_settings(self, test_db, fake_api, monkeypatch):
+        """Проверяет, что генератор без cache берет кэш текущей базы."""
+        monkeypatch.setattr(embeddings.settings, "embedding_cache_enabled", True)
+
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, query_cache=False
+        )
+        generator.embed_documents(["alpha"])
+        EmbeddingGenerator(api_key="test-key", dimension=8).embed_documents(["alpha"])
+
+        assert fake_api == [["alpha"]]
+        assert generator.cache is embeddings_cache_module.get_default_embedding_cache()
+        assert EmbeddingGenerator(api_key="test-key", cache=False).cache is None
+
+    def test_lru_eviction(self, test_db, fake_api):
+        """Проверяет вытеснение самых давно использованных записей."""
+        cache = EmbeddingCache(max_entries=2, evict_slack=0.0, touch_interval=0)
+        vector = np.ones(8, dtype=np.float32)
+
+        cache.put(b"old", vector)
+        test_db.execute_sql("UPDATE embedding_cache SET last_access = 0")
+        cache.put(b"mid", vector)
+        cache.put(b"new", vector)
+
+        assert len(cache) == 2
+        assert cache.get(b"old") is None
+        assert cache.stats.evictions == 1
+
+
+class TestQueryEmbeddingCache:
+    """Тесты in-process кэша эмбеддингов запросов."""
+
+    def test_normalized_queries_share_entry(self, fake_api):
+        """Проверяет, что запросы, отличающиеся пробелами и регистром, не ходят в API."""
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, query_cache=QueryEmbeddingCache()
+        )
+
+        first = generator.embed_query("Python  циклы")
+        second = generator.embed_query(" python циклы ")
+
+        assert len(fake_api) == 1
+        assert second is first
+        assert not second.flags.writeable
+        assert generator.query_cache.stats.hits == 1
+
+    def test_put_does_not_freeze_caller_array(self):
+        """Проверяет, что кэш хранит свою копию, а не замораживает чужой массив."""
+        cache = QueryEmbeddingCache()
+        vector = np.ones(4, dtype=np.float32)
+
+        stored = cache.put("key", vector)
+        vector *= 2
+
+        assert vector.flags.writeable
+        assert not stored.flags.writeable
+        np.testing.assert_array_equal(cache.get("key"), np.ones(4, dtype=np.float32))
+
+    def test_batch_queries_use_cache(self, fake_api):
+        """Проверяет, что embed_queries отправляет в API только промахи."""
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, query_cache=QueryEmbeddingCache()
+        )
+
+        generator.embed_query("alpha")
+        matrix = generator.embed_queries(["alpha", "beta"])
+
+        assert fake_api == [["alpha"], ["beta"]]
+        assert matrix.shape == (2, 8)
+
+    def test_lru_eviction(self):
+        """Проверяет вытеснение самой давно использованной записи."""
+        cache = QueryEmbeddingCache(max_entries=2)
+        vector = np.ones(4, dtype=np.float32)
+
+        cache.put("a", vector)
+        cache.put("b", vector)
+        cache.get("a")
+        cache.put("c", vector)
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats.evictions == 1
+
+    def test_ttl_expiration(self, monkeypatch):
+        """Проверяет, что записи с истекшим TTL не возвращаются."""
+        cache = QueryEmbeddingCache(ttl=10)
+        cache.put("a", np.ones(4, dtype=np.float32))
+
+        now = embeddings_cache_module.time.monotonic()
+        monkeypatch.setattr(
+            embeddings_cache_module.time, "monotonic", lambda: now + 11
+        )
+
+        assert cache.get("a") is None
+        assert cache.stats.expirations == 1
+
+
+class TestAsyncEmbeddingGenerator:
+    """Тесты асинхронного генератора эмбеддингов."""
+
+    @pytest.fixture
+    def fake_async_api(self, monkeypatch):
+        """
+        Подменяет genai.embed_content_async заглушкой с задержкой.
+
+        Возвращает словарь со списком вызовов и максимумом одновременных запросов.
+        """
+        state = {"calls": [], "in_flight": 0, "max_in_flight": 0, "delay": 0.01}
+
+        async def fake_embed_content_async(
+            model, content, task_type, output_dimensionality
+        ):
+            state["calls"].append(list(content))
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            try:
+                await asyncio.sleep(state["delay"])
+            finally:
+                state["in_flight"] -= 1
+            return {
+                "embedding": [
+                    [float(len(text)), 1.0] + [0.0] * (output_dimensionality - 2)
+                    for text in content
+                ]
+            }
+
+        monkeypatch.setattr(
+            embeddings.genai, "embed_content_async", fake_embed_content_async
+        )
+        monkeypatch.setattr(embeddings.settings, "embedding_cache_enabled", False)
+        return state
+
+    def test_batches_run_with_bounded_concurrency(self, fake_async_api):
+        """Проверяет параллельную отправку пакетов с ограничением семафором."""
+        generator = AsyncEmbeddingGenerator(
+            api_key="test-key",
+            dimension=8,
+            max_batch_items=10,
+            max_concurrency=3,
+            query_cache=False,
+        )
+        texts = [f"text {i}" for i in range(95)]
+
+        matrix = asyncio.run(generator.aembed_documents(texts))
+
+        assert matrix.shape == (95, 8)
+        assert len(fake_async_api["calls"]) == 10
+        assert fake_async_api["max_in_flight"] == 3
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-6)
+
+    def test_matches_sync_generator(self, fake_async_api, fake_api):
+        """Проверяет, что асинхронные векторы совпадают с синхронными."""
+        generator = AsyncEmbeddingGenerator(
+            api_key="test-key", dimension=8, query_cache=False
+        )
+
+        async_vector = asyncio.run(generator.aembed_query("hello"))
+        sync_vector = generator.embed_query("hello")
+
+        np.testing.assert_allclose(async_vector, sync_vector)
+
+    def test_timeout_raises_runtime_error(self, fake_async_api):
+        """Проверяет, что зависший запрос прерывается по таймауту."""
+        fake_async_api["delay"] = 1.0
+        generator = AsyncEmbeddingGenerator(
+            api_key="test-key",
+            dimension=8,
+            timeout=0.01,
+            query_cache=False,
+            scheduler=EmbeddingScheduler(max_retries=0),
+        )
+
+        with pytest.raises(RuntimeError, match="таймаут"):
+            asyncio.run(generator.aembed_document("slow"))
+
+        assert fake_async_api["in_flight"] == 0
+
+
+    def test_identical_queries_are_coalesced(self, fake_async_api):
+        """Проверяет, что одновременные одинаковые запросы дают один вызов API."""
+        flight = AsyncSingleFlight()
+        generator = AsyncEmbeddingGenerator(
+            api_key="test-key",
+            dimension=8,
+            query_cache=False,
+            async_single_flight=flight,
+        )
+
+        async def burst():
+            return await asyncio.gather(
+                *(generator.aembed_query("trending") for _ in range(10))
+            )
+
+        vectors = asyncio.run(burst())
+
+        assert fake_async_api["calls"] == [["trending"]]
+        assert flight.stats.leaders == 1
+        assert flight.stats.shared == 9
+        assert len(flight) == 0
+        for vector in vectors[1:]:
+            np.testing.assert_array_equal(vector, vectors[0])
+            assert vector is not vectors[0]
+
+    def test_cancelled_waiter_does_not_cancel_request(self, fake_async_api):
+        """Проверяет, что отмена одного ожидающего не отменяет общий запрос."""
+        generator = AsyncEmbeddingGenerator(
+            api_key="test-key",
+            dimension=8,
+            query_cache=False,
+            async_single_flight=AsyncSingleFlight(),
+        )
+
+        async def scenario():
+            first = asyncio.create_task(generator.aembed_query("trending"))
+            second = asyncio.create_task(generator.aembed_query("trending"))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        vector = asyncio.run(scenario())
+
+        assert vector.shape == (8,)
+        assert len(fake_async_api["calls"]) == 1
+
+
+class TestSingleFlight:
+    """Тесты склейки одинаковых одновременных запросов для потоков."""
+
+    def test_concurrent_threads_share_one_request(self, monkeypatch):
+        """Проверяет, что N потоков с одним запросом делают один вызов API."""
+        calls = []
+        release = threading.Event()
+
+        def slow_embed_content(model, content, task_type, output_dimensionality):
+            calls.append(content)
+            release.wait(timeout=5)
+            return {"embedding": [1.0] * output_dimensionality}
+
+        monkeypatch.setattr(embeddings.genai, "embed_content", slow_embed_content)
+
+        flight = SingleFlight()
+        generator = EmbeddingGenerator(
+            api_key="test-key", dimension=8, query_cache=False, single_flight=flight
+        )
+        results = [None] * 8
+
+        def worker(i):
+            results[i] = generator.embed_query("trending")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+
+        # Отпускаем ведущий запрос, когда все остальные к нему присоединились
+        deadline = time.monotonic() + 5
+        while flight.stats.shared < 7 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ["trending"]
+        assert flight.stats.leaders == 1
+        assert flight.stats.shared == 7
+        assert len(flight) == 0
+        for vector in results:
+            np.testing.assert_allclose(vector, results[0])
+
+    def test_error_is_shared_and_key_released(self):
+        """Проверяет проброс исключения ожидающим и освобождение ключа."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            started.set()
+            release.wait(timeout=5)
+            raise RuntimeError("boom")
+
+        def call():
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(timeout=5)
+        follower = threading.Thread(target=call)
+        follower.start()
+
+        deadline = time.monotonic() + 5
+        while flight.stats.shared < 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        leader.join()
+        follower.join()
+
+        assert len(errors) == 2
+        assert len(flight) == 0
+        assert flight.do("key", lambda: 42) == 42
+
+    def test_different_keys_are_not_coalesced(self, fake_api):
+        """Проверяет, что разные task_type не склеиваются."""
+        generator = EmbeddingGenerator(
+            api_key="test-key",
+            dimension=8,
+            query_cache=False,
+            single_flight=SingleFlight(),
+        )
+
+        generator.embed_query("hello")
+        generator.embed_document("hello")
+
+        assert len(fake_api) == 2
+
+
+class ApiError(Exception):
+    """Имитация исключения google.api_core с HTTP-статусом в атрибуте code."""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class TestEmbeddingScheduler:
+    """Тесты планировщика запросов."""
+
+    def test_retries_transient_errors(self):
+        """Проверяет повтор после 429 и 503 и успешный результат."""
+        sleeps = []
+        scheduler = EmbeddingScheduler(max_retries=3, sleep=sleeps.append)
+        errors = [ApiError(429), ApiError(503)]
+
+        def flaky():
+            if errors:
+                raise errors.pop(0)
+            return "ok"
+
+        assert scheduler.call(flaky) == "ok"
+        assert scheduler.stats.requests == 3
+        assert scheduler.stats.retries == 2
+        assert len(sleeps) == 2
+        assert scheduler.stats.queue_depth == 0
+
+    def test_fatal_error_is_not_retried(self):
+        """Проверяет, что ошибка запроса (400) пробрасывается сразу."""
+        scheduler = EmbeddingScheduler(max_retries=3, sleep=lambda _: None)
+
+        def bad_request():
+            raise ApiError(400)
+
+        with pytest.raises(ApiError):
+            scheduler.call(bad_request)
+
+        assert scheduler.stats.requests == 1
+        assert scheduler.stats.failures == 1
+
+    def test_retries_are_bounded(self):
+        """Проверяет, что после max_retries пробрасывается исходная ошибка."""
+        scheduler = EmbeddingScheduler(max_retries=2, sleep=lambda _: None)
+
+        def always_busy():
+            raise ApiError(429)
+
+        with pytest.raises(ApiError):
+            scheduler.call(always_busy)
+
+        assert scheduler.stats.requests == 3
+
+    def test_token_bucket_throttles(self):
+        """Проверяет, что сверх квоты вызов ждет пополнения ведра."""
+        now = [0.0]
+        bucket = TokenBucket(rate_per_minute=60, clock=lambda: now[0])
+
+        assert bucket.reserve(60) == 0.0
+        assert bucket.reserve(1) == pytest.approx(1.0)
+
+        now[0] = 10.0
+        assert bucket.reserve(5) == 0.0
+
+    def test_tokens_per_minute_quota(self):
+        """Проверяет учет квоты токенов и статистику ожидания."""
+        sleeps = []
+        scheduler = EmbeddingScheduler(
+            tokens_per_minute=600, clock=lambda: 0.0, sleep=sleeps.append
+        )
+
+        scheduler.call(lambda: None, tokens=600)
+        scheduler.call(lambda: None, tokens=60)
+
+        assert sleeps == [pytest.approx(6.0)]
+        assert scheduler.stats.throttle_wait == pytest.approx(6.0)
+
+    def test_error_classification(self):
+        """Проверяет классификацию временных и фатальных ошибок."""
+        assert is_retryable_error(ApiError(429))
+        assert is_retryable_error(TimeoutError())
+        assert not is_retryable_error(ApiError(403))
+        assert not is_retryable_error(ValueError("bad"))
+
+
+class TestHashingEmbedder:
+    """Тесты локального эмбеддера без сети."""
+
+    def test_implements_protocol(self):
+        """Проверяет соответствие протоколу Embedder."""
+        assert isinstance(HashingEmbedder(dimension=64), Embedder)
+
+    def test_deterministic_and_normalized(self):
+        """Проверяет детерминированность и нормализацию векторов."""
+        first = HashingEmbedder(dimension=128).embed_document("Python циклы")
+        second = HashingEmbedder(dimension=128).embed_document("Python циклы")
+
+        np.testing.assert_array_equal(first, second)
+        assert first.dtype == np.float32
+        assert np.linalg.norm(first) == pytest.approx(1.0, rel=1e-6)
+
+    def test_batch_matches_single(self):
+        """Проверяет, что пакет дает те же векторы, что и поштучная векторизация."""
+        embedder = HashingEmbedder(dimension=64)
+        texts = ["a", "короткий текст", "another longer english text " * 5]
+
+        matrix = embedder.embed_documents(texts)
+
+        for row, text in zip(matrix, texts):
+            np.testing.assert_allclose(row, embedder.embed_document(text), rtol=1e-6)
+
+    def test_similar_texts_are_closer(self):
+        """Проверяет, что похожие тексты ближе непохожих."""
+        embedder = HashingEmbedder(dimension=256)
+        query, similar, other = embedder.embed_documents(
+            ["цикл for в Python", "Python: цикл for и while", "рецепт борща со свеклой"]
+        )
+
+        assert query @ similar > query @ other
+
+    def test_empty_text_raises_error(self):
+        """Проверяет валидацию пустого текста."""
+        with pytest.raises(ValueError, match="Текст не может быть пустым"):
+            HashingEmbedder(dimension=64).embed_query("")
+
+    def test_text_shorter_than_ngrams(self):
+        """Проверяет, что текст короче всех n-грамм получает ненулевой вектор."""
+        embedder = HashingEmbedder(dimension=64, ngram_sizes=(8,))
+
+        matrix = embedder.embed_documents(["a", "b", "достаточно длинный текст"])
+
+        assert np.linalg.norm(matrix, axis=1) == pytest.approx([1.0, 1.0, 1.0])
+        assert matrix[0] @ matrix[1] < 1.0
+        np.testing.assert_array_equal(matrix[0], embedder.embed_document("a"))
+
+
+class TestLazyImports:
+    """Тесты ленивого импорта пакета."""
+
+    def test_package_import_skips_provider_sdk(self):
+        """Проверяет, что импорт пакета и локальный поиск не тянут SDK Gemini."""
+        code = (
+            "import sys\n"
+            "import semantic_core\n"
+            "assert 'semantic_core.embeddings' not in sys.modules\n"
+            "from semantic_core import fulltext_search_parents, HashingEmbedder\n"
+            "HashingEmbedder(dimension=8).embed_query('текст')\n"
+            "assert 'google.generativeai' not in sys.modules\n"
+        )
+        env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+
+        result = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True
+        )
+
+        assert result.returncode == 0, result.stderr
+
+    def test_unknown_export_raises_attribute_error(self):
+        """Проверяет AttributeError для несуществующего экспорта."""
+        import semantic_core
+
+        with pytest.raises(AttributeError):
+            semantic_core.does_not_exist
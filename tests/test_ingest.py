@@ -0,0 +1,385 @@
+"""
+Тесты загрузки и обновления заметок.
+
+Проверяет:
+- Потоковую загрузку из генератора пачками
+- Согласованность чанков и векторов после загрузки
+- Статистику и колбэк прогресса
+- Откат только текущей пачки при ошибке
+- Инкрементальное обновление: векторизуются только изменившиеся чанки
+- Пакетное удаление и очистку векторов триггером
+- Контекст чанков из пути заголовков (context="breadcrumb")
+"""
+
+import pytest
+
+from semantic_core import (
+    calibrate_vector_index,
+    create_vector_table,
+    delete_notes_with_chunks,
+    ingest_notes,
+    save_note_with_chunks,
+    fulltext_search_parents,
+    EmbeddingWorker,
+    MarkdownTextSplitter,
+    SimpleTextSplitter,
+    vector_search_chunks,
+    HashingEmbedder,
+)
+from semantic_core.database import add_missing_columns, db
+from semantic_core.vector_index import get_vector_index_config
+from domain.models import Note, NoteChunk
+
+
+TOPICS = [
+    "Цикл for перебирает элементы последовательности.",
+    "Конструкция try-except перехватывает исключения.",
+    "Виртуальные окружения venv изолируют зависимости.",
+]
+
+
+@pytest.fixture
+def embedder():
+    """Локальный эмбеддер: тесты не ходят в сеть."""
+    return HashingEmbedder()
+
+
+def generate_notes(count: int, category=None):
+    """Генерирует данные заметок лениво, как при чтении большого корпуса."""
+    for i in range(count):
+        data = {"title": f"Заметка {i}", "content": TOPICS[i % len(TOPICS)] * 20}
+        if category is not None:
+            data["category"] = category
+        yield data
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder, считающий тексты, отправленные на векторизацию."""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def count_rows(table: str) -> int:
+    """Возвращает количество строк в таблице."""
+    return db.obj.execute_sql(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def count_orphans(table: str) -> int:
+    """Возвращает количество векторов без чанка."""
+    return db.obj.execute_sql(
+        f"SELECT COUNT(*) FROM {table} WHERE id NOT IN (SELECT id FROM note_chunks)"
+    ).fetchone()[0]
+
+
+class TestIngestNotes:
+    """Тесты ingest_notes."""
+
+    def test_ingest_from_generator(self, test_db, text_splitter, embedder):
+        """Проверяет загрузку заметок, чанков и векторов пачками."""
+        stats = ingest_notes(
+            Note, NoteChunk, generate_notes(7), text_splitter, embedder, batch_size=3
+        )
+
+        assert stats.notes == 7
+        assert stats.batches == 3
+        assert Note.select().count() == 7
+        assert stats.chunks == NoteChunk.select().count() > 7
+        assert count_rows("note_chunks_vec") == stats.chunks
+
+        # Векторы привязаны к своим чанкам
+        orphans = db.obj.execute_sql(
+            "SELECT COUNT(*) FROM note_chunks_vec "
+            "WHERE id NOT IN (SELECT id FROM note_chunks)"
+        ).fetchone()[0]
+        assert orphans == 0
+
+    def test_chunks_belong_to_their_notes(self, test_db, text_splitter, embedder):
+        """Проверяет ID и индексы чанков после многострочных INSERT."""
+        ingest_notes(Note, NoteChunk, generate_notes(4), text_splitter, embedder)
+
+        for note in Note.select():
+            indices = [chunk.chunk_index for chunk in note.chunks]
+            assert indices == list(range(len(indices)))
+            assert all(chunk.content in note.content for chunk in note.chunks)
+
+        results = vector_search_chunks(
+            Note, NoteChunk, "перехватить исключения", limit=1, generator=embedder
+        )
+        assert "try-except" in results[0][0].content
+
+    def test_context_and_progress(
+        self, test_db, sample_category, text_splitter, embedder
+    ):
+        """Проверяет сохранение связей и вызов колбэка после каждой пачки."""
+        progress = []
+
+        stats = ingest_notes(
+            Note,
+            NoteChunk,
+            generate_notes(5, category=sample_category),
+            text_splitter,
+            embedder,
+            batch_size=2,
+            on_batch=lambda s: progress.append(s.notes),
+        )
+
+        assert progress == [2, 4, 5]
+        assert stats.notes_per_second > 0
+        assert all(note.category_id == sample_category.id for note in Note.select())
+
+    def test_failed_batch_rolls_back_only_itself(
+        self, test_db, text_splitter, embedder
+    ):
+        """Проверяет, что закоммиченные пачки переживают ошибку в следующей."""
+
+        def notes_with_error():
+            yield from generate_notes(2)
+            # content NOT NULL: INSERT второй пачки падает
+            yield {"title": "Битая заметка", "content": None}
+
+        with pytest.raises(Exception):
+            ingest_notes(
+                Note,
+                NoteChunk,
+                notes_with_error(),
+                text_splitter,
+                embedder,
+                batch_size=2,
+            )
+
+        assert Note.select().count() == 2
+        assert count_rows("note_chunks_vec") == NoteChunk.select().count()
+
+    def test_invalid_batch_size(self, test_db, text_splitter, embedder):
+        """Проверяет ошибку для batch_size <= 0."""
+        with pytest.raises(ValueError, match="batch_size"):
+            ingest_notes(Note, NoteChunk, [], text_splitter, embedder, batch_size=0)
+
+
+class TestIncrementalUpdate:
+    """Тесты переиспользования чанков при update_existing=True."""
+
+    @pytest.fixture
+    def splitter(self):
+        return SimpleTextSplitter(chunk_size=200, overlap=40)
+
+    @pytest.fixture
+    def document(self):
+        return "\n\n".join(
+            f"Раздел {i}. {TOPICS[i % len(TOPICS)]} Подробности раздела {i}."
+            for i in range(30)
+        )
+
+    def save(self, splitter, embedder, update_existing=False, **note_data):
+        return save_note_with_chunks(
+            Note,
+            NoteChunk,
+            note_data,
+            splitter,
+            embedder,
+            update_existing=update_existing,
+        )
+
+    def assert_consistent(self, note):
+        """Индексы чанков подряд, у каждого чанка ровно один вектор."""
+        chunks = note.chunks.order_by(NoteChunk.chunk_index)
+        indices = [chunk.chunk_index for chunk in chunks]
+        assert indices == list(range(len(indices)))
+        assert count_rows("note_chunks_vec") == NoteChunk.select().count()
+        orphans = db.obj.execute_sql(
+            "SELECT COUNT(*) FROM note_chunks_vec "
+            "WHERE id NOT IN (SELECT id FROM note_chunks)"
+        ).fetchone()[0]
+        assert orphans == 0
+
+    def test_small_edit_reembeds_few_chunks(self, test_db, splitter, document):
+        """Проверяет, что правка одного раздела не векторизует весь документ."""
+        embedder = CountingEmbedder()
+        note = self.save(splitter, embedder, title="Документ", content=document)
+        total = note.chunk_stats.embedded
+        assert note.chunk_stats.reused == 0
+
+        edited = document.replace("Подробности раздела 15.", "Детали раздела 15.")
+        embedder.embedded = 0
+        note = self.save(
+            splitter, embedder, update_existing=True, id=note.id, content=edited
+        )
+
+        stats = note.chunk_stats
+        assert stats.reused + stats.embedded == note.chunks.count()
+        assert embedder.embedded == stats.embedded
+        assert stats.embedded * 5 <= total
+        assert stats.reused > 0
+        self.assert_consistent(note)
+
+    def test_inserted_section_shifts_indices(self, test_db, splitter, document):
+        """Проверяет переиспользование чанков, сдвинутых вставкой в начало."""
+        embedder = CountingEmbedder()
+        note = self.save(splitter, embedder, title="Документ", content=document)
+
+        edited = "Новое вступление к документу.\n\n" + document
+        note = self.save(
+            splitter, embedder, update_existing=True, id=note.id, content=edited
+        )
+
+        assert note.chunk_stats.reused > note.chunk_stats.embedded
+        self.assert_consistent(note)
+        chunks = list(note.chunks.order_by(NoteChunk.chunk_index))
+        assert [c.content for c in chunks] == [
+            c.text for c in splitter.split_text(edited)
+        ]
+        # Смещения переиспользованных чанков сдвинуты вместе с текстом
+        assert all(
+            edited[c.start_offset : c.end_offset] == c.content for c in chunks
+        )
+        # FTS-индекс обновлен вместе с заметкой
+        assert fulltext_search_parents(Note, "вступление")[0][0].id == note.id
+
+    def test_title_change_reembeds_everything(self, test_db, splitter, document):
+        """Проверяет, что смена контекста (заголовка) инвалидирует все векторы."""
+        embedder = CountingEmbedder()
+        note = self.save(splitter, embedder, title="Документ", content=document)
+
+        note = self.save(
+            splitter, embedder, update_existing=True, id=note.id, title="Другой"
+        )
+
+        assert note.chunk_stats.reused == 0
+        assert note.chunk_stats.deleted == note.chunk_stats.embedded
+        self.assert_consistent(note)
+
+    def test_add_missing_columns(self, test_db):
+        """Проверяет догонку колонки content_hash в старой таблице."""
+        test_db.execute_sql("ALTER TABLE note_chunks DROP COLUMN content_hash")
+
+        assert add_missing_columns(NoteChunk) == ["content_hash"]
+        assert add_missing_columns(NoteChunk) == []
+
+
+class TestBulkDelete:
+    """Тесты delete_notes_with_chunks и триггера очистки векторов."""
+
+    def test_delete_by_ids_in_batches(self, test_db, text_splitter, embedder):
+        """Проверяет удаление списка ID маленькими пачками."""
+        ingest_notes(Note, NoteChunk, generate_notes(7), text_splitter, embedder)
+        ids = [note.id for note in Note.select().limit(5)]
+
+        deleted = delete_notes_with_chunks(
+            Note, NoteChunk, ids + [10_000], batch_size=2
+        )
+
+        assert deleted == 5
+        assert Note.select().count() == 2
+        assert count_rows("note_chunks_vec") == NoteChunk.select().count() > 0
+        assert count_orphans("note_chunks_vec") == 0
+        assert count_rows("notes_fts") == 2
+
+    def test_delete_by_query(self, test_db, sample_category, text_splitter, embedder):
+        """Проверяет удаление заметок, выбранных запросом."""
+        ingest_notes(Note, NoteChunk, generate_notes(3), text_splitter, embedder)
+        ingest_notes(
+            Note,
+            NoteChunk,
+            generate_notes(4, category=sample_category),
+            text_splitter,
+            embedder,
+        )
+
+        deleted = delete_notes_with_chunks(
+            Note, NoteChunk, Note.select().where(Note.category == sample_category)
+        )
+
+        assert deleted == 4
+        assert Note.select().count() == 3
+        assert count_orphans("note_chunks_vec") == 0
+
+    @pytest.mark.parametrize(
+        "options", [{}, {"storage": "int8", "binary": True, "prefix_dimensions": (128,)}]
+    )
+    def test_trigger_cleans_raw_deletes(
+        self, test_db, text_splitter, embedder, options
+    ):
+        """Проверяет, что DELETE в обход сервиса не оставляет векторов-сирот."""
+        test_db.execute_sql("DROP TABLE note_chunks_vec")
+        test_db.execute_sql("DELETE FROM vector_index_config")
+        create_vector_table(NoteChunk, **options)
+        ingest_notes(Note, NoteChunk, generate_notes(4), text_splitter, embedder)
+        if options:
+            # int8 заполняется после калибровки (до нее векторы только в _f32)
+            calibrate_vector_index("note_chunks_vec")
+
+        test_db.execute_sql("DELETE FROM note_chunks WHERE chunk_index = 0")
+        Note.get().delete_instance()  # каскадное удаление чанков
+
+        config = get_vector_index_config("note_chunks_vec")
+        tables = [config.table_name]
+        if options:
+            tables += [config.float_table, config.bit_table, config.prefix_table(128)]
+        for table in tables:
+            assert count_rows(table) == NoteChunk.select().count()
+            assert count_orphans(table) == 0
+
+
+GUIDE = (
+    "# Исключения\n\n"
+    + "Конструкция try-except перехватывает ошибки. " * 8
+    + "\n\n## Блок finally\n\n"
+    + "Блок finally выполняется всегда, даже после return. " * 6
+    + "\n"
+)
+
+
+class TestBreadcrumbContext:
+    """Тесты context="breadcrumb": контекст чанка — путь заголовков."""
+
+    @pytest.fixture
+    def splitter(self):
+        return MarkdownTextSplitter(chunk_size=400, overlap=50)
+
+    def save(self, splitter, embedder, context="breadcrumb", **kwargs):
+        return save_note_with_chunks(
+            Note,
+            NoteChunk,
+            {"title": "Python", "content": GUIDE},
+            splitter,
+            embedder,
+            context=context,
+            **kwargs,
+        )
+
+    def test_breadcrumb_is_stored(self, test_db, splitter, embedder):
+        """Проверяет, что путь заголовков записан в колонку breadcrumb."""
+        note = self.save(splitter, embedder)
+
+        chunks = note.chunks.order_by(NoteChunk.chunk_index)
+        assert [chunk.breadcrumb for chunk in chunks] == [
+            "Python > Исключения",
+            "Python > Исключения > Блок finally",
+        ]
+
+    def test_worker_embeds_same_text(self, test_db, splitter, embedder):
+        """Проверяет, что воркер векторизует тот же текст, что и синхронный режим."""
+        sync_note = self.save(splitter, embedder)
+        expected = vector_search_chunks(
+            Note, NoteChunk, "выполняется всегда", generator=embedder
+        )[0][1]
+        delete_notes_with_chunks(Note, NoteChunk, [sync_note.id])
+
+        self.save(splitter, None, mode="deferred")
+        EmbeddingWorker(Note, NoteChunk, embedder).run_once()
+
+        results = vector_search_chunks(
+            Note, NoteChunk, "выполняется всегда", generator=embedder
+        )
+        assert results[0][1] == pytest.approx(expected)
+
+    def test_unknown_context(self, test_db, splitter, embedder):
+        """Проверяет ошибку для неизвестного режима контекста."""
+        with pytest.raises(ValueError, match="context"):
+            self.save(splitter, embedder, context="title")
@@ -0,0 +1,160 @@
+"""
+Тесты обслуживания векторного индекса.
+
+Проверяет:
+- Поиск векторов без чанков и чанков без векторов
+- Исправление пачками: удаление сирот, повторная векторизация, возврат в очередь
+- Возврат свободных страниц через incremental_vacuum
+- Checkpoint WAL
+"""
+
+import pytest
+
+from semantic_core import (
+    ChunkStatus,
+    HashingEmbedder,
+    check_vector_consistency,
+    ingest_notes,
+    reclaim_space,
+    repair_vector_consistency,
+    vector_search_chunks,
+)
+from semantic_core.database import db
+from semantic_core.maintenance import checkpoint_wal
+from domain.models import Note, NoteChunk
+
+
+TOPICS = [
+    "Цикл for перебирает элементы последовательности.",
+    "Конструкция try-except перехватывает исключения.",
+    "Виртуальные окружения venv изолируют зависимости.",
+]
+
+
+def generate_notes(count: int):
+    """Генерирует данные заметок лениво."""
+    for i in range(count):
+        yield {"title": f"Заметка {i}", "content": TOPICS[i % len(TOPICS)] * 20}
+
+
+@pytest.fixture
+def loaded(test_db, text_splitter):
+    """База с заметками, чанками и векторами."""
+    embedder = HashingEmbedder()
+    ingest_notes(Note, NoteChunk, generate_notes(10), text_splitter, embedder)
+    return embedder
+
+
+def make_orphans(count: int) -> int:
+    """Удаляет чанки в обход триггера очистки и возвращает число сирот."""
+    db.obj.execute_sql("DROP TRIGGER note_chunks_vec_cleanup")
+    ids = [chunk.id for chunk in NoteChunk.select().limit(count)]
+    NoteChunk.delete().where(NoteChunk.id.in_(ids)).execute()
+    return len(ids)
+
+
+def drop_vectors(count: int) -> list[int]:
+    """Удаляет векторы у части чанков и возвращает их ID."""
+    chunks = NoteChunk.select().order_by(NoteChunk.id.desc()).limit(count)
+    ids = [chunk.id for chunk in chunks]
+    placeholders = ", ".join("?" * len(ids))
+    db.obj.execute_sql(f"DELETE FROM note_chunks_vec WHERE id IN ({placeholders})", ids)
+    return ids
+
+
+class TestVectorConsistency:
+    """Тесты check_vector_consistency и repair_vector_consistency."""
+
+    def test_consistent_after_ingest(self, loaded):
+        """Проверяет, что после обычной загрузки расхождений нет."""
+        report = check_vector_consistency(NoteChunk)
+
+        assert report.consistent
+        assert report.orphan_vectors == {"note_chunks_vec": 0}
+
+    def test_detects_and_removes_orphans(self, loaded):
+        """Проверяет удаление векторов без чанков пачками."""
+        orphans = make_orphans(7)
+
+        assert check_vector_consistency(NoteChunk).total_orphans == orphans
+        report = repair_vector_consistency(NoteChunk, batch_size=3)
+
+        assert report.total_orphans == orphans
+        assert check_vector_consistency(NoteChunk).consistent
+        vectors = db.obj.execute_sql("SELECT COUNT(*) FROM note_chunks_vec").fetchone()
+        assert vectors[0] == NoteChunk.select().count()
+
+    def test_reembeds_missing_vectors(self, loaded):
+        """Проверяет повторную векторизацию чанков без векторов."""
+        query = "перехват исключений"
+        expected = vector_search_chunks(Note, NoteChunk, query, generator=loaded)
+        missing = drop_vectors(5)
+
+        assert check_vector_consistency(NoteChunk).missing_vectors == len(missing)
+        report = repair_vector_consistency(NoteChunk, loaded, batch_size=2)
+
+        assert report.reembedded == report.missing_vectors == len(missing)
+        assert check_vector_consistency(NoteChunk).consistent
+        results = vector_search_chunks(Note, NoteChunk, query, generator=loaded)
+        assert [note.id for note, _ in results] == [note.id for note, _ in expected]
+
+    def test_chunks_without_note_do_not_loop(self, loaded):
+        """Проверяет, что чанки без строки заметки не зацикливают исправление."""
+        missing = drop_vectors(5)
+        orphaned = NoteChunk.get_by_id(missing[0]).note_id
+        unresolved = NoteChunk.select().where(NoteChunk.note == orphaned).count()
+
+        # База, записанная без foreign_keys: чанки пережили свою заметку
+        db.obj.execute_sql("PRAGMA foreign_keys = OFF")
+        try:
+            db.obj.execute_sql("DELETE FROM notes WHERE id = ?", (orphaned,))
+        finally:
+            db.obj.execute_sql("PRAGMA foreign_keys = ON")
+
+        report = repair_vector_consistency(NoteChunk, loaded, batch_size=1)
+
+        assert report.missing_vectors == len(missing)
+        assert 0 < report.unresolved <= unresolved
+        assert report.reembedded == len(missing) - report.unresolved
+
+    def test_requeues_missing_vectors_without_generator(self, loaded):
+        """Проверяет возврат чанков без векторов в очередь воркера."""
+        missing = drop_vectors(4)
+
+        report = repair_vector_consistency(NoteChunk)
+
+        assert report.requeued == len(missing)
+        pending = NoteChunk.select().where(NoteChunk.status == ChunkStatus.PENDING)
+        assert sorted(chunk.id for chunk in pending) == sorted(missing)
+        # Ожидающие воркера чанки не считаются расхождением
+        assert check_vector_consistency(NoteChunk).consistent
+
+    def test_invalid_batch_size(self, test_db):
+        """Проверяет валидацию batch_size."""
+        with pytest.raises(ValueError, match="batch_size"):
+            repair_vector_consistency(NoteChunk, batch_size=0)
+
+
+class TestSpaceReclaim:
+    """Тесты reclaim_space и checkpoint_wal."""
+
+    def test_incremental_vacuum_frees_pages(self, loaded):
+        """Проверяет, что после удаления свободные страницы возвращаются ОС."""
+        Note.update(content="x" * 20000).execute()
+        Note.update(content="x").execute()
+        checkpoint_wal()
+
+        report = reclaim_space()
+
+        assert report.mode == "incremental"
+        assert report.freelist_before > 0
+        assert report.freelist_after == 0
+        assert report.reclaimed_bytes == report.freelist_before * report.page_size
+
+    def test_checkpoint_wal(self, loaded):
+        """Проверяет checkpoint и валидацию режима."""
+        busy, _, _ = checkpoint_wal("truncate")
+
+        assert busy == 0
+        with pytest.raises(ValueError, match="checkpoint"):
+            checkpoint_wal("NOW")
@@ -0,0 +1,145 @@
+"""
+Тесты параллельного конвейера загрузки.
+
+Проверяет:
+- Загрузку с пулом процессов и без него
+- Порядок записи пачек и согласованность чанков с векторами
+- Метрики стадий
+- Остановку конвейера и проброс ошибки
+"""
+
+import pytest
+
+from semantic_core import (
+    IngestPipeline,
+    HashingEmbedder,
+    ingest_notes,
+)
+from semantic_core.database import db
+from domain.models import Note, NoteChunk
+
+
+TOPICS = [
+    "Цикл for перебирает элементы последовательности.",
+    "Конструкция try-except перехватывает исключения.",
+    "Виртуальные окружения venv изолируют зависимости.",
+]
+
+
+def generate_notes(count: int):
+    """Генерирует данные заметок лениво."""
+    for i in range(count):
+        yield {"title": f"Заметка {i}", "content": TOPICS[i % len(TOPICS)] * 20}
+
+
+class FailingEmbedder(HashingEmbedder):
+    """Эмбеддер, падающий на заданной по счету пачке."""
+
+    def __init__(self, fail_on: int):
+        super().__init__()
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("API недоступен")
+        return super().embed_documents(texts)
+
+
+def chunk_snapshot():
+    """Содержимое таблиц заметок и чанков без ID строк чанков."""
+    return [
+        (chunk.note.title, chunk.chunk_index, chunk.content, chunk.content_hash)
+        for chunk in (
+            NoteChunk.select().join(Note).order_by(Note.id, NoteChunk.chunk_index)
+        )
+    ]
+
+
+class TestIngestPipeline:
+    """Тесты IngestPipeline."""
+
+    @pytest.mark.parametrize("split_workers", [0, 2])
+    def test_matches_sequential_ingest(self, test_db, text_splitter, split_workers):
+        """Проверяет, что конвейер пишет то же, что ingest_notes, в том же порядке."""
+        embedder = HashingEmbedder()
+        ingest_notes(Note, NoteChunk, generate_notes(9), text_splitter, embedder)
+        expected = chunk_snapshot()
+        NoteChunk.delete().execute()
+        Note.delete().execute()
+        test_db.execute_sql("DELETE FROM note_chunks_vec")
+
+        pipeline = IngestPipeline(
+            Note,
+            NoteChunk,
+            text_splitter,
+            embedder,
+            batch_size=2,
+            split_workers=split_workers,
+            embed_workers=3,
+            queue_size=1,
+        )
+        stats = pipeline.run(generate_notes(9))
+
+        assert chunk_snapshot() == expected
+        assert [note.title for note in Note.select().order_by(Note.id)] == [
+            f"Заметка {i}" for i in range(9)
+        ]
+        assert stats.notes == 9
+        assert stats.batches == 5
+        vectors = db.obj.execute_sql("SELECT COUNT(*) FROM note_chunks_vec").fetchone()
+        assert vectors[0] == stats.chunks == NoteChunk.select().count()
+
+    def test_stage_metrics(self, test_db, text_splitter):
+        """Проверяет метрики стадий и колбэк прогресса."""
+        progress = []
+        pipeline = IngestPipeline(
+            Note,
+            NoteChunk,
+            text_splitter,
+            HashingEmbedder(),
+            batch_size=3,
+            split_workers=0,
+            embed_workers=2,
+        )
+
+        stats = pipeline.run(
+            generate_notes(7), on_batch=lambda s: progress.append(s.notes)
+        )
+
+        assert progress == [3, 6, 7]
+        assert set(stats.stages) == {"split", "embed", "write"}
+        for stage in stats.stages.values():
+            assert stage.batches == 3
+            assert stage.chunks == stats.chunks
+            assert stage.chunks_per_second > 0
+        assert stats.bottleneck in stats.stages
+
+    def test_error_stops_pipeline(self, test_db, text_splitter):
+        """Проверяет, что ошибка стадии пробрасывается, а конвейер не зависает."""
+        pipeline = IngestPipeline(
+            Note,
+            NoteChunk,
+            text_splitter,
+            FailingEmbedder(fail_on=3),
+            batch_size=2,
+            split_workers=0,
+            embed_workers=1,
+            queue_size=1,
+        )
+
+        with pytest.raises(RuntimeError, match="API недоступен"):
+            pipeline.run(generate_notes(100))
+
+        # Записаны только целые пачки до ошибки (уже стоящие в очереди
+        # могут быть отброшены), чанки согласованы с векторами
+        written = Note.select().count()
+        assert written <= 4 and written % 2 == 0
+        vectors = db.obj.execute_sql("SELECT COUNT(*) FROM note_chunks_vec").fetchone()
+        assert vectors[0] == NoteChunk.select().count()
+
+    def test_invalid_workers(self):
+        """Проверяет валидацию параметров."""
+        with pytest.raises(ValueError, match="embed_workers"):
+            IngestPipeline(Note, NoteChunk, None, None, embed_workers=0)
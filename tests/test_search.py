@@ -5,6 +5,9 @@
 - Дедупликация результатов (уникальные документы)
 - Агрегация по MIN(distance)
 - Векторный, полнотекстовый и гибридный поиск
+- Кэш планов поиска (готовый SQL на набор фильтров)
+- Пакетный поиск search_many
+- Компактные результаты SearchHit (fields=...), смещения чанка и snippet
 """
 
 import pytest
@@ -13,10 +16,15 @@ from semantic_core import (
     vector_search_chunks,
     fulltext_search_parents,
     hybrid_search_rrf,
+    search_many,
+    SearchHit,
     save_note_with_chunks,
+    HashingEmbedder,
     EmbeddingGenerator,
     SimpleTextSplitter,
 )
+from semantic_core.search_plan import clear_search_plans, get_search_plan
+from semantic_core.vector_index import get_vector_index_config
 from domain.models import Note, NoteChunk, Category
 
 
@@ -389,6 +397,324 @@ class TestHybridSearchRRF:
         assert all(note.category_id == cat1.id for note, _ in results)
 
 
+class TestSearchPlan:
+    """Тесты кэша планов поиска."""
+
+    def test_plan_is_reused(self, test_db):
+        """Проверяет, что план строится один раз на набор фильтров."""
+        clear_search_plans()
+        config = get_vector_index_config("note_chunks_vec")
+
+        plan = get_search_plan(
+            "hybrid", Note, NoteChunk, ["title", "category_id"], config, "knn"
+        )
+
+        assert plan is get_search_plan(
+            "hybrid", Note, NoteChunk, ["category_id", "title"], config, "knn"
+        )
+        assert plan is not get_search_plan(
+            "hybrid", Note, NoteChunk, ["category_id"], config, "knn"
+        )
+        assert plan is not get_search_plan(
+            "hybrid", Note, NoteChunk, ["category_id", "title"], config, "scan"
+        )
+
+    def test_bind_follows_placeholders(self, test_db):
+        """Проверяет порядок параметров гибридного плана."""
+        plan = get_search_plan(
+            "hybrid",
+            Note,
+            NoteChunk,
+            ["title", "category_id"],
+            get_vector_index_config("note_chunks_vec"),
+            "knn",
+        )
+
+        params = plan.bind(
+            {"title": "T", "category_id": 1},
+            candidates=["blob", "blob", 100],
+            query="python",
+            k=60,
+            limit=10,
+        )
+
+        assert plan.sql.count("?") == len(params)
+        assert params == ["blob", "blob", 100, 1, "T", "python", 1, "T", 60, 60, 10]
+
+    def test_field_name_and_column_filters(
+        self, test_db, embedding_generator, text_splitter
+    ):
+        """Проверяет фильтр по имени поля (category) и колонки (category_id)."""
+        python, java = Category.create(name="Python"), Category.create(name="Java")
+        for category in (python, java):
+            save_note_with_chunks(
+                Note,
+                NoteChunk,
+                {
+                    "title": f"{category.name} Guide",
+                    "content": f"{category.name} programming. " * 20,
+                    "category": category,
+                },
+                text_splitter,
+                embedding_generator,
+            )
+
+        by_field = fulltext_search_parents(Note, "programming", category=python.id)
+        by_column = fulltext_search_parents(Note, "programming", category_id=python.id)
+
+        assert [note.id for note, _ in by_field] == [note.id for note, _ in by_column]
+        assert [note.category_id for note, _ in by_field] == [python.id]
+
+    def test_unknown_filter(self, test_db):
+        """Проверяет ошибку для фильтра, которого нет у модели."""
+        with pytest.raises(ValueError, match="нет поля для фильтра"):
+            fulltext_search_parents(Note, "python", **{"id = 1 OR 1": 1})
+
+
+class BatchCountingEmbedder(HashingEmbedder):
+    """HashingEmbedder, считающий вызовы embed_queries и embed_query."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.single = 0
+
+    def embed_queries(self, texts):
+        self.batches.append(len(texts))
+        return super().embed_queries(texts)
+
+    def embed_query(self, text):
+        self.single += 1
+        return super().embed_query(text)
+
+
+MANY_QUERIES = ["Python циклы", "исключения try", "SQLite база", "виртуальные окружения"]
+
+
+class TestSearchMany:
+    """Тесты пакетного поиска search_many."""
+
+    @pytest.fixture
+    def notes(self, test_db, text_splitter):
+        python, sql = Category.create(name="Python"), Category.create(name="SQL")
+        topics = [
+            ("Циклы", "Python циклы for и while перебирают элементы. ", python),
+            ("Исключения", "Конструкция try except ловит исключения. ", python),
+            ("SQLite", "SQLite база данных хранит таблицы в файле. ", sql),
+            ("venv", "Виртуальные окружения изолируют пакеты. ", python),
+        ]
+        for title, content, category in topics:
+            save_note_with_chunks(
+                Note,
+                NoteChunk,
+                {"title": title, "content": content * 20, "category": category},
+                text_splitter,
+                HashingEmbedder(),
+            )
+        return python
+
+    @pytest.mark.parametrize(
+        "mode, search",
+        [
+            ("vector", lambda q, **kw: vector_search_chunks(Note, NoteChunk, q, **kw)),
+            ("fts", lambda q, generator, **kw: fulltext_search_parents(Note, q, **kw)),
+            ("hybrid", lambda q, **kw: hybrid_search_rrf(Note, NoteChunk, q, **kw)),
+        ],
+    )
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_matches_single_queries(self, notes, mode, search, workers):
+        """Проверяет, что результаты совпадают с поиском по одному запросу."""
+        embedder = HashingEmbedder()
+        queries = MANY_QUERIES * 3
+        expected = [
+            [(note.id, score) for note, score in search(q, generator=embedder, limit=3)]
+            for q in queries
+        ]
+
+        results = search_many(
+            Note,
+            NoteChunk,
+            iter(queries),
+            mode=mode,
+            limit=3,
+            generator=embedder,
+            batch_size=5,
+            workers=workers,
+        )
+
+        actual = [[(note.id, score) for note, score in hits] for hits in results]
+        assert [[note_id for note_id, _ in hits] for hits in actual] == [
+            [note_id for note_id, _ in hits] for hits in expected
+        ]
+        for got, want in zip(actual, expected):
+            assert [score for _, score in got] == pytest.approx(
+                [score for _, score in want]
+            )
+
+    def test_embeds_in_batches_and_streams(self, notes):
+        """Проверяет пакетную векторизацию и ленивое чтение запросов."""
+        embedder = BatchCountingEmbedder()
+        results = search_many(
+            Note, NoteChunk, MANY_QUERIES * 3, generator=embedder, batch_size=5
+        )
+
+        assert embedder.batches == []
+        first = next(results)
+        assert embedder.batches == [5] and first
+        assert len(list(results)) == len(MANY_QUERIES) * 3 - 1
+        assert embedder.batches == [5, 5, 2]
+        assert embedder.single == 0
+
+    def test_filters(self, notes):
+        """Проверяет фильтры родителя в пакетном поиске."""
+        results = search_many(
+            Note,
+            NoteChunk,
+            MANY_QUERIES,
+            mode="hybrid",
+            generator=HashingEmbedder(),
+            category_id=notes.id,
+        )
+
+        for hits in results:
+            assert all(note.category_id == notes.id for note, _ in hits)
+
+    def test_invalid_arguments_fail_immediately(self, test_db):
+        """Проверяет, что ошибки параметров возникают при вызове, а не при чтении."""
+        with pytest.raises(ValueError, match="режим"):
+            search_many(Note, NoteChunk, MANY_QUERIES, mode="semantic")
+        with pytest.raises(ValueError, match="workers"):
+            search_many(Note, NoteChunk, MANY_QUERIES, mode="fts", workers=0)
+
+
+class TestSearchHit:
+    """Тесты проекции результатов (fields=..., snippet=True) и SearchHit."""
+
+    @pytest.fixture
+    def notes(self, test_db, sample_category, text_splitter):
+        topics = [
+            ("Циклы", "Python циклы for и while перебирают элементы. "),
+            ("Исключения", "Конструкция try except ловит исключения. "),
+            ("SQLite", "SQLite база данных хранит таблицы в файле. "),
+        ]
+        for title, content in topics:
+            save_note_with_chunks(
+                Note,
+                NoteChunk,
+                {"title": title, "content": content * 20, "category": sample_category},
+                text_splitter,
+                HashingEmbedder(),
+            )
+        return sample_category
+
+    @pytest.mark.parametrize(
+        "search",
+        [
+            lambda q, **kw: vector_search_chunks(Note, NoteChunk, q, **kw),
+            lambda q, generator, **kw: fulltext_search_parents(Note, q, **kw),
+            lambda q, **kw: hybrid_search_rrf(Note, NoteChunk, q, **kw),
+        ],
+        ids=["vector", "fts", "hybrid"],
+    )
+    def test_matches_tuple_results(self, notes, search):
+        """Проверяет, что SearchHit совпадают с кортежами (заметка, score)."""
+        embedder = HashingEmbedder()
+        expected = search("Python циклы", generator=embedder, limit=3)
+
+        hits = search("Python циклы", generator=embedder, limit=3, fields=["title"])
+
+        assert all(isinstance(hit, SearchHit) for hit in hits)
+        assert [(hit.id, hit.title) for hit in hits] == [
+            (note.id, note.title) for note, _ in expected
+        ]
+        assert [hit.score for hit in hits] == pytest.approx(
+            [score for _, score in expected]
+        )
+
+    def test_best_chunk(self, notes):
+        """Проверяет, что chunk_id и chunk_index — чанк с минимальным distance."""
+        embedder = HashingEmbedder()
+        query_vector = embedder.embed_query("Python циклы")
+
+        [hit] = vector_search_chunks(
+            Note, NoteChunk, "Python циклы", limit=1, generator=embedder, fields=["title"]
+        )
+
+        distances = {
+            chunk_id: distance
+            for chunk_id, distance in NoteChunk._meta.database.execute_sql(
+                "SELECT c.id, vec_distance_cosine(v.embedding, ?) "
+                "FROM note_chunks c JOIN note_chunks_vec v ON v.id = c.id "
+                "WHERE c.note_id = ?",
+                (query_vector.tobytes(), hit.id),
+            )
+        }
+        best = NoteChunk.get_by_id(hit.chunk_id)
+        assert hit.chunk_id == min(distances, key=distances.get)
+        assert (best.note_id, best.chunk_index) == (hit.id, hit.chunk_index)
+        assert hit.score == pytest.approx(distances[hit.chunk_id])
+        assert hit.note.content[hit.chunk_start : hit.chunk_end] == best.content
+
+    def test_projection_and_lazy_note(self, notes):
+        """Проверяет extra-поля и ленивую загрузку заметки."""
+        [hit] = fulltext_search_parents(
+            Note, "SQLite", limit=1, fields=["title", "category"]
+        )
+
+        assert hit.extra == {"category": notes.id}
+        assert hit.chunk_id is None
+        assert hit._note is None
+        assert hit.note.content.startswith("SQLite база")
+        assert hit.note is hit.note
+
+    def test_search_many_hits(self, notes):
+        """Проверяет проекцию в пакетном поиске."""
+        results = search_many(
+            Note,
+            NoteChunk,
+            MANY_QUERIES,
+            mode="hybrid",
+            generator=HashingEmbedder(),
+            fields=["title"],
+        )
+
+        for hits in results:
+            assert hits and all(hit.title == hit.note.title for hit in hits)
+
+    def test_fts_snippet(self, notes):
+        """Проверяет фрагмент snippet() с выделенным совпадением."""
+        [hit] = fulltext_search_parents(Note, "SQLite", limit=1, snippet=True)
+
+        assert hit.title is None and hit.chunk_id is None
+        assert "<b>SQLite</b>" in hit.snippet
+        assert len(hit.snippet) < len(hit.note.content)
+
+    def test_hybrid_snippet_and_chunk(self, notes):
+        """Проверяет, что гибридный поиск отдает и фрагмент, и лучший чанк."""
+        hits = hybrid_search_rrf(
+            Note, NoteChunk, "исключения", generator=HashingEmbedder(), snippet=True
+        )
+
+        top = next(hit for hit in hits if hit.snippet)
+        assert "<b>исключения</b>" in top.snippet
+        assert top.note.title == "Исключения"
+        chunk = NoteChunk.get_by_id(top.chunk_id)
+        assert (top.chunk_start, top.chunk_end) == (
+            chunk.start_offset,
+            chunk.end_offset,
+        )
+
+    def test_snippet_not_for_vector(self, test_db):
+        """Проверяет, что snippet в пакетном векторном поиске — ошибка."""
+        with pytest.raises(ValueError, match="snippet"):
+            search_many(Note, NoteChunk, MANY_QUERIES, snippet=True)
+
+    def test_unknown_field(self, test_db):
+        """Проверяет ошибку для поля проекции, которого нет у модели."""
+        with pytest.raises(ValueError, match="нет поля для проекции"):
+            fulltext_search_parents(Note, "python", fields=["title, content"])
+
+
 class TestCascadeDelete:
     """Тесты каскадного удаления."""
 
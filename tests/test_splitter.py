@@ -6,10 +6,24 @@
 - Перекрытия
 - Умного разреза по переносам строк
 - Граничных случаев
+- Потоковой нарезки iter_chunks() и ленивых чанков
+- Нарезки по бюджету токенов TokenTextSplitter
+- Нарезки Markdown по структуре MarkdownTextSplitter
 """
 
+import io
+import mmap
+import pickle
+import tracemalloc
+
 import pytest
-from semantic_core.text_processing import SimpleTextSplitter, Chunk
+from semantic_core.text_processing import (
+    Chunk,
+    MarkdownTextSplitter,
+    SimpleTextSplitter,
+    TokenEstimator,
+    TokenTextSplitter,
+)
 
 
 class TestSimpleTextSplitter:
@@ -188,3 +202,254 @@ class TestSimpleTextSplitter:
             "Пример текста для проверки представления..." in repr_str
             or "Пример текста для проверки представлени" in repr_str
         )
+
+
+SAMPLE = (
+    "Первая строка абзаца.\nВторая строка, чуть длиннее первой.\n\n"
+    "Длинная строка без переносов " * 7 + "\nХвост документа."
+) * 40
+
+
+class ShortReads(io.StringIO):
+    """Файл, отдающий не больше 7 символов за read()."""
+
+    def read(self, size=-1):
+        return super().read(7)
+
+
+class TestIterChunks:
+    """Тесты потоковой нарезки и Chunk."""
+
+    @pytest.mark.parametrize(
+        "make_source",
+        [
+            lambda text: text,
+            lambda text: io.StringIO(text),
+            lambda text: ShortReads(text),
+            lambda text: io.BytesIO(text.encode("utf-8")),
+        ],
+        ids=["str", "text-file", "short-reads", "binary-file"],
+    )
+    def test_matches_split_text(self, make_source):
+        """Проверяет, что чанки совпадают со split_text для любого источника."""
+        splitter = SimpleTextSplitter(chunk_size=120, overlap=30, threshold=20)
+
+        chunks = list(splitter.iter_chunks(make_source(SAMPLE)))
+
+        assert chunks == splitter.split_text(SAMPLE)
+        assert all(SAMPLE[c.start : c.end] == c.text for c in chunks)
+
+    def test_mmap_source(self, tmp_path):
+        """Проверяет mmap: многобайтовые символы на границах блоков декодируются."""
+        path = tmp_path / "transcript.txt"
+        path.write_text(SAMPLE * 50, encoding="utf-8")
+        splitter = SimpleTextSplitter(chunk_size=500, overlap=100)
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            chunks = list(splitter.iter_chunks(m))
+
+        assert chunks == splitter.split_text(SAMPLE * 50)
+
+    def test_streaming_keeps_window_only(self, tmp_path):
+        """Проверяет, что память не растет с размером файла."""
+        path = tmp_path / "big.txt"
+        path.write_text(SAMPLE * 600, encoding="utf-8")  # ~8 МБ в UTF-8
+        splitter = SimpleTextSplitter()
+
+        tracemalloc.start()
+        with open(path, encoding="utf-8") as f:
+            count = sum(1 for _ in splitter.iter_chunks(f))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert count > 1000
+        assert peak < path.stat().st_size / 4
+
+    def test_lazy_chunk(self):
+        """Проверяет ленивый чанк: текст по смещениям, pickle без исходной строки."""
+        chunk = SimpleTextSplitter(chunk_size=100, overlap=20).split_text(SAMPLE)[3]
+
+        assert not hasattr(chunk, "__dict__")
+        assert chunk.text == SAMPLE[chunk.start : chunk.end]
+
+        restored = pickle.loads(pickle.dumps(chunk))
+        assert restored == chunk
+        assert len(pickle.dumps(chunk)) < len(SAMPLE) // 10
+
+    def test_chunk_requires_text_or_offsets(self):
+        """Проверяет ошибку для чанка без текста и смещений."""
+        with pytest.raises(ValueError, match="text или source"):
+            Chunk(index=0, start=0)
+
+
+class TestTokenTextSplitter:
+    """Тесты TokenTextSplitter и TokenEstimator."""
+
+    MIXED = (
+        "Векторный поиск находит документы по смыслу.\n"
+        "def search(query: str) -> list[int]: return index[query]\n"
+        "Vector search finds documents by meaning.\n"
+    ) * 60
+
+    def test_chunks_fit_budget_and_cover_text(self):
+        """Проверяет бюджет, перекрытие и покрытие всего текста."""
+        splitter = TokenTextSplitter(max_tokens=80, overlap_tokens=10)
+        estimator = TokenEstimator()
+
+        chunks = splitter.split_text(self.MIXED)
+
+        assert len(chunks) > 1
+        assert all(estimator.count(c.text) <= 80 for c in chunks)
+        assert chunks[0].start == 0 and chunks[-1].end == len(self.MIXED)
+        for prev, chunk in zip(chunks, chunks[1:]):
+            assert prev.start < chunk.start <= prev.end
+        assert chunks[-1].metadata["is_last"] is True
+
+    def test_newline_snapping(self):
+        """Проверяет, что разрез прилипает к переносу строки."""
+        chunks = TokenTextSplitter(max_tokens=80, overlap_tokens=0).split_text(
+            self.MIXED
+        )
+
+        assert all(c.text.endswith("\n") for c in chunks[:-1])
+        assert all(c.metadata["cut_type"] == "newline" for c in chunks[:-1])
+
+    def test_cyrillic_gets_fewer_chars_than_latin(self):
+        """Проверяет, что кириллический чанк короче латинского при том же бюджете."""
+        splitter = TokenTextSplitter(max_tokens=50, overlap_tokens=0, threshold=0)
+
+        cyrillic = splitter.split_text("абвгд " * 200)[0]
+        latin = splitter.split_text("abcde " * 200)[0]
+
+        assert len(cyrillic.text) < len(latin.text)
+
+    def test_exact_tokenizer(self):
+        """Проверяет, что чанки укладываются в бюджет точного токенайзера."""
+
+        def tokenizer(text):
+            return len(text.split()) * 3  # Заведомо больше оценки
+
+        splitter = TokenTextSplitter(
+            max_tokens=60, overlap_tokens=6, tokenizer=tokenizer
+        )
+
+        chunks = splitter.split_text(self.MIXED)
+
+        assert all(tokenizer(c.text) <= 60 for c in chunks)
+        assert chunks[-1].end == len(self.MIXED)
+
+    def test_estimator_batch(self):
+        """Проверяет, что пакетная оценка совпадает с оценкой по одному тексту."""
+        estimator = TokenEstimator()
+        texts = ["hello world", "Привет, мир", "x[0] = f(y)", ""]
+
+        assert estimator.count_many(texts) == [estimator.count(t) for t in texts]
+        assert estimator.count("") == 0
+
+    def test_pickle(self):
+        """Проверяет, что сплиттер передается в процессы пула."""
+        splitter = TokenTextSplitter(max_tokens=80, overlap_tokens=10)
+
+        restored = pickle.loads(pickle.dumps(splitter))
+
+        assert restored.split_text(self.MIXED) == splitter.split_text(self.MIXED)
+
+    def test_invalid_params(self):
+        """Проверяет валидацию параметров."""
+        with pytest.raises(ValueError, match="max_tokens"):
+            TokenTextSplitter(max_tokens=0)
+        with pytest.raises(ValueError, match="overlap_tokens"):
+            TokenTextSplitter(max_tokens=10, overlap_tokens=10)
+
+
+MARKDOWN = """# Руководство
+
+Вводный абзац о проекте.
+
+## Установка
+
+Шаги установки:
+
+- Установить Python
+- Установить зависимости
+  командой poetry install
+
+```bash
+# Это комментарий, а не заголовок
+poetry install
+poetry run pytest
+```
+
+## Поиск
+
+### Векторный поиск
+
+| Метрика | Значение |
+|---------|----------|
+| cosine  | 0.29     |
+
+Абзац про векторный поиск. """ + "Текст раздела. " * 20 + """
+
+### Гибридный поиск
+
+Абзац про RRF.
+"""
+
+
+class TestMarkdownTextSplitter:
+    """Тесты MarkdownTextSplitter."""
+
+    def test_chunks_cover_text_in_order(self):
+        """Проверяет, что чанки покрывают документ подряд."""
+        chunks = MarkdownTextSplitter(chunk_size=400).split_text(MARKDOWN)
+
+        assert chunks[0].start == 0 and chunks[-1].end == len(MARKDOWN)
+        for prev, chunk in zip(chunks, chunks[1:]):
+            assert chunk.start == prev.end
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+        assert chunks[-1].metadata["is_last"] is True
+
+    def test_heading_paths(self):
+        """Проверяет путь заголовков и игнорирование # внутри блока кода."""
+        splitter = MarkdownTextSplitter(chunk_size=400, min_chunk_size=0)
+        chunks = splitter.split_text(MARKDOWN)
+        paths = {tuple(c.metadata["headings"]) for c in chunks}
+
+        assert ("Руководство", "Установка") in paths
+        assert ("Руководство", "Поиск", "Векторный поиск") in paths
+        assert ("Руководство", "Поиск", "Гибридный поиск") in paths
+        assert not any("Это комментарий" in "".join(path) for path in paths)
+
+    def test_code_fence_and_table_are_not_split(self):
+        """Проверяет, что блок кода и таблица целиком попадают в один чанк."""
+        splitter = MarkdownTextSplitter(chunk_size=60, overlap=10, min_chunk_size=0)
+        chunks = splitter.split_text(MARKDOWN)
+
+        assert all(c.text.count("```") % 2 == 0 for c in chunks)
+        table = [c for c in chunks if "| cosine" in c.text]
+        assert len(table) == 1 and "|---------|" in table[0].text
+
+    def test_oversized_block_is_split(self):
+        """Проверяет нарезку блока кода длиннее max_block_size."""
+        text = "# Код\n\n```python\n" + "x = 1\n" * 200 + "```\n"
+        splitter = MarkdownTextSplitter(chunk_size=100, overlap=20, max_block_size=300)
+
+        chunks = splitter.split_text(text)
+
+        assert len(chunks) > 1
+        assert all(len(c.text) <= 100 + splitter.threshold for c in chunks)
+        assert all(c.metadata["headings"] == ["Код"] for c in chunks)
+
+    def test_short_sections_are_merged(self):
+        """Проверяет склейку коротких разделов с общим путем заголовков."""
+        text = "# Док\n\n## А\n\nКоротко.\n\n## Б\n\nТоже коротко.\n"
+
+        chunks = MarkdownTextSplitter(chunk_size=500).split_text(text)
+
+        assert len(chunks) == 1
+        assert chunks[0].metadata["headings"] == ["Док"]
+
+    def test_invalid_max_block_size(self):
+        """Проверяет валидацию max_block_size."""
+        with pytest.raises(ValueError, match="max_block_size"):
+            MarkdownTextSplitter(chunk_size=100, overlap=20, max_block_size=50)
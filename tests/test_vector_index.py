@@ -0,0 +1,393 @@
+"""
+Тесты форматов хранения векторов.
+
+Проверяет:
+- Калибровку и int8-квантование по координатам
+- Прозрачный поиск по int8 с точным пересчетом distance
+- Удаление векторов из вспомогательной таблицы float32
+- Перекалибровку int8-индекса и отложенную калибровку до набора выборки
+- Бинарный компаньон: KNN по Хэммингу с точным пересчетом
+- Префиксные копии MRL: KNN по префиксу с пересчетом по полным векторам
+"""
+
+import numpy as np
+import pytest
+
+from semantic_core import (
+    check_vector_consistency,
+    create_vector_table,
+    calibrate_vector_index,
+    save_note_with_chunks,
+    delete_note_with_chunks,
+    vector_search_chunks,
+    hybrid_search_rrf,
+    HashingEmbedder,
+)
+from semantic_core import vector_index
+from semantic_core.database import db
+from semantic_core.vector_index import (
+    calibrate_scales,
+    VectorIndexConfig,
+    get_vector_index_config,
+    insert_vectors,
+    quantize_int8,
+    truncate_vectors,
+)
+from domain.models import Note, NoteChunk
+
+
+NOTES = [
+    ("Циклы", "Цикл for перебирает элементы последовательности. Цикл while работает по условию."),
+    ("Исключения", "Конструкция try-except перехватывает исключения и обрабатывает ошибки."),
+    ("Окружения", "Виртуальные окружения venv изолируют зависимости проекта."),
+    ("Генераторы", "Генераторы списков создают списки из последовательностей в одну строку."),
+]
+
+
+@pytest.fixture
+def embedder():
+    """Локальный эмбеддер: тесты не ходят в сеть."""
+    return HashingEmbedder()
+
+
+@pytest.fixture
+def int8_db(test_db):
+    """Пересоздает векторную таблицу чанков в формате int8."""
+    test_db.execute_sql("DROP TABLE IF EXISTS note_chunks_vec")
+    test_db.execute_sql("DELETE FROM vector_index_config")
+    create_vector_table(NoteChunk, vector_column="embedding", storage="int8")
+    return test_db
+
+
+@pytest.fixture
+def binary_db(test_db):
+    """Пересоздает векторную таблицу чанков с бинарным компаньоном."""
+    test_db.execute_sql("DROP TABLE IF EXISTS note_chunks_vec")
+    test_db.execute_sql("DELETE FROM vector_index_config")
+    create_vector_table(NoteChunk, binary=True, binary_oversample=4)
+    return test_db
+
+
+@pytest.fixture
+def prefix_db(test_db):
+    """Пересоздает векторную таблицу чанков с префиксными копиями."""
+    test_db.execute_sql("DROP TABLE IF EXISTS note_chunks_vec")
+    test_db.execute_sql("DELETE FROM vector_index_config")
+    create_vector_table(NoteChunk, prefix_dimensions=(256, 128))
+    return test_db
+
+
+def count_rows(table: str) -> int:
+    """Возвращает количество строк в таблице."""
+    return db.obj.execute_sql(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def save_notes(splitter, embedder):
+    """Сохраняет тестовые заметки и возвращает их."""
+    return [
+        save_note_with_chunks(
+            Note, NoteChunk, {"title": title, "content": content}, splitter, embedder
+        )
+        for title, content in NOTES
+    ]
+
+
+class TestQuantization:
+    """Тесты калибровки и квантования."""
+
+    def test_calibration_maps_range_to_int8(self):
+        """Проверяет, что масштаб по координате покрывает диапазон int8."""
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(1000, 16)).astype(np.float32)
+        matrix[:, 3] *= 10
+
+        scales = calibrate_scales(matrix)
+        quantized = quantize_int8(matrix, scales)
+
+        assert scales.shape == (16,)
+        assert scales[3] < scales[0]
+        assert np.abs(quantized).max() == 127
+        assert np.abs(quantized[:, 3]).max() == 127
+
+    def test_zero_columns_do_not_break_scales(self):
+        """Проверяет, что нулевые координаты не дают деления на ноль."""
+        matrix = np.zeros((10, 4), dtype=np.float32)
+        matrix[:, 0] = 0.5
+
+        scales = calibrate_scales(matrix)
+
+        assert np.isfinite(scales).all()
+
+
+    def test_written_tables_skip_uncalibrated_int8(self):
+        """Проверяет, что до калибровки векторы ожидаются только в _f32."""
+        config = VectorIndexConfig(
+            "t_vec", dimension=8, storage="int8", binary=True, prefix_dimensions=(4,)
+        )
+
+        assert config.vector_tables == ["t_vec", "t_vec_f32", "t_vec_bit", "t_vec_p4"]
+        assert config.written_tables == ["t_vec_f32", "t_vec_bit", "t_vec_p4"]
+
+        config.scales = np.ones(8, dtype=np.float32)
+        assert config.written_tables == config.vector_tables
+
+
+class TestInt8Storage:
+    """Тесты поиска и записи в int8-таблицу."""
+
+    def test_config_is_persisted(self, int8_db):
+        """Проверяет, что формат таблицы сохраняется в конфигурации."""
+        config = get_vector_index_config("note_chunks_vec")
+
+        assert config.storage == "int8"
+        assert config.scales is None
+
+    def test_search_matches_float_storage(self, test_db, text_splitter, embedder):
+        """Проверяет, что int8 с пересчетом дает те же результаты, что float32."""
+        save_notes(text_splitter, embedder)
+        query = "как перехватить ошибку"
+        expected = [
+            (note.id, distance)
+            for note, distance in vector_search_chunks(
+                Note, NoteChunk, query, limit=4, generator=embedder
+            )
+        ]
+
+        # Перекладываем те же векторы в int8-таблицу
+        rows = test_db.execute_sql("SELECT id, embedding FROM note_chunks_vec").fetchall()
+        ids = [row[0] for row in rows]
+        matrix = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        test_db.execute_sql("DROP TABLE note_chunks_vec")
+        test_db.execute_sql("DELETE FROM vector_index_config")
+        create_vector_table(NoteChunk, storage="int8")
+        insert_vectors(get_vector_index_config("note_chunks_vec"), ids, matrix)
+
+        actual = [
+            (note.id, distance)
+            for note, distance in vector_search_chunks(
+                Note, NoteChunk, query, limit=4, generator=embedder
+            )
+        ]
+
+        assert [note_id for note_id, _ in actual] == [note_id for note_id, _ in expected]
+        np.testing.assert_allclose(
+            [d for _, d in actual], [d for _, d in expected], rtol=1e-5
+        )
+
+    def test_int8_search_end_to_end(self, int8_db, text_splitter, embedder):
+        """Проверяет сохранение, векторный и гибридный поиск по int8."""
+        notes = save_notes(text_splitter, embedder)
+        config = calibrate_vector_index("note_chunks_vec")
+        assert config.scales is not None
+
+        results = vector_search_chunks(
+            Note, NoteChunk, "try-except исключения", limit=2, generator=embedder
+        )
+        assert results[0][0].id == notes[1].id
+
+        hybrid = hybrid_search_rrf(
+            Note, NoteChunk, "виртуальные окружения", limit=2, generator=embedder
+        )
+        assert hybrid[0][0].id == notes[2].id
+
+    def test_delete_removes_float_vectors(self, int8_db, text_splitter, embedder):
+        """Проверяет удаление векторов из vec0 и таблицы float32."""
+        note = save_notes(text_splitter, embedder)[0]
+        calibrate_vector_index("note_chunks_vec")
+
+        delete_note_with_chunks(Note, NoteChunk, note.id)
+
+        assert count_rows("note_chunks_vec") == NoteChunk.select().count()
+        assert count_rows("note_chunks_vec_f32") == NoteChunk.select().count()
+
+    def test_recalibration_keeps_search_working(
+        self, int8_db, text_splitter, embedder
+    ):
+        """Проверяет перекалибровку масштабов по всему корпусу."""
+        notes = save_notes(text_splitter, embedder)
+        config = calibrate_vector_index("note_chunks_vec")
+
+        assert config.scales.shape == (config.dimension,)
+        assert get_vector_index_config("note_chunks_vec").scales is not None
+        results = vector_search_chunks(
+            Note, NoteChunk, "виртуальные окружения venv", limit=1, generator=embedder
+        )
+        assert results[0][0].id == notes[2].id
+
+    def test_calibrates_after_minimum_sample(
+        self, int8_db, text_splitter, embedder, monkeypatch
+    ):
+        """Проверяет, что масштабы не калибруются по первой маленькой пачке."""
+        monkeypatch.setattr(vector_index, "_MIN_CALIBRATION_SAMPLE", 3)
+        notes = []
+
+        def save(title, content):
+            notes.append(
+                save_note_with_chunks(
+                    Note,
+                    NoteChunk,
+                    {"title": title, "content": content},
+                    text_splitter,
+                    embedder,
+                )
+            )
+
+        # Меньше выборки: векторы только в _f32, поиск — точный перебор
+        for title, content in NOTES[:2]:
+            save(title, content)
+        assert get_vector_index_config("note_chunks_vec").scales is None
+        assert count_rows("note_chunks_vec") == 0
+        assert check_vector_consistency(NoteChunk).consistent
+        results = vector_search_chunks(
+            Note, NoteChunk, "try-except исключения", limit=1, generator=embedder
+        )
+        assert results[0][0].id == notes[1].id
+
+        # Выборка набрана: калибровка и квантование всех накопленных векторов
+        save(*NOTES[2])
+        assert get_vector_index_config("note_chunks_vec").scales is not None
+        assert count_rows("note_chunks_vec") == count_rows("note_chunks_vec_f32") == 3
+        results = vector_search_chunks(
+            Note, NoteChunk, "виртуальные окружения venv", limit=1, generator=embedder
+        )
+        assert results[0][0].id == notes[2].id
+
+    def test_stale_config_reuses_stored_scales(
+        self, int8_db, text_splitter, embedder, monkeypatch
+    ):
+        """Проверяет, что писатель со старой конфигурацией не калибрует повторно."""
+        monkeypatch.setattr(vector_index, "_MIN_CALIBRATION_SAMPLE", 3)
+        stale = get_vector_index_config("note_chunks_vec")
+
+        # Другой писатель набирает выборку и калибрует таблицу
+        for title, content in NOTES:
+            save_note_with_chunks(
+                Note,
+                NoteChunk,
+                {"title": title, "content": content},
+                text_splitter,
+                embedder,
+            )
+        scales = get_vector_index_config("note_chunks_vec").scales
+        assert stale.scales is None and scales is not None
+
+        insert_vectors(stale, [10_000], embedder.embed_documents(["новый чанк"]))
+
+        np.testing.assert_array_equal(stale.scales, scales)
+        np.testing.assert_array_equal(
+            get_vector_index_config("note_chunks_vec").scales, scales
+        )
+        assert count_rows("note_chunks_vec") == count_rows("note_chunks_vec_f32")
+
+    def test_storage_mismatch_raises_error(self, test_db):
+        """Проверяет, что формат существующей таблицы нельзя тихо поменять."""
+        with pytest.raises(ValueError, match="уже создана"):
+            create_vector_table(NoteChunk, storage="int8")
+
+
+class TestBinaryCompanion:
+    """Тесты грубого поиска по бинарному компаньону."""
+
+    def test_insert_fills_bit_table(self, binary_db, text_splitter, embedder):
+        """Проверяет, что save_note_with_chunks заполняет bit-таблицу."""
+        save_notes(text_splitter, embedder)
+
+        assert count_rows("note_chunks_vec_bit") == NoteChunk.select().count()
+
+    def test_rerank_returns_exact_distances(self, binary_db, text_splitter, embedder):
+        """Проверяет, что бинарный поиск с пересчетом совпадает с точным."""
+        save_notes(text_splitter, embedder)
+        query = "цикл for по последовательности"
+
+        exact = vector_search_chunks(
+            Note, NoteChunk, query, limit=4, generator=embedder, binary=False
+        )
+        coarse = vector_search_chunks(
+            Note, NoteChunk, query, limit=4, generator=embedder, oversample=10
+        )
+
+        assert [note.id for note, _ in coarse] == [note.id for note, _ in exact]
+        np.testing.assert_allclose(
+            [d for _, d in coarse], [d for _, d in exact], rtol=1e-6
+        )
+
+        hybrid = hybrid_search_rrf(
+            Note, NoteChunk, query, limit=2, generator=embedder, binary=True
+        )
+        assert hybrid[0][0].id == exact[0][0].id
+
+    def test_delete_removes_bits(self, binary_db, text_splitter, embedder):
+        """Проверяет удаление векторов из bit-таблицы."""
+        note = save_notes(text_splitter, embedder)[0]
+
+        delete_note_with_chunks(Note, NoteChunk, note.id)
+
+        assert count_rows("note_chunks_vec_bit") == NoteChunk.select().count()
+
+    def test_binary_requires_companion(self, test_db, embedder):
+        """Проверяет ошибку при binary=True без компаньона."""
+        with pytest.raises(ValueError, match="бинарного компаньона"):
+            vector_search_chunks(
+                Note, NoteChunk, "запрос", generator=embedder, binary=True
+            )
+
+
+class TestPrefixIndex:
+    """Тесты префиксного (Matryoshka) поиска."""
+
+    def test_truncate_renormalizes(self):
+        """Проверяет обрезку и перенормировку префикса."""
+        matrix = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+
+        prefix = truncate_vectors(matrix, 2)
+
+        np.testing.assert_allclose(prefix[0], [0.6, 0.8])
+        np.testing.assert_array_equal(prefix[1], [0.0, 0.0])
+
+    def test_insert_fills_prefix_tables(self, prefix_db, text_splitter, embedder):
+        """Проверяет заполнение всех префиксных таблиц при сохранении."""
+        save_notes(text_splitter, embedder)
+
+        config = get_vector_index_config("note_chunks_vec")
+        assert config.prefix_dimensions == (128, 256)
+        for prefix in config.prefix_dimensions:
+            assert count_rows(config.prefix_table(prefix)) == NoteChunk.select().count()
+
+    def test_prefix_search_reranks_with_full_vectors(
+        self, prefix_db, text_splitter, embedder
+    ):
+        """Проверяет, что distance после пересчета совпадает с полным поиском."""
+        save_notes(text_splitter, embedder)
+        query = "генераторы списков"
+        full_dimension = get_vector_index_config("note_chunks_vec").dimension
+
+        exact = vector_search_chunks(
+            Note,
+            NoteChunk,
+            query,
+            limit=4,
+            generator=embedder,
+            prefix_dimension=full_dimension,
+        )
+
+        for prefix in (128, 256):
+            results = vector_search_chunks(
+                Note,
+                NoteChunk,
+                query,
+                limit=4,
+                generator=embedder,
+                prefix_dimension=prefix,
+                shortlist=100,
+            )
+            assert [note.id for note, _ in results] == [note.id for note, _ in exact]
+            np.testing.assert_allclose(
+                [d for _, d in results], [d for _, d in exact], rtol=1e-6
+            )
+
+    def test_unknown_prefix_raises_error(self, prefix_db, embedder):
+        """Проверяет ошибку для несозданного префикса."""
+        with pytest.raises(ValueError, match="нет префикса 64"):
+            hybrid_search_rrf(
+                Note, NoteChunk, "запрос", generator=embedder, prefix_dimension=64
+            )
@@ -0,0 +1,227 @@
+"""
+Тесты отложенной векторизации.
+
+Проверяет:
+- Сохранение в режиме deferred: чанки без векторов, FTS сразу работает
+- Обработку очереди воркером и совпадение с синхронным режимом
+- Возврат зависших захватов и исчерпание попыток
+- Пропуск чанков, удаленных во время векторизации
+- Работу воркера в фоновом потоке
+"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from semantic_core import (
+    ChunkStatus,
+    EmbeddingWorker,
+    HashingEmbedder,
+    save_note_with_chunks,
+    vector_search_chunks,
+    fulltext_search_parents,
+)
+from semantic_core.database import db
+from domain.models import Note, NoteChunk
+
+
+CONTENT = (
+    "Конструкция try-except перехватывает исключения и обрабатывает ошибки. " * 30
+)
+
+
+class FailingEmbedder(HashingEmbedder):
+    """Эмбеддер, который всегда падает."""
+
+    def embed_documents(self, texts):
+        raise RuntimeError("API недоступен")
+
+
+class CallbackEmbedder(HashingEmbedder):
+    """Эмбеддер, вызывающий колбэк перед векторизацией."""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def embed_documents(self, texts):
+        self.callback()
+        return super().embed_documents(texts)
+
+
+def save_deferred(splitter, title="Исключения", content=CONTENT, **kwargs):
+    """Сохраняет заметку в режиме deferred."""
+    return save_note_with_chunks(
+        Note,
+        NoteChunk,
+        {"title": title, "content": content, **kwargs},
+        splitter,
+        None,
+        mode="deferred",
+    )
+
+
+def count_vectors() -> int:
+    """Возвращает количество векторов."""
+    return db.obj.execute_sql("SELECT COUNT(*) FROM note_chunks_vec").fetchone()[0]
+
+
+def statuses() -> set:
+    """Возвращает множество статусов всех чанков."""
+    return {chunk.status for chunk in NoteChunk.select(NoteChunk.status)}
+
+
+class TestDeferredSave:
+    """Тесты save_note_with_chunks(mode="deferred")."""
+
+    def test_chunks_are_pending_without_vectors(self, test_db, text_splitter):
+        """Проверяет, что чанки ждут воркера, а FTS уже находит заметку."""
+        note = save_deferred(text_splitter)
+
+        assert note.chunk_stats.pending == note.chunks.count() > 1
+        assert note.chunk_stats.embedded == 0
+        assert statuses() == {ChunkStatus.PENDING}
+        assert count_vectors() == 0
+        assert fulltext_search_parents(Note, "исключения")[0][0].id == note.id
+
+    def test_unknown_mode_raises_error(self, test_db, text_splitter):
+        """Проверяет ошибку для неизвестного режима."""
+        with pytest.raises(ValueError, match="mode"):
+            save_note_with_chunks(
+                Note,
+                NoteChunk,
+                {"title": "T", "content": "C"},
+                text_splitter,
+                None,
+                mode="later",
+            )
+
+    def test_sync_update_embeds_pending_chunks(self, test_db, text_splitter):
+        """Проверяет, что синхронное обновление не переиспользует чанки без векторов."""
+        note = save_deferred(text_splitter)
+
+        note = save_note_with_chunks(
+            Note,
+            NoteChunk,
+            {"id": note.id, "content": CONTENT},
+            text_splitter,
+            HashingEmbedder(),
+            update_existing=True,
+        )
+
+        assert note.chunk_stats.reused == 0
+        assert statuses() == {ChunkStatus.DONE}
+        assert count_vectors() == NoteChunk.select().count()
+
+
+class TestEmbeddingWorker:
+    """Тесты EmbeddingWorker."""
+
+    def test_run_once_matches_sync_mode(self, test_db, text_splitter):
+        """Проверяет, что после воркера поиск дает то же, что синхронный режим."""
+        embedder = HashingEmbedder()
+        sync_note = save_note_with_chunks(
+            Note,
+            NoteChunk,
+            {"title": "Исключения", "content": CONTENT},
+            text_splitter,
+            embedder,
+        )
+        expected = vector_search_chunks(
+            Note, NoteChunk, "перехват ошибок", generator=embedder
+        )[0][1]
+        sync_note.delete_instance()
+        test_db.execute_sql("DELETE FROM note_chunks_vec")
+
+        note = save_deferred(text_splitter)
+        worker = EmbeddingWorker(Note, NoteChunk, embedder, batch_size=2)
+        stats = worker.run_once()
+
+        assert stats.embedded == note.chunks.count()
+        assert stats.batches == -(-stats.embedded // 2)
+        assert statuses() == {ChunkStatus.DONE}
+        assert worker.pending_count() == 0
+        results = vector_search_chunks(
+            Note, NoteChunk, "перехват ошибок", generator=embedder
+        )
+        assert results[0][0].id == note.id
+        assert results[0][1] == pytest.approx(expected)
+
+    def test_stale_claim_is_recovered(self, test_db, text_splitter):
+        """Проверяет возврат чанков, захваченных упавшим воркером."""
+        save_deferred(text_splitter)
+        crashed = EmbeddingWorker(Note, NoteChunk, HashingEmbedder(), batch_size=2)
+        claimed, _ = crashed.claim_batch()
+        NoteChunk.update(claimed_at=datetime.now() - timedelta(hours=1)).where(
+            NoteChunk.status == ChunkStatus.PROCESSING
+        ).execute()
+
+        stats = EmbeddingWorker(Note, NoteChunk, HashingEmbedder()).run_once()
+
+        assert stats.recovered == len(claimed) == 2
+        assert statuses() == {ChunkStatus.DONE}
+        assert count_vectors() == NoteChunk.select().count()
+
+    def test_fresh_claim_is_not_recovered(self, test_db, text_splitter):
+        """Проверяет, что активный захват другого воркера не трогается."""
+        save_deferred(text_splitter)
+        EmbeddingWorker(Note, NoteChunk, HashingEmbedder(), batch_size=2).claim_batch()
+
+        stats = EmbeddingWorker(Note, NoteChunk, HashingEmbedder()).run_once()
+
+        assert stats.recovered == 0
+        assert statuses() == {ChunkStatus.PROCESSING, ChunkStatus.DONE}
+
+    def test_errors_exhaust_attempts(self, test_db, text_splitter):
+        """Проверяет повтор после ошибки и статус FAILED после max_attempts."""
+        save_deferred(text_splitter)
+        worker = EmbeddingWorker(
+            Note, NoteChunk, FailingEmbedder(), batch_size=100, max_attempts=2
+        )
+
+        first = worker.run_once()
+        assert first.errors == 1 and first.failed == 0
+        assert statuses() == {ChunkStatus.PENDING}
+        assert NoteChunk.get().last_error == "API недоступен"
+
+        second = worker.run_once()
+        assert second.failed == NoteChunk.select().count()
+        assert statuses() == {ChunkStatus.FAILED}
+        assert count_vectors() == 0
+
+    def test_deleted_chunks_are_skipped(self, test_db, text_splitter):
+        """Проверяет, что вектор не пишется для чанка, удаленного во время векторизации."""
+        note = save_deferred(text_splitter)
+        worker = EmbeddingWorker(
+            Note, NoteChunk, CallbackEmbedder(lambda: note.delete_instance())
+        )
+
+        stats = worker.run_once()
+
+        assert stats.embedded == 0
+        assert count_vectors() == 0
+
+    def test_background_thread(self, test_db, text_splitter):
+        """Проверяет обработку очереди в фоновом потоке."""
+        worker = EmbeddingWorker(
+            Note, NoteChunk, HashingEmbedder(), batch_size=3, poll_interval=0.01
+        )
+        worker.start()
+        try:
+            save_deferred(text_splitter)
+            deadline = time.monotonic() + 10
+            while worker.pending_count() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            worker.stop()
+
+        assert worker.pending_count() == 0
+        assert count_vectors() == NoteChunk.select().count()
+
+    def test_requires_status_columns(self):
+        """Проверяет ошибку для модели без колонок статуса."""
+        from domain.models import Tag
+
+        with pytest.raises(ValueError, match="нет колонок"):
+            EmbeddingWorker(Note, Tag, HashingEmbedder())